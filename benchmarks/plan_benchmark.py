@@ -0,0 +1,92 @@
+"""
+Measure the cost of planning the parts of a VOD
+
+Compares building a VodPlan (titles, descriptions, tags, file names and
+start offsets of every part, computed once) with the per-part work the
+engine used to repeat: looking the title cleanup regexes up in the re
+module cache on every call, rebuilding description and tags, and summing
+the preceding split durations for every part's start offset.
+
+Usage:
+    python benchmarks/plan_benchmark.py [--vods N] [--hours H]
+
+Nothing is downloaded; a synthetic source stands in for Twitch.
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from vod_uploader.media import calculate_splits, clean_title_for_file
+from vod_uploader.plan import VodPlan, part_title
+from vod_uploader.sources import Source
+
+# Source with Twitch-like metadata and no I/O
+class SyntheticSource(Source):
+    default_file_name = "TwitchVOD"
+
+    def description_base(self, info):
+        return f"Twitch VOD: {info['title']}\nChannel: {info['user_name']}\n\nThis video was automatically uploaded from Twitch."
+
+    def tags(self, info):
+        return ['Twitch', 'VOD', info['user_name']] + [tag.strip('#') for tag in re.findall(r'#\w+', info['title'])]
+
+# The title cleanup as it was before the patterns were precompiled
+def uncompiled_clean_title(title, default):
+    clean_title = re.sub(r'[^\x00-\x7F]+', '', title)
+    clean_title = re.sub(r'[^\w\s\-\.,\(\)\[\]\{\}]', '_', clean_title)
+    clean_title = re.sub(r'_+', '_', clean_title)
+    clean_title = clean_title.strip('_').strip() or default
+    return clean_title.replace(' ', '_')[:200]
+
+# Per-part recomputation, as the engine did before plans
+def naive_plan(source, info):
+    splits = calculate_splits(info['duration'])
+    parts = []
+    for i, duration in enumerate(splits):
+        description_base = source.description_base(info)
+        tags = source.tags(info)
+        start_time = sum(splits[:i])
+        parts.append((part_title(info['title'], i + 1, len(splits)), description_base, tags, start_time,
+                      f"{uncompiled_clean_title(info['title'], source.default_file_name)}_part_{i + 1}"))
+    return parts
+
+# Seconds per call of func over the given VODs
+def time_per_vod(func, source, vods):
+    start = time.perf_counter()
+    for info in vods:
+        func(source, info)
+    return (time.perf_counter() - start) / len(vods)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--vods', type=int, default=2000, help='Distinct VODs to plan')
+    parser.add_argument('--hours', type=float, default=48, help='Length of every VOD')
+    args = parser.parse_args()
+
+    source = SyntheticSource()
+    vods = [
+        {'title': f"\U0001F3AE Day {i} | ranked grind w/ friends!! #gaming #speedrun \U0001F525 [{i}]",
+         'user_name': f"streamer{i % 50}", 'duration': args.hours * 3600}
+        for i in range(args.vods)
+    ]
+    parts = len(calculate_splits(args.hours * 3600))
+
+    # Fresh titles for each run so the title cache does not hide the cost
+    clean_title_for_file.cache_clear()
+    naive = time_per_vod(naive_plan, source, vods)
+    clean_title_for_file.cache_clear()
+    planned = time_per_vod(VodPlan, source, vods)
+    # Workers of the same VOD clean the same title again; that is a cache hit
+    replanned = time_per_vod(VodPlan, source, vods)
+
+    print(f"{args.vods} VOD(s) of {args.hours:g}h, {parts} part(s) each\n")
+    print(f"{'planner':<28} {'us/VOD':>10} {'us/part':>10}")
+    for name, seconds in (('per-part recompute', naive), ('VodPlan', planned), ('VodPlan, title cached', replanned)):
+        print(f"{name:<28} {seconds * 1e6:>10.1f} {seconds * 1e6 / parts:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Measure the extra wall time per GB of the remux/faststart stage
+
+Compares a plain file copy (what writing the download costs anyway) with
+the streaming remux used during Twitch downloads and the faststart remux
+used as a post-processing step.
+
+Usage:
+    python benchmarks/remux_benchmark.py [input.ts|input.mp4] [--seconds N]
+
+Without an input file a synthetic MPEG-TS recording is generated with ffmpeg.
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from vod_uploader.media import mp4_output_args, needs_remux, remux_to_mp4
+
+# Generate an MPEG-TS file similar to what streamlink writes
+def make_sample(path, seconds):
+    cmd = [
+        'ffmpeg', '-y', '-loglevel', 'error',
+        '-f', 'lavfi', '-i', f'testsrc2=size=1920x1080:rate=60:duration={seconds}',
+        '-f', 'lavfi', '-i', f'sine=frequency=440:duration={seconds}',
+        '-c:v', 'libx264', '-preset', 'ultrafast', '-b:v', '8M', '-g', '120',
+        '-c:a', 'aac', '-f', 'mpegts', path
+    ]
+    subprocess.check_call(cmd)
+
+# Time a callable and return seconds
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+# Copy stdin-style through ffmpeg, as stream_remux_download does
+def streaming_remux(input_file, output_file):
+    with open(input_file, 'rb') as source:
+        cmd = ['ffmpeg', '-y', '-loglevel', 'error', '-i', 'pipe:0'] + mp4_output_args(fragmented=True) + [output_file]
+        subprocess.run(cmd, stdin=source, check=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('input', nargs='?', help='Existing recording to benchmark with')
+    parser.add_argument('--seconds', type=int, default=120, help='Length of the generated sample')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        input_file = args.input
+        if input_file is None:
+            input_file = os.path.join(workdir, 'sample.ts')
+            print(f"Generating {args.seconds}s synthetic sample...")
+            make_sample(input_file, args.seconds)
+
+        size_gb = os.path.getsize(input_file) / (1024 ** 3)
+        print(f"Input: {input_file} ({size_gb * 1024:.1f} MB), needs remux: {needs_remux(input_file)}")
+
+        results = {
+            'copy': timed(lambda: shutil.copyfile(input_file, os.path.join(workdir, 'copy.bin'))),
+            'streaming remux (fragmented)': timed(lambda: streaming_remux(input_file, os.path.join(workdir, 'frag.mp4'))),
+            'post remux (faststart)': timed(lambda: remux_to_mp4(input_file, os.path.join(workdir, 'faststart.mp4'))),
+        }
+
+        baseline = results['copy']
+        print(f"\n{'stage':<30} {'s/GB':>8} {'extra s/GB':>11}")
+        for name, seconds in results.items():
+            print(f"{name:<30} {seconds / size_gb:>8.2f} {(seconds - baseline) / size_gb:>11.2f}")
+
+        for name in ('frag.mp4', 'faststart.mp4'):
+            path = os.path.join(workdir, name)
+            print(f"{name}: {os.path.getsize(path) / (1024 ** 2):.1f} MB, needs remux: {needs_remux(path)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Report stage durations and throughput from the job logs
+
+Reads the JSON-lines logs every pipeline writes to JOB_LOG_DIR (including
+rotated files) and aggregates the "stage" events per stage, or per job,
+run or worker and stage, across all runs.
+
+Usage:
+    python job_log_report.py [--dir job_logs] [--job 'vod_*'] [--by job,stage] [--since 2024-05-01|7d] [--runs]
+"""
+import argparse
+import time
+
+from vod_uploader.config import JOB_LOG_DIR
+from vod_uploader.joblog import read_job_log, stage_report
+
+# Unix time of "YYYY-MM-DD" or a relative "<N>d" / "<N>h"
+def parse_since(value):
+    if value[-1] in 'dh' and value[:-1].isdigit():
+        return time.time() - int(value[:-1]) * (86400 if value[-1] == 'd' else 3600)
+    return time.mktime(time.strptime(value, '%Y-%m-%d'))
+
+# One line per run: when, which job, and how it ended
+def print_runs(events):
+    runs = {}
+    for event in events:
+        if event.get('event') in ('run_started', 'run_finished'):
+            runs.setdefault(event.get('run'), {}).update(event, **{event['event']: event['ts']})
+    print(f"{'started':<20} {'job':<28} {'uploaded':>8} {'failed':>6} {'wall s':>9}")
+    for run in sorted(runs.values(), key=lambda run: run.get('run_started', 0)):
+        started = run.get('run_started')
+        wall = run['run_finished'] - started if started and run.get('run_finished') else None
+        print(f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(started)) if started else '?':<20} "
+              f"{str(run.get('job'))[:28]:<28} {run.get('uploaded', '-'):>8} {run.get('failed', '-'):>6} "
+              f"{f'{wall:.0f}' if wall is not None else '-':>9}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--dir', default=JOB_LOG_DIR, help='Job log directory')
+    parser.add_argument('--job', help="Only jobs matching this pattern, e.g. 'vod_*'")
+    parser.add_argument('--by', default='stage', help='Comma-separated fields to group on (stage, job, run, worker, part_num, ...)')
+    parser.add_argument('--since', help="Only events since YYYY-MM-DD, or the last Nd / Nh")
+    parser.add_argument('--runs', action='store_true', help='List runs instead of stage totals')
+    args = parser.parse_args()
+
+    events = read_job_log(args.dir, args.job)
+    since = parse_since(args.since) if args.since else None
+    if args.runs:
+        print_runs(event for event in events if not since or event.get('ts', 0) >= since)
+        return
+
+    group_by = tuple(field.strip() for field in args.by.split(',') if field.strip())
+    rows = stage_report(events, group_by, since)
+    if not rows:
+        print(f"No stage events in {args.dir}")
+        return
+
+    width = max(len(" / ".join(str(row[field]) for field in group_by)) for row in rows)
+    width = max(width, len(" / ".join(group_by)))
+    print(f"{' / '.join(group_by):<{width}} {'runs':>5} {'count':>6} {'failed':>6} {'total s':>9} "
+          f"{'p50 s':>8} {'p95 s':>8} {'max s':>8} {'GB':>8} {'MB/s':>8}")
+    for row in rows:
+        print(f"{' / '.join(str(row[field]) for field in group_by):<{width}} {row['runs']:>5} {row['count']:>6} "
+              f"{row['failed']:>6} {row['seconds']:>9.1f} {row['p50']:>8.1f} {row['p95']:>8.1f} {row['max']:>8.1f} "
+              f"{row['bytes'] / 1024 ** 3:>8.2f} {row['mb_per_second']:>8.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import os
+import sys
+
+from vod_uploader import LocalFileSource, get_youtube_service, process_source, watch_directory
+from vod_uploader.process import ProcessError, run_command
+
+# Remux parts to an MP4 with the moov atom at the front (CPU only, no re-encode)
+REMUX_PARTS = False
+
+# Opt-in re-encode of high-bitrate parts on all CPU cores before upload,
+# e.g. TranscodeOptions(target_bitrate=12000000) or TranscodeOptions(target_size=20 * 1024**3)
+# (from vod_uploader import TranscodeOptions)
+TRANSCODE = None
+
+# Custom thumbnail per part: "frame" (THUMBNAIL_FRAME) grabs a representative
+# frame from each part with one ffmpeg seek (None lets YouTube pick)
+THUMBNAIL = None
+
+# Collect the parts of a multi-part upload into one playlist, in part order
+PLAYLIST_PARTS = True
+
+# Parts uploaded at the same time, each on its own connection; a single
+# upload rarely fills the link. Parts are still downloaded one at a time
+UPLOAD_CONCURRENCY = 1
+
+# Seconds each install step may take
+INSTALL_TIMEOUT = 1800
+
+# Install required tools in Colab
+def install_dependencies():
+    print("Installing required dependencies...")
+    commands = [
+        [sys.executable, '-m', 'pip', 'install', '-q', 'google-auth-oauthlib', 'oauth2client'],
+        ['apt-get', '-qq', 'update'],
+        ['apt-get', '-qq', 'install', '-y', 'ffmpeg']
+    ]
+    for cmd in commands:
+        try:
+            run_command(cmd, timeout=INSTALL_TIMEOUT, stall_timeout=None)
+        except (ProcessError, OSError) as e:
+            print(f"Install step failed: {str(e)}")
+    print("Dependencies installed.")
+
+# Upload a recording that is already on this machine
+def process_local_video(path, title=None, youtube_service=None, specific_parts=None):
+    source = LocalFileSource(path, title=title, remux=REMUX_PARTS, transcode=TRANSCODE, thumbnail=THUMBNAIL)
+    return process_source(source, youtube_service=youtube_service, specific_parts=specific_parts, playlist=PLAYLIST_PARTS, upload_concurrency=UPLOAD_CONCURRENCY)
+
+# Main program for Colab
+def main():
+    print("==== Local Recording Uploader for Colab ====")
+    print("This program uploads recordings that are already on disk, without copying them first.")
+    print("Enter a file to upload it, or a directory to watch it for new recordings.")
+
+    # Install dependencies first
+    install_dependencies()
+
+    # Authenticate with YouTube once (reuse the service)
+    try:
+        youtube_service = get_youtube_service()
+    except Exception as e:
+        print(f"Error during initial authentication: {str(e)}")
+        print("You can still try to process videos, authentication will be attempted again.")
+        youtube_service = None
+
+    while True:
+        print("\n" + "-" * 50)
+        path = input("Enter a video file or a directory to watch (or 'q' to quit): ").strip()
+
+        if path.lower() == 'q':
+            print("Exiting program. Goodbye!")
+            break
+
+        if os.path.isdir(path):
+            watch_directory(path, youtube_service=youtube_service, remux=REMUX_PARTS, transcode=TRANSCODE, thumbnail=THUMBNAIL, playlist=PLAYLIST_PARTS)
+            continue
+
+        # Optional: Let user specify a custom title
+        custom_title = input("Enter custom title (leave blank to use filename): ").strip()
+        if not custom_title:
+            custom_title = None
+
+        process_local_video(path, title=custom_title, youtube_service=youtube_service)
+
+if __name__ == "__main__":
+    main()
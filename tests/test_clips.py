@@ -0,0 +1,30 @@
+import pytest
+
+from vod_uploader.clips import merge_clip_windows, parse_clip
+
+def test_parse_clip_with_title():
+    assert parse_clip("9:00:00-9:40:00 Boss fight") == (32400.0, 34800.0, "Boss fight")
+
+def test_parse_clip_without_title():
+    assert parse_clip(" 1:30-95 ") == (90.0, 95.0, None)
+
+def test_parse_clip_needs_a_range():
+    with pytest.raises(ValueError):
+        parse_clip("1:30 Boss fight")
+
+def test_merge_overlapping_and_close_clips():
+    clips = [(100, 200, None), (0, 50, None), (150, 300, None), (320, 400, None), (1000, 1100, None)]
+    windows = merge_clip_windows(clips, gap=30)
+    assert windows == [
+        {'start': 0, 'end': 50, 'parts': [2]},
+        {'start': 100, 'end': 400, 'parts': [1, 3, 4]},
+        {'start': 1000, 'end': 1100, 'parts': [5]},
+    ]
+
+def test_merge_keeps_distant_clips_apart():
+    windows = merge_clip_windows([(0, 10, None), (41, 50, None)], gap=30)
+    assert [window['parts'] for window in windows] == [[1], [2]]
+
+def test_contained_clip_does_not_shrink_window():
+    windows = merge_clip_windows([(0, 100, None), (10, 20, None)], gap=0)
+    assert windows == [{'start': 0, 'end': 100, 'parts': [1, 2]}]
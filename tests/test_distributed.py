@@ -0,0 +1,17 @@
+import pytest
+
+from vod_uploader.distributed import process_source_distributed
+from vod_uploader.sources.live import LiveStreamSource
+from vod_uploader.workqueue import SqliteWorkQueue
+
+def test_live_source_has_no_spec():
+    with pytest.raises(ValueError, match="remote workers"):
+        LiveStreamSource("somechannel").spec()
+
+def test_live_source_is_rejected_before_publishing(tmp_path, monkeypatch):
+    queue = SqliteWorkQueue(str(tmp_path / "queue.db"))
+    source = LiveStreamSource("somechannel")
+    # Reaching prepare() would start a recorder
+    monkeypatch.setattr(source, "prepare", lambda: pytest.fail("live source was prepared"))
+    monkeypatch.setattr(queue, "enqueue", lambda job, parts: pytest.fail("live source was enqueued"))
+    assert not process_source_distributed(source, queue)
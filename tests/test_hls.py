@@ -0,0 +1,69 @@
+import pytest
+
+from vod_uploader import hls
+from vod_uploader.retry import HttpStatusError
+from vod_uploader.segmentcache import SegmentCache
+from vod_uploader.timeindex import TimeIndex
+
+PLAYLIST_URL = "https://cdn.example/vod/index-dvr.m3u8"
+
+# Streamed response of one segment
+class FakeResponse:
+    def __init__(self, status_code, body=b""):
+        self.status_code = status_code
+        self.body = body
+        self.headers = {'content-length': str(len(body))}
+
+    def iter_content(self, chunk_size):
+        for offset in range(0, len(self.body), chunk_size):
+            yield self.body[offset:offset + chunk_size]
+
+    def close(self):
+        pass
+
+# Segment server that records requests and can refuse some segments
+class FakeSession:
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.requested = []
+
+    def get(self, url, stream=True, timeout=None):
+        self.requested.append(url)
+        if url in self.failing:
+            return FakeResponse(404)
+        return FakeResponse(200, url.encode() * 100)
+
+# Index of six 2-second segments with numbered URLs
+def make_index():
+    index = TimeIndex("vod_test")
+    index.set_segments(PLAYLIST_URL, [
+        {'url': f"https://cdn.example/vod/{i}.ts", 'start': 2.0 * i, 'duration': 2.0} for i in range(6)
+    ])
+    return index
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = SegmentCache(str(tmp_path / "cache"), max_bytes=10 ** 6)
+    monkeypatch.setattr(hls, 'get_segment_cache', lambda: cache)
+    monkeypatch.setattr(hls.job_log, 'directory', None)
+    return cache
+
+# Serve every fetch of the prefetcher from session
+def serve(monkeypatch, session):
+    monkeypatch.setattr(hls.HlsPrefetcher, 'session', lambda self: session)
+
+def test_retry_after_failed_download_hits_the_cache(tmp_path, monkeypatch, cache):
+    index = make_index()
+    failing = FakeSession(failing={"https://cdn.example/vod/4.ts"})
+    serve(monkeypatch, failing)
+    with pytest.raises(HttpStatusError):
+        hls.download_hls(PLAYLIST_URL, 0, 12, str(tmp_path / "part.ts"), max_in_flight=1, index=index)
+    assert index.fetched_count(range(0, 6)) == 4
+
+    retry = FakeSession()
+    serve(monkeypatch, retry)
+    hls.download_hls(PLAYLIST_URL, 0, 12, str(tmp_path / "part.ts"), max_in_flight=1, index=index)
+    assert cache.stats()['hits'] == 4
+    assert retry.requested == ["https://cdn.example/vod/4.ts", "https://cdn.example/vod/5.ts"]
+    expected = b"".join(f"https://cdn.example/vod/{i}.ts".encode() * 100 for i in range(6))
+    assert (tmp_path / "part.ts").read_bytes() == expected
@@ -0,0 +1,18 @@
+from vod_uploader.integrity import MIB, multipart_part_sizes
+
+def test_single_part_has_no_candidates():
+    assert multipart_part_sizes(100 * MIB, 1) == []
+
+def test_common_part_size_first():
+    # 20 MiB + 1 byte in 3 parts fits 8 MiB parts (and nothing smaller)
+    sizes = multipart_part_sizes(20 * MIB + 1, 3)
+    assert sizes[0] == 8 * MIB
+    assert all(size * 2 < 20 * MIB + 1 <= size * 3 for size in sizes)
+
+def test_smallest_whole_mib_size_added():
+    sizes = multipart_part_sizes(700 * MIB, 7)
+    assert 100 * MIB in sizes
+    assert all(size % MIB == 0 for size in sizes)
+
+def test_candidates_are_limited():
+    assert len(multipart_part_sizes(1000 * MIB, 2, limit=2)) <= 2
@@ -0,0 +1,67 @@
+from vod_uploader.joblog import JobLog, read_job_log
+
+# Job log writing to tmp_path that rotates after a few events
+def make_log(tmp_path, max_bytes=200, backups=5):
+    return JobLog(str(tmp_path), max_bytes=max_bytes, backups=backups, flush_interval=0.01)
+
+def test_rotated_files_are_read_oldest_first(tmp_path):
+    log = make_log(tmp_path)
+    for number in range(20):
+        log.event("tick", job="vod_1", number=number)
+        log.flush()
+    assert (tmp_path / "vod_1.jsonl.1").exists()
+    numbers = [event['number'] for event in read_job_log(str(tmp_path), "vod_1")]
+    assert numbers == sorted(numbers)
+    assert numbers[-1] == 19
+
+def test_oldest_backup_is_dropped(tmp_path):
+    log = make_log(tmp_path, backups=2)
+    for number in range(40):
+        log.event("tick", job="vod_1", number=number)
+        log.flush()
+    assert not (tmp_path / "vod_1.jsonl.3").exists()
+    numbers = [event['number'] for event in read_job_log(str(tmp_path), "vod_1")]
+    assert numbers == sorted(numbers) and numbers[-1] == 39 and numbers[0] > 0
+
+def test_jobs_are_read_separately(tmp_path):
+    log = make_log(tmp_path, max_bytes=10 ** 6)
+    log.event("tick", job="vod_1")
+    log.event("tick", job="vod_2")
+    log.flush()
+    assert [event['job'] for event in read_job_log(str(tmp_path), "vod_2")] == ["vod_2"]
+    assert len(list(read_job_log(str(tmp_path), "vod_*"))) == 2
+
+def test_job_pattern_uses_file_names(tmp_path):
+    log = make_log(tmp_path, max_bytes=10 ** 6)
+    log.event("tick", job="twitch:12345")
+    log.event("tick", job="twitch:67890")
+    log.flush()
+    assert (tmp_path / "twitch_12345.jsonl").exists()
+    assert len(list(read_job_log(str(tmp_path), "twitch:12345"))) == 1
+    assert len(list(read_job_log(str(tmp_path), "twitch:*"))) == 2
+
+def test_writer_follows_rotation_by_another_writer(tmp_path):
+    # Two processes logging the same job, e.g. workers of a distributed job
+    first, second = make_log(tmp_path, max_bytes=10 ** 6), make_log(tmp_path, max_bytes=1)
+    first.event("tick", job="vod_1", number=0)
+    first.flush()
+    second.event("tick", job="vod_1", number=1)
+    second.flush()
+    assert not (tmp_path / "vod_1.jsonl").exists()
+    first.event("tick", job="vod_1", number=2)
+    first.flush()
+    # The first writer continues in a new live file instead of the rotated one
+    assert [event['number'] for event in read_job_log(str(tmp_path), "vod_1")] == [0, 1, 2]
+    assert (tmp_path / "vod_1.jsonl").read_text().count("\n") == 1
+
+def test_open_files_are_capped(tmp_path):
+    log = JobLog(str(tmp_path), max_bytes=10 ** 6, flush_interval=0.01, max_open_files=2)
+    for job in range(5):
+        log.event("tick", job=f"vod_{job}")
+        log.flush()
+    assert list(log.files) == ["vod_3", "vod_4"]
+    # A job whose file was closed is reopened and appended to
+    log.event("tick", job="vod_0")
+    log.flush()
+    assert len(list(read_job_log(str(tmp_path), "vod_0"))) == 2
+    assert len(log.files) == 2
@@ -0,0 +1,53 @@
+from vod_uploader.playlist import PartPlaylist
+
+# Request object of the fake YouTube client
+class FakeRequest:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self):
+        return self.result
+
+# Playlist items collection backed by a list of item resources
+class FakePlaylistItems:
+    def __init__(self, items):
+        self.items = items
+
+    def list(self, **kwargs):
+        return FakeRequest({'items': list(self.items)})
+
+    def insert(self, part, body):
+        item = {'id': f"item-{body['snippet']['resourceId']['videoId']}", 'snippet': dict(body['snippet'])}
+        self.items.append(item)
+        return FakeRequest(item)
+
+    def delete(self, id):
+        self.items[:] = [item for item in self.items if item['id'] != id]
+        return FakeRequest({})
+
+# Just enough of the YouTube client for PartPlaylist
+class FakeYouTube:
+    def __init__(self, items):
+        self.playlist_items = FakePlaylistItems(items)
+
+    def playlistItems(self):
+        return self.playlist_items
+
+def playlist_item(video_id, position):
+    return {'id': f"item-{video_id}", 'snippet': {'position': position, 'resourceId': {'kind': 'youtube#video', 'videoId': video_id}}}
+
+def test_reuploaded_part_replaces_its_old_item(tmp_path):
+    cache_file = str(tmp_path / "playlists.json")
+    youtube = FakeYouTube([playlist_item("first", 0), playlist_item("second", 1)])
+    playlist = PartPlaylist("vod", "VOD", youtube_service=youtube, cache_file=cache_file)
+    playlist.playlist_id = "PL1"
+    playlist.parts = {1: "first", 2: "second"}
+
+    playlist.add(2, "second-again")
+
+    video_ids = [item['snippet']['resourceId']['videoId'] for item in youtube.playlist_items.items]
+    assert video_ids == ["first", "second-again"]
+    assert playlist.parts == {1: "first", 2: "second-again"}
+    # Adding the same part again changes nothing
+    playlist.add(2, "second-again")
+    assert len(youtube.playlist_items.items) == 2
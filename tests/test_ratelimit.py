@@ -0,0 +1,28 @@
+import threading
+import time
+
+from vod_uploader.config import TRANSFER_WEIGHTS
+from vod_uploader.ratelimit import BandwidthManager
+
+def test_job_weight_multiplies_kind_weight():
+    manager = BandwidthManager("test", 0)
+    assert manager.lane("job", 'upload', 3).weight == TRANSFER_WEIGHTS['upload'] * 3
+
+def test_concurrent_jobs_share_by_weight():
+    manager = BandwidthManager("test", 4 * 1024 * 1024, burst=64 * 1024)
+    lanes = {'light': manager.lane("light", 'download', 1), 'heavy': manager.lane("heavy", 'download', 3)}
+    received = {name: 0 for name in lanes}
+    stop = time.monotonic() + 0.6
+
+    # Transfer 16 KiB chunks through a lane until the time is up
+    def transfer(name):
+        while time.monotonic() < stop:
+            lanes[name].acquire(16 * 1024)
+            received[name] += 16 * 1024
+
+    threads = [threading.Thread(target=transfer, args=(name,)) for name in lanes]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert 2 < received['heavy'] / received['light'] < 4.5
@@ -0,0 +1,41 @@
+import errno
+import socket
+import threading
+import time
+
+from vod_uploader.retry import FATAL, RETRIABLE, CircuitBreaker, classify_error
+
+def test_local_disk_errors_are_fatal():
+    for code in (errno.ENOSPC, errno.EROFS, errno.EACCES):
+        assert classify_error(OSError(code, "local")) == FATAL
+
+def test_network_errors_are_retriable():
+    assert classify_error(OSError(errno.ECONNRESET, "reset")) == RETRIABLE
+    assert classify_error(socket.timeout("timed out")) == RETRIABLE
+    assert classify_error(IOError("Segment 3 closed after 10 of 20 bytes")) == RETRIABLE
+
+# Breaker that opened after one failure and is ready to be probed
+def half_open_breaker():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.1)
+    return breaker
+
+def test_half_open_breaker_admits_one_probe():
+    breaker = half_open_breaker()
+    breaker.before_call()
+    admitted = []
+    waiter = threading.Thread(target=lambda: (breaker.before_call(), admitted.append(True)))
+    waiter.start()
+    time.sleep(0.1)
+    # The second caller waits for the probe's outcome
+    assert admitted == []
+    breaker.record_success()
+    waiter.join(1)
+    assert admitted == [True]
+
+def test_failed_probe_opens_the_breaker_again():
+    breaker = half_open_breaker()
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.opened_at is not None and breaker.probe is None
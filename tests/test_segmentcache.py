@@ -0,0 +1,50 @@
+import os
+import zlib
+
+from vod_uploader.segmentcache import SegmentCache
+
+# Write data through a cache writer, as the HLS prefetcher does
+def store(cache, data, namespace="vod"):
+    writer = cache.writer(namespace)
+    writer.write(data)
+    writer.commit(zlib.crc32(data), len(data))
+    return zlib.crc32(data), len(data)
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    cache = SegmentCache(str(tmp_path), max_bytes=250)
+    first = store(cache, b"a" * 100)
+    second = store(cache, b"b" * 100)
+    # Reading the first entry makes the second the least recently used
+    assert cache.get("vod", *first) == b"a" * 100
+    store(cache, b"c" * 100)
+    assert cache.get("vod", *second) is None
+    assert cache.get("vod", *first) == b"a" * 100
+    stats = cache.stats()
+    assert stats['evictions'] == 1 and stats['bytes'] == 200
+
+def test_lru_order_survives_reload(tmp_path):
+    cache = SegmentCache(str(tmp_path), max_bytes=1000)
+    old = store(cache, b"a" * 100)
+    new = store(cache, b"b" * 100)
+    os.utime(cache.path(cache.key("vod", *old)), (1, 1))
+    reloaded = SegmentCache(str(tmp_path), max_bytes=150)
+    assert reloaded.get("vod", *old) is None
+    assert reloaded.get("vod", *new) == b"b" * 100
+
+def test_corrupt_entry_is_a_miss(tmp_path):
+    cache = SegmentCache(str(tmp_path), max_bytes=1000)
+    key = store(cache, b"a" * 100)
+    with open(cache.path(cache.key("vod", *key)), 'r+b') as f:
+        f.write(b"x")
+    assert cache.get("vod", *key) is None
+    assert cache.stats()['corrupt'] == 1
+
+def test_failed_write_is_dropped(tmp_path):
+    cache = SegmentCache(str(tmp_path), max_bytes=1000)
+    writer = cache.writer("vod")
+    writer.write(b"a" * 10)
+    os.remove(writer.temp_path)
+    # The rename fails; the entry is dropped instead of failing the download
+    writer.commit(zlib.crc32(b"a" * 10), 10)
+    assert cache.stats()['write_errors'] == 1
+    assert cache.stats()['entries'] == 0
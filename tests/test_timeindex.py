@@ -0,0 +1,47 @@
+from vod_uploader.timeindex import TimeIndex, url_template
+
+# Index of count 2-second segments with numbered URLs
+def make_index(count=20, urls=None):
+    index = TimeIndex("test")
+    urls = urls or [f"https://cdn.example/vod/chunked/{i}.ts" for i in range(count)]
+    index.set_segments("https://cdn.example/vod/index.m3u8",
+                       [{'url': url, 'start': 2.0 * i, 'duration': 2.0} for i, url in enumerate(urls)])
+    return index
+
+def test_segment_range_window_inside_segments():
+    index = make_index()
+    assert index.segment_range(3.0, 4.0) == range(1, 4)
+
+def test_segment_range_on_boundaries():
+    index = make_index()
+    # A window starting where a segment ends does not include that segment
+    assert index.segment_range(4.0, 4.0) == range(2, 4)
+
+def test_segment_range_past_the_end():
+    index = make_index(count=5)
+    assert list(index.segment_range(100.0, 10.0)) == []
+    assert index.segment_range(0.0, 1000.0) == range(0, 5)
+
+def test_fetched_count_across_bitset_bytes():
+    index = make_index()
+    fetched = [1, 2, 7, 8, 9, 15, 16]
+    index.record_segments(fetched, [100] * len(fetched), [0] * len(fetched))
+    assert index.fetched_count(range(0, 20)) == 7
+    assert index.fetched_count(range(2, 9)) == 3
+    assert index.fetched_count(range(10, 15)) == 0
+    assert index.fetched_count(range(3, 3)) == 0
+    assert index.is_fetched(8) and not index.is_fetched(10)
+
+def test_url_template_keeps_only_exceptions():
+    urls = [f"https://cdn.example/v/{i}.ts" for i in range(10)]
+    urls[4] = "https://cdn.example/v/4-muted.ts"
+    template = url_template(urls)
+    assert template['prefix'] == "https://cdn.example/v/"
+    assert template['suffix'] == ".ts"
+    assert template['exceptions'] == {4: "4-muted.ts"}
+
+def test_urls_round_trip_through_template():
+    urls = [f"https://cdn.example/v/{i + 100}.ts" for i in range(12)]
+    urls[11] = "https://other.example/x.ts"
+    index = make_index(urls=urls)
+    assert [index.url(i) for i in range(12)] == urls
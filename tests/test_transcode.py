@@ -0,0 +1,17 @@
+from vod_uploader.transcode import plan_cut_points
+
+# Keyframes every two seconds of a part, in container time
+def keyframes_from(start, duration):
+    return [start + 2.0 * i for i in range(int(duration / 2))]
+
+def test_cut_points_split_part_evenly():
+    assert plan_cut_points(keyframes_from(0.0, 120), 120, 4) == [30.0, 60.0, 90.0]
+
+def test_cut_points_of_part_with_absolute_timestamps():
+    # A later Twitch part starts hours into the VOD's timeline
+    start = 3 * 3600 + 1.4
+    cuts = plan_cut_points(keyframes_from(start, 120), 120, 4, start_time=start)
+    assert [round(cut, 6) for cut in cuts] == [30.0, 60.0, 90.0]
+
+def test_single_segment_has_no_cut_points():
+    assert plan_cut_points(keyframes_from(0.0, 120), 120, 1) == []
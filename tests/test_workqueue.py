@@ -0,0 +1,57 @@
+import time
+
+from vod_uploader.workqueue import DONE, LEASED, PENDING, SqliteWorkQueue
+
+# Queue in a fresh SQLite file with two parts of one job
+def make_queue(tmp_path, parts=2):
+    queue = SqliteWorkQueue(str(tmp_path / "queue.db"))
+    queue.enqueue("twitch:1", [{'part_num': part_num, 'start_time': 0} for part_num in range(1, parts + 1)])
+    return queue
+
+# State of every part of a job, by part number
+def states(queue, job="twitch:1"):
+    return {part['part_num']: part['state'] for part in queue.status(job)}
+
+def test_second_complete_returns_false(tmp_path):
+    queue = make_queue(tmp_path, parts=1)
+    item = queue.lease("worker-a")
+    assert queue.complete(item, "worker-a", "video1")
+    # The same part finished again (e.g. by a worker whose lease expired) is reported as a duplicate
+    assert not queue.complete(item, "worker-b", "video2")
+    assert queue.status("twitch:1")[0]['video_id'] == "video1"
+
+def test_expired_lease_is_leased_again(tmp_path):
+    queue = make_queue(tmp_path, parts=1)
+    first = queue.lease("worker-a", lease_seconds=0.05)
+    assert queue.lease("worker-b") is None
+    time.sleep(0.1)
+    second = queue.lease("worker-b")
+    assert second['part_num'] == first['part_num']
+    assert second['attempt'] == 2
+    # The original worker lost the part
+    assert not queue.renew(first, "worker-a")
+    assert queue.renew(second, "worker-b")
+
+def test_expired_lease_is_not_renewed(tmp_path):
+    queue = make_queue(tmp_path, parts=1)
+    item = queue.lease("worker-a", lease_seconds=0.05)
+    time.sleep(0.1)
+    # Expired but not yet taken: the worker must still treat the part as lost
+    assert not queue.renew(item, "worker-a")
+
+def test_republish_keeps_done_parts(tmp_path):
+    queue = make_queue(tmp_path)
+    item = queue.lease("worker-a")
+    queue.complete(item, "worker-a", "video1")
+    queue.lease("worker-a")
+    queue.enqueue("twitch:1", [{'part_num': 1, 'start_time': 0}, {'part_num': 2, 'start_time': 0}])
+    assert states(queue) == {1: DONE, 2: LEASED}
+
+def test_republish_retries_failed_parts(tmp_path):
+    queue = SqliteWorkQueue(str(tmp_path / "queue.db"), max_attempts=1)
+    queue.enqueue("twitch:1", [{'part_num': 1}])
+    queue.fail(queue.lease("worker-a"), "worker-a", "boom")
+    assert queue.lease("worker-a") is None
+    queue.enqueue("twitch:1", [{'part_num': 1}])
+    assert states(queue) == {1: PENDING}
+    assert queue.lease("worker-a")['attempt'] == 1
@@ -0,0 +1,18 @@
+"""
+Shared core for the Twitch and direct-URL YouTube upload pipelines
+
+Sources (vod_uploader.sources) produce part files; the engine
+(vod_uploader.engine) splits, uploads, retries and cleans up every part the
+same way regardless of where it came from.
+"""
+
+from .clips import parse_clip, process_clips
+from .distributed import process_source_distributed, run_worker
+from .engine import process_live_source, process_part, process_source
+from .media import calculate_splits, clean_title_for_file, format_duration, get_video_info, split_video
+from .plan import VodPlan
+from .sources import HttpSource, LiveStreamSource, LocalFileSource, Source, TwitchVodSource, watch_directory
+from .thumbnail import THUMBNAIL_FRAME, THUMBNAIL_SOURCE
+from .transcode import TranscodeOptions
+from .workqueue import open_work_queue
+from .youtube import get_youtube_service, set_thumbnail, upload_to_youtube
@@ -0,0 +1,105 @@
+import os
+import shutil
+import threading
+import uuid
+
+from .config import SCRATCH_DIR
+from .media import clean_title_for_file
+
+# Temp files of one job or part, kept in a scratch directory of its own
+class ArtifactRegistry:
+    """
+    Tracks the files a job or part creates so they can be removed without
+    scanning the working directory
+
+    Every stage registers the files it writes. Outputs named with path()
+    live in the registry's own directory, which nobody else writes to, so
+    cleanup() only touches this job's files even when several jobs (or the
+    parts of one job) run at the same time, and it also catches partial
+    files a failed tool left behind without being registered.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.lock = threading.Lock()
+        self.paths = {}  # Registered path -> None, in creation order
+
+    def mkdir(self):
+        """Create the scratch directory if needed and return it"""
+        os.makedirs(self.directory, exist_ok=True)
+        return self.directory
+
+    def path(self, name):
+        """Path for a new file in this registry's directory"""
+        return os.path.join(self.mkdir(), name)
+
+    def scope(self, name):
+        """Registry for a sub-unit (e.g. one part), in a subdirectory"""
+        return ArtifactRegistry(os.path.join(self.directory, name))
+
+    def register(self, *paths):
+        with self.lock:
+            for path in paths:
+                if path:
+                    self.paths[path] = None
+
+    def release(self, *paths):
+        """Remove some registered files now, e.g. an intermediate a later stage replaced"""
+        with self.lock:
+            for path in paths:
+                self.paths.pop(path, None)
+        remove_files(paths)
+
+    def cleanup(self, keep=()):
+        """
+        Remove every registered file and the scratch directory
+
+        Args:
+            keep: Paths to leave in place (still registered), e.g. a fetched
+                part a retry resumes from; the directory is then kept and
+                only everything else in it is removed
+        """
+        keep = set(keep)
+        with self.lock:
+            paths = [path for path in self.paths if path not in keep]
+            for path in paths:
+                self.paths.pop(path)
+        remove_files(paths)
+        if not os.path.isdir(self.directory):
+            return
+        if not keep:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            print(f"Removed scratch directory: {self.directory}")
+            return
+        # Partial files a failed tool left behind without registering them
+        kept_names = {os.path.basename(path) for path in keep}
+        for name in os.listdir(self.directory):
+            if name not in kept_names:
+                path = os.path.join(self.directory, name)
+                if os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    remove_files([path])
+
+# Remove files, reporting each one
+def remove_files(file_paths):
+    for file_path in file_paths:
+        if file_path and os.path.exists(file_path):
+            try:
+                os.remove(file_path)
+                print(f"Removed: {file_path}")
+            except Exception as e:
+                print(f"Failed to remove {file_path}: {str(e)}")
+
+# Registry with a fresh scratch directory for one job
+def job_artifacts(name, scratch_dir=SCRATCH_DIR):
+    """
+    Args:
+        name: Readable job name, e.g. the video title
+        scratch_dir: Parent directory of all job scratch directories
+
+    Returns:
+        ArtifactRegistry: Registry whose directory no other job or process uses
+    """
+    unique = f"{os.getpid()}_{uuid.uuid4().hex[:8]}"
+    return ArtifactRegistry(os.path.join(scratch_dir, f"{clean_title_for_file(name)[:80]}_{unique}"))
@@ -0,0 +1,171 @@
+import threading
+
+from .config import CLIP_MERGE_GAP, MAX_DURATION, UPLOAD_CONCURRENCY
+from .engine import print_summary, process_part, run_parts_concurrently, run_parts_sequentially
+from .instrumentation import Instrumentation
+from .joblog import job_log
+from .media import format_duration
+from .plan import plan_part
+from .playlist import PartPlaylist
+from .youtube import get_youtube_service
+
+# Seconds of an "H:MM:SS", "MM:SS" or plain seconds string
+def parse_timestamp(value):
+    seconds = 0.0
+    for field in value.strip().split(':'):
+        seconds = seconds * 60 + float(field)
+    return seconds
+
+# Parse one clip line: "START-END" optionally followed by a title
+def parse_clip(line):
+    """
+    Args:
+        line: e.g. "9:00:00-9:40:00 Boss fight" (the title is optional)
+
+    Returns:
+        tuple: (start, end, title) with times in seconds and title or None
+
+    Raises:
+        ValueError: If the range cannot be read
+    """
+    time_range, _, title = line.strip().partition(' ')
+    start, separator, end = time_range.partition('-')
+    if not separator:
+        raise ValueError(f"Expected START-END, got {time_range!r}")
+    return parse_timestamp(start), parse_timestamp(end), title.strip() or None
+
+# Group clips into the windows that are downloaded once and shared
+def merge_clip_windows(clips, gap=CLIP_MERGE_GAP):
+    """
+    Merge overlapping clips, and clips less than gap seconds apart, into
+    download windows; fetching a short gap is cheaper than a second request
+
+    Args:
+        clips: (start, end, title) tuples
+        gap: Largest gap in seconds that is still downloaded
+
+    Returns:
+        list: {'start', 'end', 'parts'} dicts in time order, parts being the
+        1-based numbers of the clips cut from the window
+    """
+    windows = []
+    for clip_num, (start, end, title) in sorted(enumerate(clips, 1), key=lambda item: item[1][0]):
+        if windows and start <= windows[-1]['end'] + gap:
+            windows[-1]['end'] = max(windows[-1]['end'], end)
+            windows[-1]['parts'].append(clip_num)
+        else:
+            windows.append({'start': start, 'end': end, 'parts': [clip_num]})
+    return windows
+
+# Upload chosen time ranges of a source as separate videos
+def process_clips(source, clips, youtube_service=None, playlist=False, upload_concurrency=UPLOAD_CONCURRENCY):
+    """
+    Cut and upload clips instead of the whole video
+
+    Only the data around the clips is fetched: the source downloads each
+    merged window once (see merge_clip_windows) and every clip in it is
+    cut from that download on keyframes. Each clip then goes through the
+    same process_part() as a regular part: verify, optional stages,
+    upload and retries.
+
+    Args:
+        source: Source adapter (Twitch VOD, local file, ...)
+        clips: (start, end, title) tuples in seconds; a None title becomes
+            "<video title> (H:MM:SS-H:MM:SS)"
+        youtube_service: YouTube API service object (created if None)
+        playlist: Collect the clips into one playlist
+        upload_concurrency: Clips uploaded at the same time
+
+    Returns:
+        bool: True if at least one clip was uploaded
+    """
+    instrumentation = Instrumentation()
+    try:
+        info = source.prepare()
+        source.print_info(info)
+
+        checked = []
+        for start, end, title in clips:
+            end = min(end, info['duration'])
+            if start < 0 or end <= start:
+                raise Exception(f"Invalid clip {format_duration(start)} - {format_duration(end)}")
+            if end - start > MAX_DURATION:
+                raise Exception(f"Clip {format_duration(start)} - {format_duration(end)} is longer than {format_duration(MAX_DURATION)}")
+            checked.append((start, end, title or f"{info['title']} ({format_duration(start)} - {format_duration(end)})"))
+        clips = checked
+
+        windows = merge_clip_windows(clips)
+        fetched = sum(window['end'] - window['start'] for window in windows)
+        print(f"\n{len(clips)} clip(s) from {len(windows)} download window(s), "
+              f"{format_duration(fetched)} of {format_duration(info['duration'])} fetched")
+        for window in windows:
+            print(f"  {format_duration(window['start'])} - {format_duration(window['end'])}: clip(s) {', '.join(map(str, window['parts']))}")
+        source.plan_windows(windows)
+
+        description_base = source.description_base(info)
+        tags = source.tags(info)
+        plans = [
+            plan_part(source, clip_num, 1, title, start, end - start, description_base, tags)
+            for clip_num, (start, end, title) in enumerate(clips, 1)
+        ]
+
+        concurrent = upload_concurrency > 1 and len(clips) > 1
+        fetch_lock = threading.Lock() if concurrent else None
+        if concurrent and youtube_service is None:
+            youtube_service = get_youtube_service()
+
+        part_playlist = None
+        if playlist and len(clips) > 1:
+            part_playlist = PartPlaylist(
+                f"{source.label}:{info.get('url') or info['title']}:clips", f"{info['title']} - Clips",
+                description_base, youtube_service=youtube_service)
+
+        artifacts = source.scratch(f"{info['title']}_clips")
+        log_fields = job_log.run_fields(source, info)
+        job_log.event("run_started", title=info['title'], clips=len(clips), windows=len(windows), **log_fields)
+
+        def run_clip(clip_num):
+            plan = plans[clip_num - 1]
+            with job_log.context(**log_fields):
+                result = process_part(
+                    source,
+                    part_num=clip_num,
+                    total_parts=1,
+                    title=plan.title,
+                    start_time=plan.start_time,
+                    duration=plan.duration,
+                    description_base=description_base,
+                    tags=tags,
+                    youtube_service=youtube_service,
+                    instrumentation=instrumentation,
+                    fetch_lock=fetch_lock,
+                    plan=plan,
+                    artifacts=artifacts.scope(f"clip_{clip_num}")
+                )
+            source.part_finished(clip_num, result)
+            if part_playlist and result["status"] == "success":
+                part_playlist.add(clip_num, result["video_id"])
+            return result
+
+        clip_nums = list(range(1, len(clips) + 1))
+        if concurrent:
+            part_results = run_parts_concurrently(run_clip, clip_nums, upload_concurrency, interactive=False)
+        else:
+            part_results = run_parts_sequentially(run_clip, clip_nums, interactive=False)
+
+        if part_playlist:
+            part_playlist.finalize()
+
+        successful_parts = print_summary(part_results)
+        instrumentation.print_summary()
+        job_log.event("run_finished", uploaded=len(successful_parts), failed=len(part_results) - len(successful_parts), **log_fields)
+        return len(successful_parts) > 0
+
+    except Exception as e:
+        print(f"\nError processing clips of {source.label}: {str(e)}")
+        return False
+
+    finally:
+        source.close()
+        if source.artifacts is not None:
+            source.artifacts.cleanup()
@@ -0,0 +1,47 @@
+# Shared configuration for the Twitch and direct-URL pipelines
+
+# Twitch API setup (replace with your credentials)
+TWITCH_CLIENT_ID = 'your_client_id'
+TWITCH_CLIENT_SECRET = 'your_client_secret'
+
+# OAuth scopes needed for YouTube uploads
+YOUTUBE_SCOPES = ['https://www.googleapis.com/auth/youtube.upload',
+                 'https://www.googleapis.com/auth/youtube',
+                 'https://www.googleapis.com/auth/youtube.force-ssl']
+
+CLIENT_SECRETS_FILE = "/content/client_secrets.json"
+TOKEN_FILE = "youtube_token.pickle"
+YOUTUBE_API_SERVICE_NAME = "youtube"
+YOUTUBE_API_VERSION = "v3"
+MAX_RETRIES = 10
+VALID_PRIVACY_STATUSES = ("public", "private", "unlisted")
+REDIRECT_URI = "http://localhost/"  # Added explicit redirect URI
+MAX_DURATION = 42600  # 11hr 50min 0sec in seconds
+PART_MAX_RETRIES = 3  # Maximum retries for a failed part
+UPLOAD_CHUNK_SIZE = 1024 * 1024 * 8  # 8MB chunks
+TIMELINE_CACHE_DIR = "vod_cache"  # Cached Twitch chapters/markers per VOD
+PROCESS_STALL_TIMEOUT = 300  # Seconds without output progress before an external tool is stopped
+PROBE_TIMEOUT = 120  # Seconds allowed for ffprobe and other short commands
+MIN_TRANSFER_RATE = 128 * 1024  # Bytes/s below which a download or upload reconnects (0 disables the watchdog)
+TRANSFER_RATE_WINDOW = 60  # Seconds over which the transfer rate is measured
+HLS_PREFETCH_SEGMENTS = 4  # HLS segments fetched at once per VOD part
+HLS_BUFFER_BYTES = 64 * 1024 * 1024  # Hard cap on prefetched segment data held in memory
+WORK_LEASE_SECONDS = 600  # How long a distributed worker holds a part without renewing its lease
+WORK_MAX_ATTEMPTS = 3  # Workers a part is handed to before it is marked failed
+WORK_POLL_INTERVAL = 30  # Seconds between queue polls of idle workers and the coordinator
+UPLOAD_CONCURRENCY = 1  # Parts of one video uploaded at the same time with one credential
+# Bandwidth caps in bytes/s (0 means unlimited), or time-of-day schedules such
+# as [("00:00", 0), ("18:00", 2 * 1024 * 1024), ("23:30", 0)]: each rate holds
+# from its local time until the next entry
+INGRESS_RATE_LIMIT = 0  # Shared by Twitch segment fetches and direct-URL downloads
+EGRESS_RATE_LIMIT = 0  # Shared by all YouTube uploads
+TRANSFER_WEIGHTS = {'download': 1, 'segments': 1, 'upload': 1}  # Fair-share weight per kind of transfer
+CLIP_MERGE_GAP = 120  # Clips less than this many seconds apart are downloaded as one window
+SEGMENT_CACHE_DIR = "segment_cache"  # Downloaded HLS segments kept for overlapping parts, clips, retries and reruns
+SEGMENT_CACHE_BYTES = 0  # Disk budget of the segment cache, least recently used segments go first (0 disables it)
+SCRATCH_DIR = "scratch"  # Per-job scratch directories for downloads, split parts and other temp files
+JOB_LOG_DIR = "job_logs"  # One JSON-lines event log per job (None disables it); see job_log_report.py
+JOB_LOG_MAX_BYTES = 10 * 1024 * 1024  # Rotate a job's log past this size
+JOB_LOG_BACKUPS = 5  # Rotated files kept per job
+JOB_LOG_FLUSH_INTERVAL = 2  # Seconds between batched writes
+JOB_LOG_OPEN_FILES = 8  # Job log files kept open; the least recently written is closed past this
@@ -0,0 +1,245 @@
+import os
+import socket
+import time
+
+from .config import TWITCH_CLIENT_ID, TWITCH_CLIENT_SECRET, WORK_LEASE_SECONDS, WORK_POLL_INTERVAL
+from .engine import print_summary, process_part
+from .instrumentation import Instrumentation
+from .joblog import job_log
+from .plan import VodPlan
+from .playlist import PartPlaylist
+from .sources import LocalFileSource, TwitchVodSource
+from .transcode import TranscodeOptions
+from .workqueue import DONE, FAILED, LeaseKeeper
+from .youtube import get_youtube_service
+
+# Rebuild a source from the spec a coordinator published
+def source_from_spec(spec, client_id=TWITCH_CLIENT_ID, client_secret=TWITCH_CLIENT_SECRET):
+    """
+    Args:
+        spec: Source.spec() of the coordinator's source
+        client_id, client_secret: This worker's Twitch credentials
+
+    Returns:
+        Source: A source ready for prepare()
+    """
+    transcode = TranscodeOptions(**spec['transcode']) if spec.get('transcode') else None
+    options = {'remux': spec.get('remux', False), 'transcode': transcode, 'thumbnail': spec.get('thumbnail'),
+               'bandwidth_weight': spec.get('bandwidth_weight', 1)}
+    if spec['kind'] == 'twitch':
+        return TwitchVodSource(spec['vod_id'], client_id, client_secret, quality=spec.get('quality'), **options)
+    if spec['kind'] == 'local':
+        return LocalFileSource(spec['path'], title=spec.get('title'), **options)
+    raise Exception(f"Unknown source kind in work queue: {spec['kind']}")
+
+# Job key shared by every part of one source
+def job_key(spec):
+    return f"{spec['kind']}:{spec.get('vod_id') or spec.get('path')}"
+
+# Put the parts of a source on the queue
+def publish_source(queue, source, specific_parts=None):
+    """
+    Publish every (selected) part of a source for workers to pick up
+
+    Publishing the same source again keeps finished parts and retries
+    failed ones, so it is safe to rerun.
+
+    Args:
+        queue: SqliteWorkQueue or RedisWorkQueue
+        source: Source adapter with spec() (Twitch VOD or a local file on a shared disk)
+        specific_parts: 1-based part numbers, or None for all
+
+    Returns:
+        tuple: (job, VodPlan of the source, part numbers published)
+    """
+    spec = source.spec()
+    info = source.prepare()
+    vod_plan = VodPlan(source, info)
+    part_nums = specific_parts or list(range(1, len(vod_plan) + 1))
+
+    job = job_key(spec)
+    queue.enqueue(job, [
+        {
+            'part_num': part_num,
+            'total_parts': len(vod_plan),
+            'start_time': vod_plan.part(part_num).start_time,
+            'duration': vod_plan.part(part_num).duration,
+            'source': spec
+        }
+        for part_num in part_nums
+    ])
+    print(f"Published {len(part_nums)} part(s) of {job} to {queue}")
+    return job, vod_plan, part_nums
+
+# Wait until workers have finished the selected parts of a job
+def wait_for_job(queue, job, part_nums, poll_interval=WORK_POLL_INTERVAL):
+    """
+    Returns:
+        list: Status dicts of the parts in part_nums, once all are done or failed
+    """
+    last_line = None
+    while True:
+        parts = [part for part in queue.status(job) if part['part_num'] in part_nums]
+        counts = {}
+        for part in parts:
+            counts[part['state']] = counts.get(part['state'], 0) + 1
+        line = ", ".join(f"{count} {state}" for state, count in sorted(counts.items()))
+        if line != last_line:
+            workers = sorted({part['worker'] for part in parts if part['state'] == 'leased' and part['worker']})
+            print(f"{job}: {line}" + (f" (workers: {', '.join(workers)})" if workers else ""))
+            last_line = line
+        if all(part['state'] in (DONE, FAILED) for part in parts):
+            return parts
+        time.sleep(poll_interval)
+
+# Coordinator: publish a source and collect what the workers uploaded
+def process_source_distributed(source, queue, youtube_service=None, specific_parts=None, playlist=False, wait=True, poll_interval=WORK_POLL_INTERVAL):
+    """
+    Distributed counterpart of process_source()
+
+    The coordinator only publishes parts and, once workers have reported
+    every video ID, fills the playlist and prints the summary.
+
+    Args:
+        source: Source adapter with spec()
+        queue: Work queue shared with the workers
+        youtube_service: YouTube API service object (for the playlist)
+        specific_parts: 1-based part numbers, or None for all
+        playlist: Collect the parts into one playlist
+        wait: Wait for the workers; otherwise return right after publishing
+        poll_interval: Seconds between status polls
+
+    Returns:
+        bool: True if at least one part was uploaded (or published, without wait)
+    """
+    try:
+        if not source.distributable:
+            # Rejected before prepare(), so nothing is recorded, downloaded or enqueued
+            raise ValueError(f"{type(source).__name__} cannot be processed by remote workers; run it without a work queue")
+        job, vod_plan, part_nums = publish_source(queue, source, specific_parts)
+        if not wait:
+            return True
+
+        parts = wait_for_job(queue, job, part_nums, poll_interval)
+        results = []
+        for part in parts:
+            result = {
+                "status": "success" if part['state'] == DONE else "failed",
+                "part_num": part['part_num'],
+                "title": vod_plan.part(part['part_num']).title
+            }
+            if part['state'] == DONE:
+                result["video_id"] = part['video_id']
+            else:
+                result["error"] = part['error']
+            results.append(result)
+
+        if playlist and len(vod_plan) > 1:
+            part_playlist = PartPlaylist(
+                f"{source.label}:{vod_plan.url or vod_plan.title}", vod_plan.title,
+                vod_plan.description_base, youtube_service=youtube_service)
+            for result in results:
+                if result["status"] == "success":
+                    part_playlist.add(result["part_num"], result["video_id"])
+            part_playlist.finalize()
+
+        return len(print_summary(results)) > 0
+
+    except Exception as e:
+        print(f"\nError publishing {source.label}: {str(e)}")
+        return False
+    finally:
+        source.close()
+
+# Worker: lease parts from the queue and upload them until told to stop
+def run_worker(queue, youtube_service=None, worker_id=None, client_id=TWITCH_CLIENT_ID, client_secret=TWITCH_CLIENT_SECRET,
+               lease_seconds=WORK_LEASE_SECONDS, poll_interval=WORK_POLL_INTERVAL, stop_when_idle=False):
+    """
+    Process parts published by any coordinator, one at a time
+
+    The lease is renewed in the background while the part is fetched and
+    uploaded; if this worker dies, the lease expires and another worker
+    takes the part. Every part goes through the same process_part() as a
+    single-machine run.
+
+    Args:
+        queue: Work queue shared with the coordinator
+        youtube_service: YouTube API service object (created if None)
+        worker_id: Name in the queue (defaults to host:pid)
+        client_id, client_secret: This worker's Twitch credentials
+        lease_seconds: Lease length; renewed every third of it
+        poll_interval: Seconds to wait when the queue is empty
+        stop_when_idle: Return once the queue is empty instead of waiting
+
+    Returns:
+        int: Number of parts this worker uploaded
+    """
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    # One authenticated service for every part, rather than a new one per upload
+    youtube_service = youtube_service or get_youtube_service()
+    instrumentation = Instrumentation()
+    sources = {}  # job -> (source, VodPlan, ArtifactRegistry, job log fields), prepared and planned once per job
+    uploaded = 0
+    print(f"Worker {worker_id} polling {queue}")
+
+    try:
+        while True:
+            item = queue.lease(worker_id, lease_seconds)
+            if item is None:
+                if stop_when_idle:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            payload = item['payload']
+            print(f"\nLeased part {item['part_num']} of {item['job']} (attempt {item['attempt']})")
+            with LeaseKeeper(queue, item, worker_id, lease_seconds) as lease:
+                try:
+                    if item['job'] not in sources:
+                        source = source_from_spec(payload['source'], client_id, client_secret)
+                        info = source.prepare()
+                        vod_plan = VodPlan(source, info)
+                        log_fields = dict(job_log.run_fields(source, info), worker=worker_id)
+                        sources[item['job']] = (source, vod_plan, source.scratch(vod_plan.title), log_fields)
+                    source, vod_plan, artifacts, log_fields = sources[item['job']]
+                    part = vod_plan.part(item['part_num'])
+
+                    with job_log.context(**log_fields):
+                        result = process_part(
+                            source,
+                            part_num=item['part_num'],
+                            total_parts=payload['total_parts'],
+                            title=vod_plan.title,
+                            start_time=payload['start_time'],
+                            duration=payload['duration'],
+                            description_base=vod_plan.description_base,
+                            tags=vod_plan.tags,
+                            youtube_service=youtube_service,
+                            instrumentation=instrumentation,
+                            plan=part,
+                            artifacts=artifacts.scope(f"part_{item['part_num']}_attempt_{item['attempt']}")
+                        )
+                    source.part_finished(item['part_num'], result)
+                except Exception as e:
+                    result = {"status": "failed", "part_num": item['part_num'], "error": str(e)}
+
+            if result["status"] == "success":
+                uploaded += 1
+                if not queue.complete(item, worker_id, result["video_id"]):
+                    print(f"Part {item['part_num']} was already uploaded by another worker; "
+                          f"https://youtu.be/{result['video_id']} is a duplicate")
+                elif lease.lost:
+                    print(f"Part {item['part_num']} recorded although its lease had expired")
+            else:
+                queue.fail(item, worker_id, result["error"])
+
+    except KeyboardInterrupt:
+        print(f"\nWorker {worker_id} stopped by user.")
+
+    finally:
+        for source, vod_plan, artifacts, log_fields in sources.values():
+            source.close()
+            artifacts.cleanup()
+
+    instrumentation.print_summary()
+    return uploaded
@@ -0,0 +1,589 @@
+import contextlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .artifacts import job_artifacts
+from .config import PART_MAX_RETRIES, UPLOAD_CONCURRENCY
+from .instrumentation import Instrumentation
+from .integrity import verify_part
+from .joblog import job_log
+from .media import format_duration, needs_remux, remux_to_mp4
+from .plan import VodPlan, plan_part
+from .playlist import PartPlaylist
+from .retry import part_retry_wait
+from .slices import FileSlice, part_size
+from .thumbnail import make_part_thumbnail
+from .transcode import transcode_part
+from .youtube import get_youtube_service, set_thumbnail, upload_to_youtube
+
+# Optional post-processing: remux a part into a moov-first MP4
+def remux_part(part_file, base_file_name, attempt, artifacts):
+    """
+    Replace a part with a faststart MP4 if it is MPEG-TS or moov-last
+
+    Parts that are already clean (e.g. streamed through ffmpeg by the Twitch
+    source) are detected from their box headers and left alone.
+
+    Args:
+        part_file: Path to the fetched part
+        base_file_name: Base file name reserved for this part
+        attempt: Attempt number (1-based)
+        artifacts: ArtifactRegistry of the part
+
+    Returns:
+        str: Path of the file to upload
+    """
+    if not needs_remux(part_file):
+        return part_file
+
+    remuxed_file = remux_to_mp4(part_file, f"{base_file_name}_remux_{attempt}.mp4")
+    if not remuxed_file:
+        print("Remux failed, uploading the original file")
+        return part_file
+
+    artifacts.register(remuxed_file)
+    # The original is no longer needed; free the disk space right away
+    artifacts.release(part_file)
+    return remuxed_file
+
+# Fetch a part and run the optional local stages on it
+def prepare_part(source, part_num, start_time, duration, base_file_name, attempt, artifacts, instrumentation, progress=None):
+    """
+    Produce the file to upload for one part
+
+    Stages an earlier attempt already finished are recorded in progress and
+    skipped, so a failed remux, transcode or thumbnail restarts from that
+    stage with the fetched file instead of fetching the part again.
+
+    Args:
+        source: Source adapter producing the part file
+        part_num: Part number (1-based)
+        start_time: Start time in seconds
+        duration: Duration of this part in seconds
+        base_file_name: Base file name reserved for this part (in its scratch directory)
+        attempt: Attempt number (1-based)
+        artifacts: ArtifactRegistry every created file is registered with
+        instrumentation: Instrumentation collecting stage timings
+        progress: dict kept by the caller across attempts of this part:
+            the current file, its video info, the thumbnail and the set of
+            finished stages
+
+    Returns:
+        tuple: (file_path, video_info, thumbnail_path)
+    """
+    if progress is None:
+        progress = {}
+
+    if 'file' in progress:
+        print(f"Reusing already fetched file {progress['file']}")
+    else:
+        with instrumentation.stage("fetch", part_num=part_num, attempt=attempt) as record:
+            part_file, chunk_video_info, extra_files = source.fetch_part(
+                part_num, start_time, duration, base_file_name, attempt)
+            if not isinstance(part_file, FileSlice):
+                # A slice is a view of the source file, which the source cleans up itself
+                artifacts.register(part_file)
+            artifacts.register(*extra_files)
+            record["bytes"] = part_size(part_file)
+
+        if not isinstance(part_file, FileSlice):
+            # Fail a truncated or short part now rather than after a 40 GB upload
+            with instrumentation.stage("verify", part_num=part_num, attempt=attempt) as record:
+                record["bytes"] = part_size(part_file)
+                verify_part(part_file, duration if source.verify_duration else None)
+
+        # Only a verified part is worth resuming from
+        progress.update({'file': part_file, 'video_info': chunk_video_info, 'thumbnail': None, 'done': set()})
+
+    part_file = progress['file']
+    chunk_video_info = progress['video_info']
+    done = progress['done']
+
+    if source.remux and 'remux' not in done:
+        with instrumentation.stage("remux", part_num=part_num, attempt=attempt) as record:
+            record["bytes"] = os.path.getsize(part_file)
+            part_file = progress['file'] = remux_part(part_file, base_file_name, attempt, artifacts)
+        chunk_video_info["file_size_mb"] = os.path.getsize(part_file) / (1024*1024)
+        done.add('remux')
+
+    if source.transcode and 'transcode' not in done:
+        with instrumentation.stage("transcode", part_num=part_num, attempt=attempt) as record:
+            record["bytes"] = os.path.getsize(part_file)
+            transcoded_file = transcode_part(
+                part_file, f"{base_file_name}_transcode_{attempt}.mp4", source.transcode)
+        if transcoded_file:
+            artifacts.register(transcoded_file)
+            artifacts.release(part_file)
+            part_file = progress['file'] = transcoded_file
+            chunk_video_info["file_size_mb"] = os.path.getsize(part_file) / (1024*1024)
+        done.add('transcode')
+
+    if source.thumbnail and 'thumbnail' not in done:
+        # One seek into the part while it is still on disk
+        with instrumentation.stage("thumbnail", part_num=part_num, attempt=attempt):
+            thumbnail_path = make_part_thumbnail(source, part_file, base_file_name, duration)
+        if thumbnail_path:
+            artifacts.register(thumbnail_path)
+            progress['thumbnail'] = thumbnail_path
+        done.add('thumbnail')
+
+    return part_file, chunk_video_info, progress['thumbnail']
+
+# Function to process a single part with retry logic
+def process_part(source, part_num, total_parts, title, start_time, duration, description_base, tags, youtube_service, instrumentation=None, fetch_lock=None, plan=None, artifacts=None):
+    """
+    Fetch one part from a source and upload it, retrying the part on failure
+
+    Args:
+        source: Source adapter producing the part file
+        part_num: Part number (1-based)
+        total_parts: Total number of parts (None while a live stream is still recording)
+        title: Base title for the video
+        start_time: Start time in seconds
+        duration: Duration of this part in seconds
+        description_base: Base description for all parts
+        tags: Tags to apply to the video
+        youtube_service: YouTube API service object
+        instrumentation: Instrumentation collecting stage timings
+        fetch_lock: Lock held while the part is fetched, so concurrent parts
+            download one at a time and only their uploads overlap
+        plan: PartPlan from the video's VodPlan; computed here from the
+            other arguments if None
+        artifacts: ArtifactRegistry of this part, usually a scope of the
+            job's registry; a fresh scratch directory if None. It is
+            cleaned up when the part is done.
+
+    Returns:
+        dict: Dictionary with status (success/failed) and result (video_id or error)
+    """
+    if instrumentation is None:
+        instrumentation = Instrumentation()
+
+    if plan is None:
+        plan = plan_part(source, part_num, total_parts, title, start_time, duration, description_base, tags)
+    part_full_title = plan.title
+    part_description = plan.description
+    tags = plan.tags
+
+    print(f"\n{'='*50}")
+    print(f"Processing part {part_num} of {total_parts or 'ongoing stream'}")
+    print(f"Fetch chunk starting at {format_duration(start_time)} for {format_duration(duration)}")
+
+    # Every file of this part goes into the part's own scratch directory
+    if artifacts is None:
+        artifacts = job_artifacts(plan.base_file_name)
+
+    # The fetched part and its finished stages survive a failed attempt, so a
+    # retry resumes from the stage (or the upload) that failed
+    progress = {}
+
+    # Try to process this part up to PART_MAX_RETRIES times
+    attempt = 1
+    while attempt <= PART_MAX_RETRIES:
+        print(f"\nAttempt {attempt} of {PART_MAX_RETRIES} for part {part_num}")
+        # (Re)creates the scratch directory a failed attempt removed
+        base_file_name = artifacts.path(plan.base_file_name)
+
+        try:
+            with fetch_lock or contextlib.nullcontext(), job_log.context(part_num=part_num, attempt=attempt):
+                part_file, chunk_video_info, thumbnail_path = prepare_part(
+                    source, part_num, start_time, duration, base_file_name, attempt,
+                    artifacts, instrumentation, progress)
+
+            # Update description with technical info
+            tech_description = f"\n\nTechnical Information:\n"
+            if "quality" in chunk_video_info:
+                tech_description += f"Downloaded with Twitch quality setting: {chunk_video_info['quality']}\n"
+            tech_description += f"Video resolution: {chunk_video_info['resolution']}\n"
+            tech_description += f"File size: {chunk_video_info['file_size_mb']:.2f} MB\n"
+            tech_description += f"Segment: {format_duration(start_time)} to {format_duration(start_time + duration)}"
+
+            full_description = part_description + tech_description
+
+            # Upload this chunk
+            print(f"\nUploading part {part_num} to YouTube...")
+            with instrumentation.stage("upload", part_num=part_num, attempt=attempt) as record, job_log.context(part_num=part_num, attempt=attempt):
+                record["bytes"] = part_size(part_file)
+                video_id = upload_to_youtube(
+                    part_file,
+                    part_full_title,
+                    full_description,
+                    tags=tags,
+                    youtube_service=youtube_service,
+                    video_info=chunk_video_info,
+                    category_id=source.category_id,
+                    bandwidth_weight=source.bandwidth_weight
+                )
+
+
+            # Set the thumbnail right after the insert, with the same service
+            if thumbnail_path:
+                with instrumentation.stage("thumbnail_upload", part_num=part_num, attempt=attempt) as record:
+                    record["bytes"] = os.path.getsize(thumbnail_path)
+                    set_thumbnail(video_id, thumbnail_path, youtube_service)
+
+            # Clean up after successful upload
+            print("\nCleaning up temporary files...")
+            artifacts.cleanup()
+            job_log.event("part_uploaded", part_num=part_num, attempt=attempt, video_id=video_id, title=part_full_title)
+
+            # Return success result with video ID
+            return {
+                "status": "success",
+                "part_num": part_num,
+                "video_id": video_id,
+                "title": part_full_title
+            }
+
+        except Exception as e:
+            error_msg = f"Error in attempt {attempt} for part {part_num}: {str(e)}"
+            print(error_msg)
+            job_log.event("part_attempt_failed", part_num=part_num, attempt=attempt, error=str(e))
+
+            # The verified part and the outputs of finished stages are kept for the
+            # next attempt; anything else, including partial downloads, is removed
+            if 'file' not in progress or attempt >= PART_MAX_RETRIES:
+                artifacts.cleanup()
+            else:
+                artifacts.cleanup(keep=[path for path in (progress['file'], progress['thumbnail'])
+                                        if isinstance(path, str)])
+
+            # If we've reached max retries, return failure
+            if attempt >= PART_MAX_RETRIES:
+                return {
+                    "status": "failed",
+                    "part_num": part_num,
+                    "error": str(e),
+                    "title": part_full_title
+                }
+
+            # Wait before retrying
+            retry_wait = part_retry_wait(attempt)
+            print(f"Will retry part {part_num} in {retry_wait} seconds...")
+            time.sleep(retry_wait)
+
+            # Increment attempt counter
+            attempt += 1
+
+# Ask the user which parts to process
+def select_parts(splits):
+    """
+    Prompt for all parts or a comma-separated selection
+
+    Args:
+        splits: List of part durations
+
+    Returns:
+        list: 1-based part numbers, or None if the input was invalid
+    """
+    # Ask if user wants to process all parts or select specific ones
+    part_selection = input("\nProcess all parts sequentially or select specific parts? (a/s): ")
+    if part_selection.lower() != 's':
+        # Process all parts sequentially
+        return list(range(1, len(splits) + 1))
+
+    parts_input = input(f"Enter part numbers to process (comma-separated, 1-{len(splits)}): ")
+    try:
+        specific_parts = [int(part.strip()) for part in parts_input.split(',')]
+    except ValueError:
+        print("Invalid input. Please enter numbers separated by commas.")
+        return None
+
+    # Validate part numbers
+    for part in specific_parts:
+        if part < 1 or part > len(splits):
+            print(f"Invalid part number: {part}. Must be between 1 and {len(splits)}.")
+            return None
+    return specific_parts
+
+# Report final results
+def print_summary(part_results):
+    print("\n" + "="*70)
+    print("UPLOAD SUMMARY REPORT")
+    print("="*70)
+
+    successful_parts = [part for part in part_results if part["status"] == "success"]
+    failed_parts = [part for part in part_results if part["status"] == "failed"]
+
+    print(f"\nSuccessfully uploaded {len(successful_parts)} of {len(part_results)} processed parts")
+
+    if successful_parts:
+        print("\nSUCCESSFUL UPLOADS:")
+        for part in successful_parts:
+            print(f"Part {part['part_num']}: https://youtu.be/{part['video_id']} - {part['title']}")
+
+    if failed_parts:
+        print("\nFAILED UPLOADS:")
+        for part in failed_parts:
+            print(f"Part {part['part_num']}: FAILED - {part['title']}")
+            print(f"   Error: {part['error']}")
+
+    return successful_parts
+
+# Run parts one after another, asking what to do after a failure
+def run_parts_sequentially(run_part, part_nums, interactive):
+    """
+    Args:
+        run_part: Callable processing one part number and returning its result
+        part_nums: 1-based part numbers, in order
+        interactive: Ask whether to continue, retry or stop after a failure
+
+    Returns:
+        list: Result of every part that was run
+    """
+    part_results = []  # Store results for all parts
+
+    for part_index in part_nums:
+        result = run_part(part_index)
+        part_results.append(result)
+
+        # If this part failed, ask the user what to do
+        if result["status"] == "failed" and interactive:
+            print(f"\nPart {part_index} failed: {result['error']}")
+            action = input("Continue with next part, retry this part, or stop? (y/r/n): ")
+
+            if action.lower() == 'n':
+                print("Process stopped by user after failure.")
+                break
+            elif action.lower() == 'r':
+                print(f"Retrying part {part_index}...")
+                # Replace the failed result with the retry result
+                part_results[-1] = retry_result = run_part(part_index)
+
+                # If retry still failed, ask again
+                if retry_result["status"] == "failed":
+                    print(f"\nRetry of part {part_index} also failed: {retry_result['error']}")
+                    action = input("Continue with next part or stop? (y/n): ")
+                    if action.lower() != 'y':
+                        print("Process stopped by user after retry failure.")
+                        break
+            # If 'y', continue with next part (default behavior)
+
+    return part_results
+
+# Run parts on a pool, overlapping the uploads of independent parts
+def run_parts_concurrently(run_part, part_nums, concurrency, interactive):
+    """
+    Every part is a separate video, so parts can be uploaded side by side.
+    Parts are started in order and fetched one at a time (run_part holds
+    the fetch lock), so at most concurrency parts are on disk at once and
+    the next part downloads while the previous ones upload. Failed parts
+    can be retried together at the end.
+
+    Args:
+        run_part: Callable processing one part number and returning its result
+        part_nums: 1-based part numbers, in order
+        concurrency: Parts processed at the same time
+        interactive: Offer to retry failed parts once all have finished
+
+    Returns:
+        list: Result of every part, in part order
+    """
+    print(f"\nProcessing {len(part_nums)} parts with up to {concurrency} uploads at a time")
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="part") as pool:
+        part_results = list(pool.map(run_part, part_nums))
+
+        failed = [result["part_num"] for result in part_results if result["status"] == "failed"]
+        if failed and interactive:
+            for result in part_results:
+                if result["status"] == "failed":
+                    print(f"\nPart {result['part_num']} failed: {result['error']}")
+            action = input(f"Retry the {len(failed)} failed part(s)? (y/n): ")
+            if action.lower() == 'y':
+                retried = dict(zip(failed, pool.map(run_part, failed)))
+                part_results = [retried.get(result["part_num"], result) for result in part_results]
+
+    return part_results
+
+# Process every selected part of a source through the shared engine
+def process_source(source, youtube_service=None, specific_parts=None, interactive=True, playlist=False, upload_concurrency=UPLOAD_CONCURRENCY):
+    """
+    Split a source into parts and upload each one
+
+    This is the single place where the pipelines schedule work, so every
+    source shares the same concurrency, retry and instrumentation
+    behaviour. Parts are independent videos: with upload_concurrency > 1
+    they are fetched one at a time and up to that many uploads run at once,
+    each on its own connection.
+
+    Args:
+        source: Source adapter (Twitch VOD, HTTP object, ...)
+        youtube_service: YouTube API service object (created if None)
+        specific_parts: 1-based part numbers to process (all parts when
+            None and not interactive, otherwise prompted)
+        interactive: Prompt for confirmation and for what to do after a
+            failed part; when False every selected part is attempted once
+        playlist: Collect the parts of a multi-part upload into one playlist
+        upload_concurrency: Parts uploaded at the same time
+
+    Returns:
+        bool: True if at least one part was uploaded
+    """
+    instrumentation = Instrumentation()
+    try:
+        info = source.prepare()
+        title = info['title']
+        source.print_info(info)
+
+        # Split points, offsets and metadata of every part, computed once
+        vod_plan = VodPlan(source, info)
+        splits = vod_plan.splits
+        if len(splits) > 1:
+            print(f"\n{source.label.capitalize()} will be split into {len(splits)} parts due to length")
+            for i, split_duration in enumerate(splits):
+                print(f"  Part {i+1}: {format_duration(split_duration)}")
+
+        # Confirmation for processing specific parts or all parts
+        if specific_parts is None and not interactive:
+            specific_parts = list(range(1, len(splits) + 1))
+        elif specific_parts is None:
+            specific_parts = select_parts(splits)
+            if specific_parts is None:
+                return False
+
+        # Confirm with user
+        if interactive:
+            confirmation = input("\nProceed with download and upload? (y/n): ")
+            if confirmation.lower() != 'y':
+                print("Operation cancelled by user.")
+                return False
+
+        concurrent = upload_concurrency > 1 and len(specific_parts) > 1
+        fetch_lock = threading.Lock() if concurrent else None
+        if concurrent and youtube_service is None:
+            # One service for all threads rather than one login per part
+            youtube_service = get_youtube_service()
+
+        part_playlist = None
+        if playlist and len(splits) > 1:
+            part_playlist = PartPlaylist(
+                f"{source.label}:{info.get('url') or title}", title, vod_plan.description_base, youtube_service=youtube_service)
+
+        # One scratch directory per run, one subdirectory per part
+        artifacts = source.scratch(title)
+        log_fields = job_log.run_fields(source, info)
+        job_log.event("run_started", title=title, parts=specific_parts, total_parts=len(splits),
+                      duration=info['duration'], concurrency=upload_concurrency, **log_fields)
+
+        def run_part(part_index):
+            part = vod_plan.part(part_index)
+            with job_log.context(**log_fields):
+                result = process_part(
+                    source,
+                    part_num=part_index,
+                    total_parts=part.total_parts,
+                    title=title,
+                    start_time=part.start_time,
+                    duration=part.duration,
+                    description_base=vod_plan.description_base,
+                    tags=vod_plan.tags,
+                    youtube_service=youtube_service,
+                    instrumentation=instrumentation,
+                    fetch_lock=fetch_lock,
+                    plan=part,
+                    artifacts=artifacts.scope(f"part_{part_index}")
+                )
+            source.part_finished(part_index, result)
+            if part_playlist and result["status"] == "success":
+                part_playlist.add(part_index, result["video_id"])
+            return result
+
+        # Process the selected parts
+        if concurrent:
+            part_results = run_parts_concurrently(run_part, specific_parts, upload_concurrency, interactive)
+        else:
+            part_results = run_parts_sequentially(run_part, specific_parts, interactive)
+
+        if part_playlist:
+            part_playlist.finalize()
+
+        successful_parts = print_summary(part_results)
+        instrumentation.print_summary()
+        job_log.event("run_finished", uploaded=len(successful_parts), failed=len(part_results) - len(successful_parts), **log_fields)
+        return len(successful_parts) > 0
+
+    except Exception as e:
+        print(f"\nError processing {source.label}: {str(e)}")
+        return False
+
+    finally:
+        source.close()
+        if source.artifacts is not None:
+            source.artifacts.cleanup()
+
+# Upload the parts of a live stream while it is still being recorded
+def process_live_source(source, youtube_service=None, playlist=False):
+    """
+    Upload every part of a live recording as soon as it is finished
+
+    The recorder keeps running in its own processes while the engine uploads,
+    so part 1 is on YouTube long before the broadcast ends.
+
+    Args:
+        source: LiveStreamSource (or any source with wait_for_part)
+        youtube_service: YouTube API service object (created if None)
+        playlist: Collect the parts into one playlist as they are uploaded
+
+    Returns:
+        bool: True if at least one part was uploaded
+    """
+    instrumentation = Instrumentation()
+    part_results = []
+    part_playlist = None
+    try:
+        info = source.prepare()
+        source.print_info(info)
+        description_base = source.description_base(info)
+        tags = source.tags(info)
+        artifacts = source.scratch(f"{info['title']}_live")
+        log_fields = job_log.run_fields(source, info)
+        job_log.event("run_started", title=info['title'], live=True, **log_fields)
+        if playlist:
+            part_playlist = PartPlaylist(
+                f"{source.label}:{info['url']}:{info['created_at']}", info['title'], description_base, youtube_service=youtube_service)
+
+        part_num = 1
+        while True:
+            print(f"\nWaiting for part {part_num} to finish recording...")
+            if not source.wait_for_part(part_num):
+                print("Stream ended.")
+                break
+
+            with job_log.context(**log_fields):
+                result = process_part(
+                    source,
+                    part_num=part_num,
+                    total_parts=None,
+                    title=info['title'],
+                    start_time=(part_num - 1) * source.part_duration,
+                    duration=source.part_duration,
+                    description_base=description_base,
+                    tags=tags,
+                    youtube_service=youtube_service,
+                    instrumentation=instrumentation,
+                    artifacts=artifacts.scope(f"part_{part_num}")
+                )
+            source.part_finished(part_num, result)
+            if part_playlist and result["status"] == "success":
+                part_playlist.add(part_num, result["video_id"])
+            part_results.append(result)
+            part_num += 1
+
+    except KeyboardInterrupt:
+        print("\nLive capture stopped by user.")
+    except Exception as e:
+        print(f"\nError processing {source.label}: {str(e)}")
+
+    finally:
+        source.close()
+        if source.artifacts is not None:
+            source.artifacts.cleanup()
+
+    if part_playlist:
+        part_playlist.finalize()
+
+    successful_parts = print_summary(part_results)
+    instrumentation.print_summary()
+    return len(successful_parts) > 0
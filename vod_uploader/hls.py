@@ -0,0 +1,485 @@
+import re
+import subprocess
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlparse
+
+import requests
+
+from .config import HLS_BUFFER_BYTES, HLS_PREFETCH_SEGMENTS, TRANSFER_RATE_WINDOW
+from .media import mp4_output_args
+from .joblog import job_log
+from .process import FFMPEG_PROGRESS_ARGS, ManagedProcess, ProcessError, ffmpeg_progress_handler
+from .progress import progress_bus
+from .ratelimit import ingress
+from .retry import HttpStatusError, RetryPolicy
+from .segmentcache import format_cache_stats, get_segment_cache
+from .watchdog import ThroughputWatchdog
+
+# Bytes read from a segment response at a time
+HLS_READ_SIZE = 256 * 1024
+# Buffer space kept free for the segment the writer is waiting on
+HEAD_RESERVE = 4 * HLS_READ_SIZE
+HLS_ATTRIBUTE_PATTERN = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
+
+# A playlist this engine cannot download (the caller falls back to streamlink)
+class HlsError(Exception):
+    pass
+
+# Raised in fetch threads once the download has failed elsewhere
+class PrefetchCancelled(Exception):
+    pass
+
+# Parse the attribute list of an HLS tag, e.g. URI="init.mp4",BYTERANGE="..."
+def parse_attributes(value):
+    return {key: item.strip('"') for key, item in HLS_ATTRIBUTE_PATTERN.findall(value)}
+
+# Read a media playlist into segments with their position on the timeline
+def parse_media_playlist(text, base_url):
+    """
+    Parse an HLS playlist
+
+    Args:
+        text: Playlist contents
+        base_url: URL the playlist was loaded from (segment URIs are relative)
+
+    Returns:
+        tuple: (segments, init_url, variant_url). segments is a list of
+        {'url', 'start', 'duration'} dicts; variant_url is set instead
+        when the playlist is a master playlist
+
+    Raises:
+        HlsError: For encrypted or byte-range playlists
+    """
+    segments = []
+    init_url = None
+    duration = None
+    position = 0.0
+    master = False
+
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith('#EXT-X-STREAM-INF'):
+            master = True
+        elif line.startswith('#EXTINF:'):
+            duration = float(line[len('#EXTINF:'):].split(',')[0])
+        elif line.startswith('#EXT-X-MAP:'):
+            attributes = parse_attributes(line[len('#EXT-X-MAP:'):])
+            if 'BYTERANGE' in attributes:
+                raise HlsError("byte-range init segments are not supported")
+            init_url = urljoin(base_url, attributes['URI'])
+        elif line.startswith('#EXT-X-BYTERANGE'):
+            raise HlsError("byte-range segments are not supported")
+        elif line.startswith('#EXT-X-KEY:'):
+            if parse_attributes(line[len('#EXT-X-KEY:'):]).get('METHOD', 'NONE') != 'NONE':
+                raise HlsError("encrypted segments are not supported")
+        elif line and not line.startswith('#'):
+            if master:
+                # The first variant; callers normally pass a media playlist already
+                return [], None, urljoin(base_url, line)
+            segments.append({'url': urljoin(base_url, line), 'start': position, 'duration': duration or 0.0})
+            position += duration or 0.0
+            duration = None
+
+    return segments, init_url, None
+
+# Load a media playlist, following a master playlist to its first variant
+def load_media_playlist(playlist_url):
+    policy = RetryPolicy(urlparse(playlist_url).netloc or "hls")
+
+    def request_playlist(url):
+        response = requests.get(url, timeout=TRANSFER_RATE_WINDOW)
+        if response.status_code != 200:
+            raise HttpStatusError(response.status_code, f"Playlist request failed: {url}")
+        return response.text
+
+    segments, init_url, variant_url = parse_media_playlist(policy.call(request_playlist, playlist_url), playlist_url)
+    if variant_url:
+        segments, init_url, variant_url = parse_media_playlist(policy.call(request_playlist, variant_url), variant_url)
+    if not segments:
+        raise HlsError(f"No segments in playlist {playlist_url}")
+    return segments, init_url
+
+# Segments covering a time window, the way streamlink's --hls-start-offset/--hls-duration pick them
+def select_segments(segments, start_time, duration):
+    end_time = start_time + duration
+    return [
+        segment for segment in segments
+        if segment['start'] + segment['duration'] > start_time and segment['start'] < end_time
+    ]
+
+# Received but unwritten data of one segment
+class SegmentBuffer:
+    def __init__(self, index, url, cache_entry=None):
+        self.index = index
+        self.url = url
+        self.chunks = []
+        self.received = 0  # Bytes handed to the buffer so far (kept across retries)
+        self.checksum = 0  # CRC32 of those bytes
+        self.done = False
+        self.complete = False  # Fetched in full, from the network or the cache
+        # {'checksum', 'size'} from the time index (None values if never fetched), or None if not cached
+        self.cache_entry = cache_entry
+        self.cache_writer = None
+
+# Fetches segments in parallel and writes them in order through a bounded buffer
+class HlsPrefetcher:
+    """
+    Sliding-window HLS download with a hard cap on buffered bytes
+
+    Up to max_in_flight segments are fetched at once, each through the
+    retry engine and its own throughput watchdog. Their data goes into one
+    shared buffer of at most max_buffer_bytes, which a single writer thread
+    drains in segment order, so a slow disk never stalls the network side
+    (until the buffer is full) and a slow segment never stalls the disk
+    (while later segments keep arriving).
+
+    Segments ahead of the writer may only fill the buffer up to
+    max_buffer_bytes - HEAD_RESERVE; the rest is kept for the segment the
+    writer is waiting on, so the window can never deadlock.
+
+    All fetch threads of one download share one ingress lane, so a part
+    gets one fair share of INGRESS_RATE_LIMIT however many segments it
+    has in flight.
+
+    With a segment cache, segments whose address is known are read from
+    local disk instead of the network, and every other cacheable segment
+    is written to the cache as it streams in.
+    """
+
+    def __init__(self, urls, sink, max_in_flight=HLS_PREFETCH_SEGMENTS, max_buffer_bytes=HLS_BUFFER_BYTES, job=None,
+                 cache=None, cache_namespace=None, cache_entries=None, weight=1):
+        cache_entries = cache_entries or [None] * len(urls)
+        self.buffers = [SegmentBuffer(index, url, entry) for index, (url, entry) in enumerate(zip(urls, cache_entries))]
+        self.cache = cache
+        self.cache_namespace = cache_namespace
+        self.cached_bytes = 0
+        self.sink = sink
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_buffer_bytes = max(max_buffer_bytes, 2 * HEAD_RESERVE)
+        self.job = job
+        self.condition = threading.Condition()
+        self.head = 0
+        self.error = None
+        self.buffered = 0
+        self.peak_buffered = 0
+        self.downloaded = 0
+        self.written = 0
+        self.write_seconds = 0.0
+        self.in_flight = 0
+        self.started = None
+        self.sessions = threading.local()
+        self.lane = ingress.lane(job or "hls", 'segments', weight)
+
+    def session(self):
+        # One connection pool per fetch thread
+        if not hasattr(self.sessions, 'session'):
+            self.sessions.session = requests.Session()
+        return self.sessions.session
+
+    def fail(self, error):
+        with self.condition:
+            if self.error is None:
+                self.error = error
+            self.condition.notify_all()
+
+    def put(self, buffer, chunk, from_cache=False):
+        with self.condition:
+            while True:
+                if self.error is not None:
+                    raise PrefetchCancelled()
+                limit = self.max_buffer_bytes if buffer.index == self.head else self.max_buffer_bytes - HEAD_RESERVE
+                if self.buffered + len(chunk) <= limit:
+                    break
+                self.condition.wait()
+            buffer.chunks.append(chunk)
+            buffer.received += len(chunk)
+            buffer.checksum = zlib.crc32(chunk, buffer.checksum)
+            self.buffered += len(chunk)
+            if from_cache:
+                self.cached_bytes += len(chunk)
+            else:
+                self.downloaded += len(chunk)
+            self.peak_buffered = max(self.peak_buffered, self.buffered)
+            self.condition.notify_all()
+
+    def fetch_attempt(self, buffer):
+        # A retry re-reads the segment and skips what an earlier attempt already buffered
+        skip = buffer.received
+        watchdog = ThroughputWatchdog(f"segment {buffer.index}", slack=HLS_READ_SIZE)
+        response = self.session().get(buffer.url, stream=True, timeout=TRANSFER_RATE_WINDOW)
+        try:
+            if response.status_code != 200:
+                raise HttpStatusError(response.status_code, f"Segment request failed: {buffer.url}")
+            expected = int(response.headers.get('content-length', 0))
+            position = 0
+            for chunk in response.iter_content(chunk_size=HLS_READ_SIZE):
+                if not chunk:
+                    continue
+                chunk_start = position
+                position += len(chunk)
+                watchdog.update(position)
+                watchdog.check()
+                self.lane.acquire(len(chunk), watchdog)
+                if position <= skip:
+                    continue
+                data = chunk[max(skip - chunk_start, 0):]
+                if buffer.cache_writer is not None:
+                    buffer.cache_writer.write(data)
+                self.put(buffer, data)
+            if expected and position < expected:
+                raise IOError(f"Segment {buffer.index} closed after {position} of {expected} bytes")
+        finally:
+            response.close()
+
+    def fetch_cached(self, buffer):
+        """
+        Serve a segment from the cache
+
+        Returns:
+            bool: True on a hit; on a miss the download is set up to fill the cache
+        """
+        entry = buffer.cache_entry
+        if self.cache is None or entry is None:
+            return False
+        data = None
+        if entry['checksum'] is not None:
+            data = self.cache.get(self.cache_namespace, entry['checksum'], entry['size'])
+        else:
+            # Never downloaded, so its address is not known yet
+            self.cache.count('misses')
+        if data is None:
+            buffer.cache_writer = self.cache.writer(self.cache_namespace)
+            return False
+        for offset in range(0, len(data), HLS_READ_SIZE):
+            self.put(buffer, data[offset:offset + HLS_READ_SIZE], from_cache=True)
+        return True
+
+    def fetch(self, buffer):
+        with self.condition:
+            if self.error is not None:
+                return
+            self.in_flight += 1
+        try:
+            if self.fetch_cached(buffer):
+                buffer.complete = True
+            else:
+                RetryPolicy(urlparse(buffer.url).netloc or "hls").call(self.fetch_attempt, buffer)
+                buffer.complete = True
+                if buffer.cache_writer is not None:
+                    buffer.cache_writer.commit(buffer.checksum, buffer.received)
+                    buffer.cache_writer = None
+        except PrefetchCancelled:
+            pass
+        except Exception as e:
+            self.fail(e)
+        finally:
+            if buffer.cache_writer is not None:
+                buffer.cache_writer.abort()
+            with self.condition:
+                self.in_flight -= 1
+                buffer.done = True
+                self.condition.notify_all()
+
+    def write_all(self):
+        try:
+            for buffer in self.buffers:
+                while True:
+                    with self.condition:
+                        while not buffer.chunks and not buffer.done and self.error is None:
+                            self.condition.wait()
+                        if self.error is not None:
+                            return
+                        chunks, buffer.chunks = buffer.chunks, []
+                        done = buffer.done
+
+                    size = sum(len(chunk) for chunk in chunks)
+                    write_started = time.monotonic()
+                    for chunk in chunks:
+                        self.sink.write(chunk)
+                    with self.condition:
+                        self.write_seconds += time.monotonic() - write_started
+                        self.buffered -= size
+                        self.written += size
+                        self.condition.notify_all()
+                    if self.job:
+                        progress_bus.publish(self.job, self.written)
+                    if done:
+                        break
+
+                with self.condition:
+                    self.head += 1
+                    self.condition.notify_all()
+        except Exception as e:
+            self.fail(e)
+
+    def stats(self):
+        """
+        Memory and throughput of the download so far
+
+        Returns:
+            dict: Segment counts, buffered/peak/limit bytes, bytes downloaded
+            and written, network rate and disk write rate in bytes/s
+        """
+        with self.condition:
+            elapsed = time.monotonic() - self.started if self.started else 0
+            return {
+                'segments_total': len(self.buffers),
+                'segments_written': self.head,
+                'in_flight': self.in_flight,
+                'buffered_bytes': self.buffered,
+                'peak_buffered_bytes': self.peak_buffered,
+                'max_buffer_bytes': self.max_buffer_bytes,
+                'downloaded_bytes': self.downloaded,
+                'cached_bytes': self.cached_bytes,
+                'written_bytes': self.written,
+                'network_rate': self.downloaded / elapsed if elapsed else 0,
+                'write_rate': self.written / self.write_seconds if self.write_seconds else 0
+            }
+
+    def run(self):
+        """
+        Download every segment into the sink
+
+        Returns:
+            dict: Final stats()
+
+        Raises:
+            Exception: The first error of any fetch or of the writer
+        """
+        self.started = time.monotonic()
+        writer = threading.Thread(target=self.write_all, name="hls-writer", daemon=True)
+        writer.start()
+        pool = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="hls-fetch")
+        try:
+            for buffer in self.buffers:
+                pool.submit(self.fetch, buffer)
+            writer.join()
+        except KeyboardInterrupt:
+            self.fail(KeyboardInterrupt())
+            raise
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+            if self.job:
+                progress_bus.finish(self.job)
+
+        if self.error is not None:
+            raise self.error
+        return self.stats()
+
+# Describe prefetch stats in one line
+def format_stats(stats):
+    mb = 1024 * 1024
+    cached = f" ({stats['cached_bytes'] / mb:.1f} MB from cache)" if stats.get('cached_bytes') else ""
+    return (f"{stats['segments_written']}/{stats['segments_total']} segments, "
+            f"{stats['written_bytes'] / mb:.1f} MB written{cached}, "
+            f"peak buffer {stats['peak_buffered_bytes'] / mb:.1f}/{stats['max_buffer_bytes'] / mb:.0f} MB, "
+            f"network {stats['network_rate'] / mb:.2f} MB/s, disk {stats['write_rate'] / mb:.2f} MB/s")
+
+# Download a time window of an HLS stream to a file
+def download_hls(playlist_url, start_time, duration, output_path, remux=False,
+                 max_in_flight=HLS_PREFETCH_SEGMENTS, max_buffer_bytes=HLS_BUFFER_BYTES, job=None, index=None, weight=1):
+    """
+    Fetch the segments covering a time window with the prefetcher
+
+    The segments are written back to back, like streamlink's output. With
+    remux the writer feeds an ffmpeg remux to a moov-first fragmented MP4
+    instead of the file.
+
+    With a time index that already holds this playlist's segments, the
+    playlist is not loaded again and the window is found by binary search;
+    otherwise the playlist is loaded once and stored in the index. The byte
+    size and CRC32 of every downloaded segment are recorded in the index as
+    well, which is what addresses the segment in the segment cache (see
+    SEGMENT_CACHE_BYTES) the next time the window is needed; segments that
+    finished are recorded even if the download as a whole fails.
+
+    Args:
+        playlist_url: Media (or master) playlist URL
+        start_time: Window start in seconds
+        duration: Window length in seconds
+        output_path: File to write
+        remux: Remux through ffmpeg while downloading
+        max_in_flight: Segments fetched at once
+        max_buffer_bytes: Hard cap on buffered segment data
+        job: Progress bus job for the bytes written, or None
+        index: TimeIndex of this VOD and quality, or None
+        weight: Bandwidth weight of the job (see BandwidthManager.lane)
+
+    Returns:
+        dict: Prefetch stats
+
+    Raises:
+        HlsError: If the playlist cannot be handled here
+    """
+    if index is not None and index.playlist_url == playlist_url and index.covers(start_time + duration):
+        print(f"Using the time index of {index.segment_count} segment(s), no playlist reload")
+    else:
+        segments, init_url = load_media_playlist(playlist_url)
+        if index is None:
+            selected = select_segments(segments, start_time, duration)
+        else:
+            index.set_segments(playlist_url, segments, init_url)
+            index.save()
+
+    if index is not None:
+        indexes = index.segment_range(start_time, duration)
+        selected = index.segments(indexes)
+        init_url = index.init_url
+        fetched = index.fetched_count(indexes)
+        if fetched:
+            print(f"{fetched} of {len(indexes)} segment(s) were downloaded before")
+    if not selected:
+        raise HlsError(f"No segments between {start_time}s and {start_time + duration}s")
+    urls = ([init_url] if init_url else []) + [segment['url'] for segment in selected]
+    print(f"Prefetching {len(selected)} segment(s), {max_in_flight} in flight, "
+          f"buffer capped at {max_buffer_bytes / (1024 * 1024):.0f} MB")
+
+    # Segments of an indexed VOD go through the shared segment cache, if enabled
+    cache = get_segment_cache() if index is not None else None
+    cache_options = {}
+    if cache is not None:
+        cache_options = {
+            'cache': cache,
+            'cache_namespace': index.key,
+            'cache_entries': ([None] if init_url else []) + [
+                {'checksum': segment['checksum'], 'size': segment['size']} if index.is_fetched(i)
+                else {'checksum': None, 'size': None}
+                for i, segment in zip(indexes, selected)
+            ]
+        }
+
+    prefetcher = None
+    try:
+        if not remux:
+            with open(output_path, 'wb') as sink:
+                prefetcher = HlsPrefetcher(urls, sink, max_in_flight, max_buffer_bytes, job, weight=weight, **cache_options)
+                stats = prefetcher.run()
+        else:
+            ffmpeg_cmd = ['ffmpeg', '-y', '-loglevel', 'warning', '-i', 'pipe:0'] + mp4_output_args(fragmented=True) + FFMPEG_PROGRESS_ARGS + [output_path]
+            ffmpeg = ManagedProcess(ffmpeg_cmd, stdin=subprocess.PIPE, on_line=ffmpeg_progress_handler())
+            try:
+                prefetcher = HlsPrefetcher(urls, ffmpeg.process.stdin, max_in_flight, max_buffer_bytes, job, weight=weight, **cache_options)
+                stats = prefetcher.run()
+                ffmpeg.process.stdin.close()
+                if ffmpeg.process.wait() != 0:
+                    raise ProcessError(ffmpeg.poll(), ffmpeg.cmd, stderr_tail=ffmpeg.stderr_tail)
+            finally:
+                ffmpeg.terminate()
+    finally:
+        if index is not None and prefetcher is not None:
+            # Also after a failure: the segments that did arrive are in the cache,
+            # and only their size and CRC32 in the index let the retry find them
+            media_buffers = prefetcher.buffers[1:] if init_url else prefetcher.buffers
+            completed = [(i, buffer) for i, buffer in zip(indexes, media_buffers) if buffer.complete]
+            if completed:
+                index.record_segments([i for i, buffer in completed], [buffer.received for i, buffer in completed],
+                                      [buffer.checksum for i, buffer in completed])
+                index.save()
+    print(f"Prefetch finished: {format_stats(stats)}")
+    job_log.event("hls_prefetch", **stats)
+    if cache is not None:
+        print(f"Segment cache: {format_cache_stats(cache.stats())}")
+    return stats
@@ -0,0 +1,70 @@
+import time
+from contextlib import contextmanager
+
+from .joblog import job_log
+
+# Collects wall time and byte counts per pipeline stage
+class Instrumentation:
+    """
+    Records how long each stage (download, split, upload, ...) takes
+
+    Every stage run by the engine goes through stage(), so throughput is
+    measured in one place regardless of which source produced the part.
+    Each record is also written to the job log as a "stage" event, which
+    job_log_report.py aggregates across runs.
+    """
+
+    def __init__(self):
+        self.records = []
+
+    @contextmanager
+    def stage(self, name, **context):
+        """
+        Time a block of work as one stage
+
+        Args:
+            name: Stage name, e.g. "download" or "upload"
+            **context: Extra fields stored with the record (part_num, attempt, ...)
+
+        Yields:
+            dict: The record; callers may set record["bytes"] inside the block
+        """
+        record = {"stage": name, "status": "success", "bytes": 0}
+        record.update(context)
+        start = time.monotonic()
+        try:
+            yield record
+        except BaseException:
+            record["status"] = "failed"
+            raise
+        finally:
+            record["seconds"] = time.monotonic() - start
+            self.records.append(record)
+            job_log.event("stage", **record)
+
+    def totals(self):
+        """
+        Aggregate the recorded stages
+
+        Returns:
+            dict: stage name -> {"count", "seconds", "bytes"}
+        """
+        totals = {}
+        for record in self.records:
+            entry = totals.setdefault(record["stage"], {"count": 0, "seconds": 0.0, "bytes": 0})
+            entry["count"] += 1
+            entry["seconds"] += record["seconds"]
+            entry["bytes"] += record.get("bytes") or 0
+        return totals
+
+    def print_summary(self):
+        totals = self.totals()
+        if not totals:
+            return
+        print("\nSTAGE TIMINGS:")
+        for name, entry in totals.items():
+            line = f"{name}: {entry['count']} run(s), {entry['seconds']:.1f}s"
+            if entry["bytes"] and entry["seconds"] > 0:
+                rate = entry["bytes"] / (1024 * 1024) / entry["seconds"]
+                line += f", {entry['bytes'] / (1024 * 1024):.2f} MB at {rate:.2f} MB/s"
+            print(line)
@@ -0,0 +1,224 @@
+import base64
+import hashlib
+import os
+import re
+import subprocess
+
+try:
+    import google_crc32c
+except ImportError:
+    google_crc32c = None
+
+from .media import is_mpegts, mp4_box_offsets
+from .process import check_output
+
+# Parts shorter than expected by more than this are treated as truncated
+DURATION_TOLERANCE_SECONDS = 30
+DURATION_TOLERANCE_RATIO = 0.02
+# S3 multipart uploads use whole MiB part sizes; these are the usual client defaults
+MIB = 1024 * 1024
+COMMON_PART_SIZES_MIB = (8, 5, 16, 15, 64, 100)
+# A plain or multipart S3 ETag: hex MD5, optionally followed by -<parts>
+S3_ETAG_PATTERN = re.compile(r'^([0-9a-f]{32})(?:-(\d+))?$')
+
+# A file that failed verification; retriable, since a new transfer may succeed
+class IntegrityError(IOError):
+    pass
+
+# Checksums updated chunk by chunk while a download streams to disk
+class StreamingChecksum:
+    """
+    MD5 (plain and S3 multipart style) and CRC32C of a byte stream
+
+    Every byte is hashed once, as it is written, so verification never
+    needs a second read of the file. The part size of a multipart upload is
+    not in the response, so the multipart ETag is computed for each
+    plausible part size.
+    """
+
+    def __init__(self, multipart_sizes=()):
+        self.multipart_sizes = list(multipart_sizes)
+        self.reset()
+
+    def reset(self):
+        self.size = 0
+        self.md5 = hashlib.md5()
+        self.crc32c = google_crc32c.Checksum() if google_crc32c else None
+        # part size -> [finished part digests, current part md5, bytes in current part]
+        self.parts = {part_size: [[], hashlib.md5(), 0] for part_size in self.multipart_sizes}
+
+    def update(self, chunk):
+        self.size += len(chunk)
+        self.md5.update(chunk)
+        if self.crc32c is not None:
+            self.crc32c.update(chunk)
+
+        for part_size, state in self.parts.items():
+            view = memoryview(chunk)
+            while view:
+                take = min(len(view), part_size - state[2])
+                state[1].update(view[:take])
+                state[2] += take
+                view = view[take:]
+                if state[2] == part_size:
+                    state[0].append(state[1].digest())
+                    state[1] = hashlib.md5()
+                    state[2] = 0
+
+    def s3_etags(self):
+        if not self.parts:
+            return [self.md5.hexdigest()]
+        etags = []
+        for digests, part_md5, filled in self.parts.values():
+            digests = digests + ([part_md5.digest()] if filled else [])
+            etags.append(f"{hashlib.md5(b''.join(digests)).hexdigest()}-{len(digests)}")
+        return etags
+
+    def crc32c_base64(self):
+        if self.crc32c is None:
+            return None
+        return base64.b64encode(self.crc32c.digest()).decode('ascii')
+
+# Part sizes an S3 multipart upload of this size and part count may have used
+def multipart_part_sizes(total_size, parts, limit=4):
+    """
+    Whole-MiB part sizes that give exactly parts parts, common ones first
+
+    Returns:
+        list: Up to limit candidate part sizes in bytes
+    """
+    if parts < 2:
+        return []
+    smallest = -(-total_size // parts)
+    smallest = -(-smallest // MIB) * MIB
+    largest = (total_size - 1) // (parts - 1)
+    candidates = [size * MIB for size in COMMON_PART_SIZES_MIB if smallest <= size * MIB <= largest]
+    if smallest <= largest and smallest not in candidates:
+        candidates.append(smallest)
+    return candidates[:limit]
+
+# Build a checksum and the expected values from an HTTP/S3 response
+def checksum_for_response(headers, total_size):
+    """
+    Decide what can be verified for a download from its response headers
+
+    Args:
+        headers: Response headers of the (first) GET
+        total_size: Size of the whole object in bytes, 0 if unknown
+
+    Returns:
+        tuple: (StreamingChecksum, expected) where expected holds the
+        'etag' and/or 'crc32c' values to compare against; empty if the
+        server sent nothing usable
+    """
+    expected = {}
+    multipart_sizes = []
+
+    etag = headers.get('ETag', '').strip('"')
+    match = S3_ETAG_PATTERN.match(etag)
+    # With SSE-KMS/SSE-C the ETag is not an MD5 of the data
+    encryption = headers.get('x-amz-server-side-encryption', 'AES256')
+    if match and encryption == 'AES256':
+        if match.group(2):
+            multipart_sizes = multipart_part_sizes(total_size, int(match.group(2))) if total_size else []
+            if multipart_sizes:
+                expected['etag'] = etag
+                # Only a definite mismatch if the part size could not be anything else
+                expected['etag_exact'] = len(multipart_sizes) == 1
+        else:
+            expected['etag'] = etag
+            expected['etag_exact'] = True
+
+    crc32c = headers.get('x-amz-checksum-crc32c')
+    if crc32c and '-' not in crc32c and google_crc32c:
+        expected['crc32c'] = crc32c
+
+    return StreamingChecksum(multipart_sizes), expected
+
+# Compare a finished download with what the server promised
+def verify_checksum(checksum, expected, label):
+    verified = []
+    if 'crc32c' in expected:
+        if checksum.crc32c_base64() != expected['crc32c']:
+            raise IntegrityError(f"{label}: CRC32C {checksum.crc32c_base64()} does not match {expected['crc32c']}")
+        verified.append('CRC32C')
+
+    if 'etag' in expected:
+        if expected['etag'] in checksum.s3_etags():
+            verified.append('ETag')
+        elif expected['etag_exact']:
+            raise IntegrityError(f"{label}: MD5 {checksum.s3_etags()[0]} does not match ETag {expected['etag']}")
+        else:
+            print(f"{label}: multipart ETag not verified (uploaded with an unusual part size)")
+
+    if verified:
+        print(f"{label}: checksum verified ({', '.join(verified)})")
+
+# Check the container structure without decoding anything
+def probe_container(video_path):
+    """
+    Catch truncated files from their container layout alone
+
+    MP4: the top-level boxes must tile the file exactly and include a moov
+    and media data. MPEG-TS: the size must be a whole number of packets and
+    the first and last packets must start with the sync byte.
+
+    Raises:
+        IntegrityError: If the file is empty, truncated or unrecognised
+    """
+    file_size = os.path.getsize(video_path)
+    if file_size == 0:
+        raise IntegrityError(f"{video_path} is empty")
+
+    if is_mpegts(video_path):
+        with open(video_path, 'rb') as f:
+            f.seek(file_size - file_size % 188 - 188)
+            last_sync = f.read(1)
+        if file_size % 188 or last_sync != b'\x47':
+            raise IntegrityError(f"{video_path} is a truncated MPEG-TS file ({file_size} bytes)")
+        return
+
+    boxes = mp4_box_offsets(video_path, limit=None)
+    box_types = [box_type for box_type, offset, size in boxes]
+    if not boxes or box_types[0] not in ('ftyp', 'styp'):
+        raise IntegrityError(f"{video_path} is neither MP4 nor MPEG-TS")
+    box_type, offset, size = boxes[-1]
+    if offset + size != file_size:
+        raise IntegrityError(f"{video_path} is truncated: '{box_type}' box ends at {offset + size} of {file_size} bytes")
+    if 'moov' not in box_types or not ('mdat' in box_types or 'moof' in box_types):
+        raise IntegrityError(f"{video_path} has no moov or media data")
+
+# Read the container duration (header only)
+def probe_duration(video_path):
+    cmd = ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'default=noprint_wrappers=1:nokey=1', video_path]
+    output = check_output(cmd).strip()
+    return float(output) if output not in ('', 'N/A') else None
+
+# Fast sanity check of a part before it is uploaded
+def verify_part(video_path, expected_duration=None):
+    """
+    Verify a part in seconds instead of finding out after the upload
+
+    Args:
+        video_path: Part file
+        expected_duration: Seconds the part should cover (HLS segments
+            missing from a download show up as a shortfall), or None
+
+    Returns:
+        float: Probed duration in seconds (None if unknown)
+
+    Raises:
+        IntegrityError: If the part is truncated or too short
+    """
+    probe_container(video_path)
+    try:
+        duration = probe_duration(video_path)
+    except (subprocess.CalledProcessError, ValueError) as e:
+        raise IntegrityError(f"ffprobe could not read {video_path}: {str(e)}")
+
+    if expected_duration and duration is not None:
+        tolerance = max(DURATION_TOLERANCE_SECONDS, expected_duration * DURATION_TOLERANCE_RATIO)
+        if duration < expected_duration - tolerance:
+            raise IntegrityError(
+                f"{video_path} covers {duration:.0f}s of the expected {expected_duration:.0f}s; segments are missing")
+    return duration
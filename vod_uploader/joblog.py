@@ -0,0 +1,281 @@
+import atexit
+import collections
+import contextlib
+import contextvars
+import glob
+import json
+import os
+import queue
+import re
+import socket
+import threading
+import time
+import uuid
+
+from .config import JOB_LOG_BACKUPS, JOB_LOG_DIR, JOB_LOG_FLUSH_INTERVAL, JOB_LOG_MAX_BYTES, JOB_LOG_OPEN_FILES
+
+# Fields attached to every event logged from the current thread (job, vod_id, part_num, attempt, ...)
+_log_context = contextvars.ContextVar('job_log_context', default={})
+
+# Characters not allowed in a job log file name
+UNSAFE_NAME_PATTERN = re.compile(r'[^\w\-\.]+')
+
+# File name of the log of a job
+def job_log_name(job):
+    return UNSAFE_NAME_PATTERN.sub('_', str(job)).strip('_') or "default"
+
+# Glob pattern of job log file names from a job pattern, e.g. "twitch:*" -> "twitch_*"
+def job_log_pattern(job):
+    pattern = "*".join(UNSAFE_NAME_PATTERN.sub('_', piece) for piece in str(job).split('*'))
+    # Strip like job_log_name(), but only at ends that are not wildcards
+    if not pattern.startswith('*'):
+        pattern = pattern.lstrip('_')
+    if not pattern.endswith('*'):
+        pattern = pattern.rstrip('_')
+    return pattern or "default"
+
+# Buffered, rotating JSON-lines log with one file per job
+class JobLog:
+    """
+    Structured log of what every job did, for analysis across runs
+
+    event() only puts the record on a SimpleQueue, so logging from a
+    transfer or the engine never waits on disk. A daemon writer thread
+    drains the queue every flush_interval seconds and appends the batch
+    to <directory>/<job>.jsonl, one JSON object per line, keeping the
+    files of the max_open_files most recently logged jobs open between
+    batches, so a long-running worker or watcher does not hold one file
+    descriptor per job it ever ran. A file that grows past max_bytes is
+    rotated to .1, .2, ... and the oldest beyond backups is dropped.
+
+    Several processes may log the same job (e.g. the workers of a
+    distributed job on one machine): every batch is a single append, a
+    writer whose file was rotated by another process reopens the new file
+    before its next batch, and a file is only rotated by a writer that
+    still has it open.
+
+    Every record carries the time, this process's ID and the fields of the
+    enclosing context() blocks, e.g. job, run, vod_id, part_num and attempt.
+    """
+
+    def __init__(self, directory=JOB_LOG_DIR, max_bytes=JOB_LOG_MAX_BYTES, backups=JOB_LOG_BACKUPS, flush_interval=JOB_LOG_FLUSH_INTERVAL,
+                 max_open_files=JOB_LOG_OPEN_FILES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self.max_open_files = max(1, max_open_files)
+        self.process_id = f"{socket.gethostname()}-{os.getpid()}"
+        self.events = queue.SimpleQueue()
+        self.files = collections.OrderedDict()  # Job -> open file, least recently written first; owned by the writer thread
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def run_fields(self, source, info):
+        """
+        Context fields of one run of a job: the source's log_context() plus
+        a run ID, so several runs of one job in a process stay apart
+        """
+        return dict(source.log_context(info), run=f"{self.process_id}-{uuid.uuid4().hex[:8]}")
+
+    @contextlib.contextmanager
+    def context(self, **fields):
+        """
+        Attach fields to every event logged inside the block (in this thread)
+
+        Worker threads do not inherit the context; enter it again inside
+        the function the thread runs.
+        """
+        token = _log_context.set(dict(_log_context.get(), **fields))
+        try:
+            yield
+        finally:
+            _log_context.reset(token)
+
+    def event(self, event, **fields):
+        """
+        Log one event (never blocks)
+
+        Args:
+            event: Event name, e.g. "stage" or "upload_complete"
+            **fields: Event fields; they override context fields of the same name
+        """
+        if not self.directory:
+            return
+        record = {'ts': round(time.time(), 3), 'process': self.process_id, 'event': event}
+        record.update(_log_context.get())
+        record.update(fields)
+        self.events.put(('event', record))
+        self.start()
+
+    def flush(self, timeout=10):
+        """Wait until everything logged so far is on disk"""
+        if self.thread is None:
+            return
+        done = threading.Event()
+        self.events.put(('flush', done))
+        done.wait(timeout)
+
+    def start(self):
+        if self.thread is not None:
+            return
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.write_loop, name="job-log-writer", daemon=True)
+                self.thread.start()
+
+    def write_loop(self):
+        while True:
+            batch = {}
+            flushed = []
+            try:
+                items = [self.events.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            # Coalesce everything queued so far into one write per file
+            while True:
+                try:
+                    items.append(self.events.get_nowait())
+                except queue.Empty:
+                    break
+            for kind, value in items:
+                if kind == 'flush':
+                    flushed.append(value)
+                else:
+                    batch.setdefault(value.get('job') or "default", []).append(json.dumps(value, default=str))
+            try:
+                for job, lines in batch.items():
+                    self.write(job, lines)
+            except Exception as e:
+                print(f"Job log writer error: {str(e)}")
+            for done in flushed:
+                done.set()
+
+    def write(self, job, lines):
+        path = os.path.join(self.directory, f"{job_log_name(job)}.jsonl")
+        log_file = self.files.get(job)
+        if log_file is not None and not is_open_file(log_file, path):
+            # Another process rotated the file since the last batch
+            self.files.pop(job).close()
+            log_file = None
+        if log_file is None:
+            os.makedirs(self.directory, exist_ok=True)
+            log_file = self.files[job] = open(path, 'a')
+            while len(self.files) > self.max_open_files:
+                self.files.popitem(last=False)[1].close()
+        self.files.move_to_end(job)
+        log_file.write("\n".join(lines) + "\n")
+        log_file.flush()
+        # The size on disk includes other processes' appends
+        if os.fstat(log_file.fileno()).st_size >= self.max_bytes:
+            self.rotate(job, path)
+
+    def rotate(self, job, path):
+        log_file = self.files.pop(job)
+        try:
+            if not is_open_file(log_file, path):
+                # Already rotated by another process
+                return
+        finally:
+            log_file.close()
+        for number in range(self.backups, 0, -1):
+            older = f"{path}.{number}"
+            if os.path.exists(older):
+                if number == self.backups:
+                    os.remove(older)
+                else:
+                    os.replace(older, f"{path}.{number + 1}")
+        if self.backups:
+            os.replace(path, f"{path}.1")
+        else:
+            os.remove(path)
+
+# Whether path still names the file that log_file has open
+def is_open_file(log_file, path):
+    try:
+        return os.path.samestat(os.fstat(log_file.fileno()), os.stat(path))
+    except OSError:
+        return False
+
+# Read logged events back, oldest file first
+def read_job_log(directory=JOB_LOG_DIR, job=None):
+    """
+    Args:
+        directory: Job log directory
+        job: Only read files of jobs matching this glob pattern (e.g.
+            "vod_12345", "vod_*" or "twitch:*"), or None for all; it is
+            turned into file names like the job names in the log
+
+    Yields:
+        dict: Events; unreadable lines (e.g. a write cut short by a crash) are skipped
+    """
+    pattern = f"{job_log_pattern(job)}.jsonl*" if job else "*.jsonl*"
+    paths = glob.glob(os.path.join(directory, pattern))
+
+    # Rotated files hold older events: .3 before .2 before .1 before the live file
+    def age(path):
+        suffix = path.rsplit('.jsonl', 1)[1]
+        return (path.rsplit('.jsonl', 1)[0], -int(suffix[1:]) if suffix else 0)
+
+    for path in sorted(paths, key=age):
+        with open(path) as log_file:
+            for line in log_file:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+# Percentile of a sorted list
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    return values[min(int(fraction * len(values)), len(values) - 1)]
+
+# Durations and throughput per stage
+def stage_report(events, group_by=('stage',), since=None):
+    """
+    Aggregate the "stage" events written by Instrumentation
+
+    Args:
+        events: Events from read_job_log()
+        group_by: Fields to group on, e.g. ('stage',) or ('job', 'stage')
+        since: Only count events at or after this Unix time
+
+    Returns:
+        list: One dict per group with count, failed, seconds (total, p50,
+        p95, max), bytes and MB/s, sorted by group
+    """
+    groups = {}
+    for event in events:
+        if event.get('event') != 'stage' or (since and event.get('ts', 0) < since):
+            continue
+        key = tuple(event.get(field) for field in group_by)
+        group = groups.setdefault(key, {'durations': [], 'failed': 0, 'bytes': 0, 'runs': set()})
+        group['durations'].append(event.get('seconds') or 0.0)
+        group['bytes'] += event.get('bytes') or 0
+        group['runs'].add(event.get('run'))
+        if event.get('status') == 'failed':
+            group['failed'] += 1
+
+    rows = []
+    for key, group in sorted(groups.items(), key=lambda item: tuple(str(value) for value in item[0])):
+        durations = sorted(group['durations'])
+        total = sum(durations)
+        row = dict(zip(group_by, key))
+        row.update({
+            'count': len(durations),
+            'failed': group['failed'],
+            'runs': len(group['runs']),
+            'seconds': total,
+            'p50': percentile(durations, 0.5),
+            'p95': percentile(durations, 0.95),
+            'max': durations[-1],
+            'bytes': group['bytes'],
+            'mb_per_second': group['bytes'] / (1024 * 1024) / total if total > 0 else 0.0
+        })
+        rows.append(row)
+    return rows
+
+# Process-wide job log
+job_log = JobLog()
+atexit.register(job_log.flush)
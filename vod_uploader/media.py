@@ -0,0 +1,251 @@
+import functools
+import os
+import re
+import struct
+
+from .config import MAX_DURATION
+from .process import FFMPEG_PROGRESS_ARGS, check_output, ffmpeg_progress_handler, run_command
+
+# Function to split duration and calculate parts
+def calculate_splits(duration):
+    if duration <= MAX_DURATION:
+        return [duration]
+    parts = int(duration // MAX_DURATION)
+    remainder = duration % MAX_DURATION
+    if remainder < MAX_DURATION * 0.05:
+        balanced_part = duration // (parts + 1)
+        return [balanced_part] * (parts + 1)
+    return [MAX_DURATION] * parts + ([remainder] if remainder else [])
+
+# Format duration for display
+def format_duration(seconds):
+    hours = int(seconds) // 3600
+    minutes = (int(seconds) % 3600) // 60
+    secs = int(seconds) % 60
+    return f"{hours}h {minutes}m {secs}s"
+
+# Title cleanup patterns, compiled once rather than on every call
+NON_ASCII_PATTERN = re.compile(r'[^\x00-\x7F]+')
+UNSAFE_CHARACTER_PATTERN = re.compile(r'[^\w\s\-\.,\(\)\[\]\{\}]')
+REPEATED_UNDERSCORE_PATTERN = re.compile(r'_+')
+
+# Clean title for file system compatibility
+@functools.lru_cache(maxsize=4096)
+def clean_title_for_file(title, default="VideoDownload"):
+    # Remove emojis and other non-ASCII characters
+    clean_title = NON_ASCII_PATTERN.sub('', title)
+    # Replace problematic characters with underscores
+    clean_title = UNSAFE_CHARACTER_PATTERN.sub('_', clean_title)
+    # Remove consecutive underscores
+    clean_title = REPEATED_UNDERSCORE_PATTERN.sub('_', clean_title)
+    # Remove leading/trailing underscores
+    clean_title = clean_title.strip('_')
+    # Trim whitespace
+    clean_title = clean_title.strip()
+    # If title is empty after cleaning, use a default
+    if not clean_title or clean_title.isspace():
+        clean_title = default
+
+    file_name = clean_title.replace(' ', '_')
+
+    if len(file_name) > 200:
+        file_name = file_name[:200]
+
+    return file_name
+
+# Function to get video information (duration, resolution, etc.)
+def get_video_info(video_path):
+    """
+    Extract video information using ffprobe
+
+    Args:
+        video_path: Path to video file
+
+    Returns:
+        dict: Dictionary containing video information
+    """
+    try:
+        # Get video duration
+        cmd = ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'default=noprint_wrappers=1:nokey=1', video_path]
+        duration_output = check_output(cmd).strip()
+        duration = float(duration_output)
+
+        # Get video resolution
+        cmd = ['ffprobe', '-v', 'error', '-select_streams', 'v:0', '-show_entries', 'stream=width,height', '-of', 'csv=s=x:p=0', video_path]
+        resolution = check_output(cmd).strip()
+
+        # Get video bitrate
+        cmd = ['ffprobe', '-v', 'error', '-select_streams', 'v:0', '-show_entries', 'stream=bit_rate', '-of', 'default=noprint_wrappers=1:nokey=1', video_path]
+        bitrate_output = check_output(cmd).strip()
+        bitrate = int(bitrate_output) if bitrate_output.isdigit() else None
+
+        # Get file size
+        file_size = os.path.getsize(video_path)
+
+        return {
+            'duration': duration,
+            'duration_formatted': format_duration(int(duration)),
+            'resolution': resolution,
+            'bitrate': bitrate,
+            'bitrate_mbps': bitrate / 1000000 if bitrate else None,
+            'file_size': file_size,
+            'file_size_mb': file_size / (1024 * 1024)
+        }
+    except Exception as e:
+        print(f"Error getting video info: {str(e)}")
+        # Return some defaults if we can't get the info
+        file_size = os.path.getsize(video_path) if os.path.exists(video_path) else 0
+        return {
+            'duration': 0,
+            'duration_formatted': "Unknown",
+            'resolution': "Unknown",
+            'bitrate': None,
+            'bitrate_mbps': None,
+            'file_size': file_size,
+            'file_size_mb': file_size / (1024 * 1024)
+        }
+
+# Function to split video file at specific time points using ffmpeg
+def split_video(input_file, output_base, start_time, duration, attempt=1, faststart=False):
+    """
+    Split a video file into chunks using ffmpeg
+
+    Args:
+        input_file: Path to input video file
+        output_base: Base filename for output (without extension)
+        start_time: Start time in seconds
+        duration: Duration to extract in seconds
+        attempt: Attempt number (for naming)
+        faststart: Write the moov atom at the front of the output
+
+    Returns:
+        str: Path to the created file
+    """
+    output_file = f"{output_base}_attempt_{attempt}.mp4"
+
+    try:
+        print(f"Splitting video from {format_duration(start_time)} for {format_duration(duration)}")
+        print(f"Output file: {output_file}")
+
+        # Use ffmpeg to extract the segment
+        cmd = ['ffmpeg', '-y', '-loglevel', 'warning', '-ss', str(start_time), '-i', input_file, '-t', str(duration), '-c', 'copy']
+        if faststart:
+            cmd += ['-movflags', '+faststart']
+        cmd += FFMPEG_PROGRESS_ARGS + [output_file]
+        print(f"Running: {' '.join(cmd)}")
+
+        # Progress lines keep the stall detector fed; the faststart pass shows up as output growth
+        run_command(cmd, watch_path=output_file, on_line=ffmpeg_progress_handler())
+
+        # Verify the file was created successfully
+        if os.path.exists(output_file) and os.path.getsize(output_file) > 0:
+            file_size = os.path.getsize(output_file) / (1024*1024)
+            print(f"Split successful. File size: {file_size:.2f} MB")
+            return output_file
+        else:
+            print("Split appears to have failed. Output file is empty or missing.")
+            return None
+
+    except Exception as e:
+        print(f"Error splitting video: {str(e)}")
+        return None
+
+# MP4 flags for a fragmented MP4 whose moov is written first (no rewrite pass)
+FRAGMENTED_MP4_FLAGS = "+frag_keyframe+empty_moov+default_base_moof"
+
+# List the top-level boxes of an MP4 file without reading the media data
+def mp4_box_offsets(video_path, limit=64):
+    """
+    Walk the top-level MP4 box headers
+
+    Args:
+        video_path: Path to the file
+        limit: Stop after this many boxes (None walks the whole file)
+
+    Returns:
+        list: (type, offset, size) tuples in file order
+    """
+    boxes = []
+    with open(video_path, 'rb') as f:
+        file_size = os.fstat(f.fileno()).st_size
+        offset = 0
+        while offset < file_size and (limit is None or len(boxes) < limit):
+            f.seek(offset)
+            header = f.read(8)
+            if len(header) < 8:
+                break
+            box_size, box_type = struct.unpack('>I4s', header)
+            if box_size == 1:
+                box_size = struct.unpack('>Q', f.read(8))[0]
+            elif box_size == 0:
+                box_size = file_size - offset
+            boxes.append((box_type.decode('latin-1'), offset, box_size))
+            if box_size < 8:
+                break
+            offset += box_size
+    return boxes
+
+# Box types of an MP4 file in order, e.g. ['ftyp', 'moov', 'mdat']
+def mp4_top_level_boxes(video_path, limit=64):
+    return [box_type for box_type, offset, size in mp4_box_offsets(video_path, limit)]
+
+# Check whether a file is MPEG-TS, whatever its extension says
+def is_mpegts(video_path):
+    with open(video_path, 'rb') as f:
+        head = f.read(189)
+    return len(head) == 189 and head[0] == 0x47 and head[188] == 0x47
+
+# Decide whether a part should be remuxed before upload
+def needs_remux(video_path):
+    """
+    Check for MPEG-TS data or an MP4 with its moov atom after the media data
+
+    Args:
+        video_path: Path to the part
+
+    Returns:
+        bool: True if remuxing to a faststart MP4 would help
+    """
+    try:
+        if is_mpegts(video_path):
+            return True
+        boxes = mp4_top_level_boxes(video_path)
+    except OSError:
+        return False
+
+    if 'moov' not in boxes:
+        return True
+    return 'mdat' in boxes and boxes.index('moov') > boxes.index('mdat')
+
+# ffmpeg arguments that write a clean MP4 from copied streams
+def mp4_output_args(fragmented=False):
+    movflags = FRAGMENTED_MP4_FLAGS if fragmented else "+faststart"
+    # Only video and audio: Twitch's timed ID3 data stream cannot go into MP4
+    return ['-map', '0:v', '-map', '0:a?', '-c', 'copy', '-movflags', movflags, '-f', 'mp4']
+
+# Remux a part into an MP4 with the moov atom at the front, without re-encoding
+def remux_to_mp4(input_file, output_file, fragmented=False):
+    """
+    Rewrite the container only (-c copy), putting the moov atom first
+
+    Args:
+        input_file: Path to the MPEG-TS or MP4 input
+        output_file: Path of the MP4 to write
+        fragmented: Write a fragmented MP4 (moov first, no second pass)
+            instead of a regular faststart MP4
+
+    Returns:
+        str: output_file, or None if ffmpeg failed
+    """
+    cmd = ['ffmpeg', '-y', '-loglevel', 'warning', '-i', input_file] + mp4_output_args(fragmented) + FFMPEG_PROGRESS_ARGS + [output_file]
+    print(f"Remuxing {input_file} -> {output_file}")
+    try:
+        run_command(cmd, watch_path=output_file, on_line=ffmpeg_progress_handler())
+    except Exception as e:
+        print(f"Error remuxing video: {str(e)}")
+        return None
+
+    if os.path.exists(output_file) and os.path.getsize(output_file) > 0:
+        return output_file
+    print("Remux appears to have failed. Output file is empty or missing.")
+    return None
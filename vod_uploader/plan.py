@@ -0,0 +1,95 @@
+from .media import calculate_splits, clean_title_for_file
+
+# Start offset of every part
+def part_start_times(splits):
+    start_times = [0]
+    for split_duration in splits[:-1]:
+        start_times.append(start_times[-1] + split_duration)
+    return start_times
+
+# Title of one part, as shown on YouTube
+def part_title(title, part_num, total_parts):
+    if total_parts is None:
+        # Live recordings do not know how many parts there will be
+        return f"{title} (Part {part_num})"
+    if total_parts > 1:
+        return f"{title} (Part {part_num}/{total_parts})"
+    return title
+
+# Everything about one part that does not depend on the fetched file
+class PartPlan:
+    def __init__(self, part_num, total_parts, start_time, duration, title, description, tags, base_file_name):
+        self.part_num = part_num
+        self.total_parts = total_parts
+        self.start_time = start_time
+        self.duration = duration
+        self.title = title  # Full YouTube title, including the part suffix
+        self.description = description  # Description without the technical information of the fetched file
+        self.tags = tags
+        self.base_file_name = base_file_name
+
+# Work out the metadata of one part
+def plan_part(source, part_num, total_parts, title, start_time, duration, description_base, tags, file_title=None):
+    """
+    Args:
+        source: Source adapter, asked for per-part metadata (chapters, ...)
+        part_num: Part number (1-based)
+        total_parts: Total number of parts (None while a live stream is still recording)
+        title: Base title for the video
+        start_time: Start time in seconds
+        duration: Duration of this part in seconds
+        description_base: Base description for all parts
+        tags: Tags to apply to the video
+        file_title: title already cleaned with clean_title_for_file, if known
+
+    Returns:
+        PartPlan: The part's title, description, tags and file name
+    """
+    description = description_base
+    if total_parts is None:
+        description += f"\n\nPart {part_num}"
+    elif total_parts > 1:
+        description += f"\n\nPart {part_num} of {total_parts}"
+
+    # Chapters, markers and similar per-part metadata from the source
+    extra_description, extra_tags = source.part_metadata(part_num, start_time, duration)
+    if extra_description:
+        description += f"\n\n{extra_description}"
+    if extra_tags:
+        tags = tags + [tag for tag in extra_tags if tag not in tags]
+
+    if file_title is None:
+        file_title = clean_title_for_file(title, source.default_file_name)
+    return PartPlan(part_num, total_parts, start_time, duration, part_title(title, part_num, total_parts),
+                    description, tags, f"{file_title}_part_{part_num}")
+
+# Every part of one video, computed once before any part is processed
+class VodPlan:
+    """
+    Split points, cumulative start offsets, titles, descriptions, tags and
+    file names of all parts of a video
+
+    The plan is built once per video, right after source.prepare(), so the
+    per-part and per-attempt paths (and every worker of a distributed job)
+    only look values up. Building it is linear in the number of parts.
+    """
+
+    def __init__(self, source, info, splits=None):
+        self.title = info['title']
+        self.url = info.get('url')
+        self.splits = splits if splits is not None else calculate_splits(info['duration'])
+        self.start_times = part_start_times(self.splits)
+        self.description_base = source.description_base(info)
+        self.tags = source.tags(info)
+        self.file_title = clean_title_for_file(self.title, source.default_file_name)
+        self.parts = [
+            plan_part(source, part_num, len(self.splits), self.title, start_time, duration,
+                      self.description_base, self.tags, self.file_title)
+            for part_num, (start_time, duration) in enumerate(zip(self.start_times, self.splits), 1)
+        ]
+
+    def __len__(self):
+        return len(self.parts)
+
+    def part(self, part_num):
+        return self.parts[part_num - 1]
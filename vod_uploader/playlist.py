@@ -0,0 +1,213 @@
+import json
+import os
+import threading
+
+from .config import TIMELINE_CACHE_DIR
+from .retry import RetryPolicy
+from .youtube import YOUTUBE_HOST, get_youtube_service
+
+# Cache of playlist ID and part -> video ID per source, so reruns add to the same playlist
+PLAYLIST_CACHE_FILE = os.path.join(TIMELINE_CACHE_DIR, "playlists.json")
+# playlistItems.list page size (the API maximum)
+PLAYLIST_PAGE_SIZE = 50
+# Line added to the playlist description, so a lost cache finds exactly this source's playlist again
+PLAYLIST_KEY_MARKER = "vod-uploader playlist key: {key}"
+
+# Serialises read-modify-write of the cache file between the playlists of this process
+_cache_lock = threading.Lock()
+
+# Collects a multi-part upload into one YouTube playlist
+class PartPlaylist:
+    """
+    One playlist per source, filled as parts finish and ordered at the end
+
+    Every operation is idempotent: the playlist is found again through a
+    local cache (or by the key marker in its description; never by title,
+    which another playlist may share), existing items are read once with paged list
+    calls (1 quota unit per 50 items) and only missing videos are inserted,
+    so a rerun of the same VOD adds nothing twice. finalize() moves only the
+    items that are out of place.
+    """
+
+    def __init__(self, key, title, description="", privacy="private", youtube_service=None, cache_file=PLAYLIST_CACHE_FILE):
+        self.key = key
+        self.title = title[:150]  # YouTube playlist title limit
+        self.marker = PLAYLIST_KEY_MARKER.format(key=key)
+        self.description = f"{description[:5000 - len(self.marker) - 2]}\n\n{self.marker}".lstrip()
+        self.privacy = privacy
+        self.youtube_service = youtube_service
+        self.cache_file = cache_file
+        self.policy = RetryPolicy(YOUTUBE_HOST)
+        self.playlist_id = None
+        self.parts = {}  # part_num -> video_id, including parts from earlier runs
+        self.items = None  # video_id -> playlist item resource, loaded lazily
+        self.lock = threading.Lock()
+
+    def youtube(self):
+        if self.youtube_service is None:
+            self.youtube_service = get_youtube_service()
+        return self.youtube_service
+
+    def load_cache(self):
+        if not os.path.exists(self.cache_file):
+            return {}
+        try:
+            with open(self.cache_file) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable playlist cache {self.cache_file}: {str(e)}")
+            return {}
+
+    def save_cache(self):
+        # Other playlists (clips, other VODs) share the file; merge into what is on disk
+        with _cache_lock:
+            cache = self.load_cache()
+            cache[self.key] = {
+                'playlist_id': self.playlist_id,
+                'parts': {str(part_num): video_id for part_num, video_id in self.parts.items()}
+            }
+            temp_path = f"{self.cache_file}.{os.getpid()}.tmp"
+            try:
+                os.makedirs(os.path.dirname(self.cache_file) or '.', exist_ok=True)
+                # The rename keeps the file whole for readers and for a crash mid-write
+                with open(temp_path, 'w') as f:
+                    json.dump(cache, f, indent=2)
+                os.replace(temp_path, self.cache_file)
+            except OSError as e:
+                print(f"Could not save playlist cache: {str(e)}")
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+
+    def find_by_marker(self):
+        page_token = None
+        while True:
+            response = self.policy.call(self.youtube().playlists().list(
+                part='snippet', mine=True, maxResults=PLAYLIST_PAGE_SIZE, pageToken=page_token).execute)
+            for playlist in response.get('items', []):
+                if self.marker in playlist['snippet'].get('description', '').splitlines():
+                    return playlist['id']
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                return None
+
+    def ensure_playlist(self):
+        """Find the playlist from the cache or by its key marker, creating it only if neither exists"""
+        if self.playlist_id:
+            return self.playlist_id
+
+        cached = self.load_cache().get(self.key)
+        if cached:
+            self.playlist_id = cached['playlist_id']
+            self.parts.update({int(part_num): video_id for part_num, video_id in cached['parts'].items()})
+        else:
+            self.playlist_id = self.find_by_marker()
+
+        if not self.playlist_id:
+            body = {
+                'snippet': {'title': self.title, 'description': self.description},
+                'status': {'privacyStatus': self.privacy}
+            }
+            response = self.policy.call(self.youtube().playlists().insert(part='snippet,status', body=body).execute)
+            self.playlist_id = response['id']
+            self.items = {}
+            print(f"Created playlist: https://www.youtube.com/playlist?list={self.playlist_id}")
+        else:
+            print(f"Using playlist: https://www.youtube.com/playlist?list={self.playlist_id}")
+
+        self.save_cache()
+        return self.playlist_id
+
+    def load_items(self):
+        if self.items is not None:
+            return self.items
+        self.items = {}
+        page_token = None
+        while True:
+            response = self.policy.call(self.youtube().playlistItems().list(
+                part='snippet', playlistId=self.playlist_id, maxResults=PLAYLIST_PAGE_SIZE, pageToken=page_token).execute)
+            for item in response.get('items', []):
+                self.items[item['snippet']['resourceId']['videoId']] = item
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                return self.items
+
+    def expected_position(self, part_num):
+        # Position among the parts known so far, so inserts land close to their final place
+        return sum(1 for other in self.parts if other < part_num)
+
+    def add(self, part_num, video_id):
+        """
+        Add an uploaded part to the playlist (no-op if it is already there)
+
+        A part that was re-uploaded replaces the item of its old video, so the
+        playlist never holds the same part twice.
+
+        Errors are reported, not raised: the video is uploaded either way.
+
+        Args:
+            part_num: Part number (1-based)
+            video_id: ID returned by upload_to_youtube()
+        """
+        with self.lock:
+            try:
+                self.ensure_playlist()
+                items = self.load_items()
+                old_video_id = self.parts.get(part_num)
+                if old_video_id and old_video_id != video_id and old_video_id in items:
+                    self.policy.call(self.youtube().playlistItems().delete(id=items[old_video_id]['id']).execute)
+                    del items[old_video_id]
+                    print(f"Removed the old video of part {part_num} from playlist")
+                self.parts[part_num] = video_id
+                if video_id not in items:
+                    body = {
+                        'snippet': {
+                            'playlistId': self.playlist_id,
+                            'resourceId': {'kind': 'youtube#video', 'videoId': video_id},
+                            'position': min(self.expected_position(part_num), len(items))
+                        }
+                    }
+                    items[video_id] = self.policy.call(self.youtube().playlistItems().insert(part='snippet', body=body).execute)
+                    print(f"Added part {part_num} to playlist")
+                self.save_cache()
+            except Exception as e:
+                print(f"Could not add part {part_num} to playlist: {str(e)}")
+
+    def finalize(self):
+        """
+        Put the playlist in part order, updating only misplaced items
+
+        Returns:
+            str: The playlist ID, or None if there is no playlist
+        """
+        with self.lock:
+            if not self.playlist_id:
+                return None
+            try:
+                # Re-read positions once; inserts may have shifted them
+                self.items = None
+                items = self.load_items()
+                ordered = [self.parts[part_num] for part_num in sorted(self.parts) if self.parts[part_num] in items]
+                # Track the current order locally; every move shifts the items after it
+                current = sorted(items, key=lambda video_id: items[video_id]['snippet'].get('position', 0))
+                moved = 0
+                for position, video_id in enumerate(ordered):
+                    if current[position] == video_id:
+                        continue
+                    current.remove(video_id)
+                    current.insert(position, video_id)
+                    item = items[video_id]
+                    snippet = {
+                        'playlistId': self.playlist_id,
+                        'resourceId': item['snippet']['resourceId'],
+                        'position': position
+                    }
+                    self.policy.call(self.youtube().playlistItems().update(
+                        part='snippet', body={'id': item['id'], 'snippet': snippet}).execute)
+                    moved += 1
+                if moved:
+                    # Positions of everything after a moved item changed
+                    self.items = None
+                print(f"Playlist ordered ({moved} item(s) moved): https://www.youtube.com/playlist?list={self.playlist_id}")
+            except Exception as e:
+                print(f"Could not order playlist: {str(e)}")
+            return self.playlist_id
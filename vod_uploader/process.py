@@ -0,0 +1,279 @@
+import atexit
+import collections
+import os
+import re
+import signal
+import subprocess
+import threading
+import time
+
+from .config import PROBE_TIMEOUT, PROCESS_STALL_TIMEOUT
+
+# Seconds between checks for exit, timeout and stalls
+POLL_INTERVAL = 1
+# Seconds a process group gets to exit after SIGTERM before SIGKILL
+TERMINATE_GRACE = 5
+# stderr lines kept for error messages
+STDERR_TAIL_LINES = 20
+
+# Arguments that make ffmpeg report progress on stderr at any log level
+FFMPEG_PROGRESS_ARGS = ['-progress', 'pipe:2', '-nostats']
+FFMPEG_PROGRESS_PATTERN = re.compile(r'^(out_time_us|out_time_ms|total_size)=(\d+)$')
+
+# A process that exited non-zero, or was stopped by the runner
+class ProcessError(subprocess.CalledProcessError):
+    def __init__(self, returncode, cmd, reason=None, stderr_tail=()):
+        super().__init__(returncode, cmd, stderr='\n'.join(stderr_tail))
+        self.reason = reason
+        self.stderr_tail = list(stderr_tail)
+
+    def __str__(self):
+        name = os.path.basename(str(self.cmd[0])) if self.cmd else "process"
+        message = f"{name} {self.reason or f'exited with status {self.returncode}'}"
+        if self.stderr_tail:
+            message += f": {self.stderr_tail[-1]}"
+        return message
+
+# Processes that can be cancelled as a group, e.g. on Ctrl+C or exit
+_active = set()
+_active_lock = threading.Lock()
+
+# One child process in its own process group, with stderr read line by line
+class ManagedProcess:
+    """
+    Popen wrapper used for every external tool (ffmpeg, ffprobe, streamlink)
+
+    The child gets its own session, so terminate() stops it together with
+    anything it spawned. A reader thread splits stderr on \\r and \\n (the
+    progress output of ffmpeg and streamlink uses \\r), remembers when output
+    last arrived and keeps the last lines for error messages.
+    """
+
+    def __init__(self, cmd, stdin=None, stdout=None, on_line=None):
+        self.cmd = [str(arg) for arg in cmd]
+        self.on_line = on_line
+        self.last_activity = time.monotonic()
+        self.stderr_tail = collections.deque(maxlen=STDERR_TAIL_LINES)
+        self.process = subprocess.Popen(
+            self.cmd, stdin=stdin, stdout=stdout, stderr=subprocess.PIPE, start_new_session=True)
+        with _active_lock:
+            _active.add(self)
+        self.reader = threading.Thread(target=self.read_stderr, name=f"stderr-{os.path.basename(self.cmd[0])}", daemon=True)
+        self.reader.start()
+
+    def read_stderr(self):
+        buffer = b''
+        while True:
+            data = self.process.stderr.read1(65536)
+            if not data:
+                break
+            self.last_activity = time.monotonic()
+            buffer += data
+            lines = re.split(rb'[\r\n]', buffer)
+            buffer = lines.pop()
+            for line in lines:
+                self.handle_line(line)
+        if buffer:
+            self.handle_line(buffer)
+
+    def handle_line(self, raw_line):
+        line = raw_line.decode('utf-8', 'replace').strip()
+        if not line:
+            return
+        if self.on_line is not None:
+            try:
+                if self.on_line(line):
+                    # Consumed as progress; not worth keeping for errors
+                    return
+            except Exception as e:
+                print(f"Error handling output of {self.cmd[0]}: {str(e)}")
+        self.stderr_tail.append(line)
+
+    def poll(self):
+        return self.process.poll()
+
+    def terminate(self):
+        """Stop the whole process group: SIGTERM, then SIGKILL after a grace period"""
+        if self.process.poll() is None:
+            try:
+                os.killpg(self.process.pid, signal.SIGTERM)
+                self.process.wait(timeout=TERMINATE_GRACE)
+            except subprocess.TimeoutExpired:
+                os.killpg(self.process.pid, signal.SIGKILL)
+                self.process.wait()
+            except ProcessLookupError:
+                pass
+        self.finish()
+
+    def finish(self):
+        self.reader.join(timeout=TERMINATE_GRACE)
+        with _active_lock:
+            _active.discard(self)
+
+# Cancel every running external process
+def cancel_all():
+    with _active_lock:
+        processes = list(_active)
+    for process in processes:
+        process.terminate()
+
+atexit.register(cancel_all)
+
+# Run a chain of commands, each piping its stdout into the next
+def run_pipeline(cmds, timeout=None, stall_timeout=PROCESS_STALL_TIMEOUT, watch_path=None, on_line=None, capture=False, watchdog=None):
+    """
+    Run external tools without a shell, with a timeout and stall detection
+
+    A pipeline counts as stalled when none of its processes wrote to stderr
+    (or stdout, when captured) and watch_path did not grow for stall_timeout
+    seconds. Stalled, timed-out or interrupted pipelines are stopped as
+    whole process groups.
+
+    Args:
+        cmds: List of argv lists; stdout of each feeds stdin of the next
+        timeout: Overall limit in seconds, or None
+        stall_timeout: Seconds without progress before giving up, or None
+        watch_path: Output file whose growth counts as progress
+        on_line: Called with every stderr line; return True to drop it
+            from the error tail (e.g. parsed progress lines)
+        capture: Return the last command's stdout as text
+        watchdog: ThroughputWatchdog fed with the size of watch_path; the
+            pipeline is stopped when it reports the transfer too slow
+
+    Returns:
+        str: Captured stdout if capture is set, otherwise None
+
+    Raises:
+        ProcessError: If a process failed, timed out or stalled
+        SlowTransferError: If the watchdog stopped the pipeline
+    """
+    processes = []
+    captured = []
+    stdin = None
+    try:
+        for index, cmd in enumerate(cmds):
+            last = index == len(cmds) - 1
+            stdout = subprocess.PIPE if (not last or capture) else subprocess.DEVNULL
+            process = ManagedProcess(cmd, stdin=stdin, stdout=stdout, on_line=on_line)
+            if stdin is not None:
+                # Let the upstream process see SIGPIPE if this one exits
+                stdin.close()
+            stdin = process.process.stdout
+            processes.append(process)
+
+        reader = None
+        if capture:
+            def read_stdout():
+                for data in iter(lambda: processes[-1].process.stdout.read1(65536), b''):
+                    processes[-1].last_activity = time.monotonic()
+                    captured.append(data)
+            reader = threading.Thread(target=read_stdout, daemon=True)
+            reader.start()
+
+        started = time.monotonic()
+        watched_size = -1
+        watched_time = started
+        if watchdog is not None:
+            watchdog.restart()
+        while True:
+            running = [process for process in processes if process.poll() is None]
+            if not running:
+                break
+            # Returns as soon as the process exits, so short probes are not held for a full interval
+            try:
+                running[-1].process.wait(timeout=POLL_INTERVAL)
+            except subprocess.TimeoutExpired:
+                pass
+            now = time.monotonic()
+
+            if watch_path and os.path.exists(watch_path):
+                size = os.path.getsize(watch_path)
+                if size != watched_size:
+                    watched_size, watched_time = size, now
+                if watchdog is not None:
+                    watchdog.update(size)
+
+            if watchdog is not None and watchdog.too_slow():
+                error = watchdog.error()
+                stop_pipeline(processes, str(error))
+                raise error
+
+            if timeout and now - started > timeout:
+                raise stop_pipeline(processes, f"timed out after {timeout:.0f}s")
+
+            last_activity = max([watched_time] + [process.last_activity for process in processes])
+            if stall_timeout and now - last_activity > stall_timeout:
+                raise stop_pipeline(processes, f"stalled: no progress for {stall_timeout:.0f}s")
+
+        if reader is not None:
+            reader.join()
+        for process in processes:
+            process.finish()
+            if process.poll() != 0:
+                raise ProcessError(process.poll(), process.cmd, stderr_tail=process.stderr_tail)
+
+        if capture:
+            return b''.join(captured).decode('utf-8', 'replace')
+        return None
+
+    except KeyboardInterrupt:
+        stop_pipeline(processes, "cancelled")
+        raise
+
+    finally:
+        for process in processes:
+            if process.poll() is None:
+                process.terminate()
+
+# Stop every process of a pipeline and describe why
+def stop_pipeline(processes, reason):
+    for process in processes:
+        process.terminate()
+    failing = processes[0] if processes else None
+    for process in processes:
+        if process.stderr_tail:
+            failing = process
+    cmd = failing.cmd if failing else []
+    tail = failing.stderr_tail if failing else ()
+    print(f"Stopping {' | '.join(os.path.basename(p.cmd[0]) for p in processes)}: {reason}")
+    return ProcessError(-1, cmd, reason=reason, stderr_tail=tail)
+
+# Run one command
+def run_command(cmd, timeout=None, stall_timeout=PROCESS_STALL_TIMEOUT, watch_path=None, on_line=None, watchdog=None):
+    return run_pipeline([cmd], timeout=timeout, stall_timeout=stall_timeout, watch_path=watch_path, on_line=on_line, watchdog=watchdog)
+
+# Run a short command (ffprobe and the like) and return its output
+def check_output(cmd, timeout=PROBE_TIMEOUT):
+    return run_pipeline([cmd], timeout=timeout, stall_timeout=None, capture=True)
+
+# Parse ffmpeg -progress lines into a progress callback
+def ffmpeg_progress_handler(callback=None):
+    """
+    Build an on_line handler for commands using FFMPEG_PROGRESS_ARGS
+
+    Without a callback the handler only keeps progress lines out of the
+    error tail; the lines still count as activity for stall detection.
+
+    Args:
+        callback: Called as callback(seconds_done, bytes_written) whenever
+            ffmpeg reports its output size, or None
+
+    Returns:
+        callable: on_line handler for run_pipeline()
+    """
+    state = {'seconds': 0.0}
+
+    def on_line(line):
+        match = FFMPEG_PROGRESS_PATTERN.match(line)
+        if match is None:
+            # The other -progress keys (frame=, speed=, progress=...) are noise
+            return '=' in line and ' ' not in line
+        key, value = match.groups()
+        if key in ('out_time_us', 'out_time_ms'):
+            # Both keys are in microseconds
+            state['seconds'] = int(value) / 1000000
+        elif callback is not None:
+            callback(state['seconds'], int(value))
+        return True
+
+    return on_line
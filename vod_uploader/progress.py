@@ -0,0 +1,139 @@
+import os
+import queue
+import threading
+import time
+
+from .media import format_duration
+
+# Seconds between status lines; keeps notebook output (and kernel load) small
+DEFAULT_RENDER_INTERVAL = 15
+
+# Non-blocking progress bus shared by every transfer
+class ProgressBus:
+    """
+    Collects progress from transfers and draws one aggregated status line
+
+    Transfers call publish() from their hot loop; that only puts a tuple on
+    a SimpleQueue, which never blocks. A daemon renderer thread drains the
+    queue and prints at most one line every interval seconds, covering all
+    active jobs (bytes, MB/s and ETA where the total is known). Files being
+    written by external tools (streamlink, ffmpeg) can be watched instead,
+    in which case the renderer samples their size itself.
+    """
+
+    def __init__(self, interval=DEFAULT_RENDER_INTERVAL):
+        self.interval = interval
+        self.events = queue.SimpleQueue()
+        self.jobs = {}
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def publish(self, job, done, total=None):
+        """
+        Report progress for a job (never blocks)
+
+        Args:
+            job: Job name, e.g. "upload part 2"
+            done: Bytes transferred so far
+            total: Total bytes, if known
+        """
+        self.events.put(('bytes', job, done, total, time.monotonic()))
+        self.start()
+
+    def finish(self, job):
+        self.events.put(('finish', job, None, None, time.monotonic()))
+
+    def watch_file(self, job, path, total=None):
+        """
+        Report progress from the size of a file another process is writing
+
+        Args:
+            job: Job name
+            path: File being written
+            total: Expected size in bytes, if known
+        """
+        self.events.put(('file', job, path, total, time.monotonic()))
+        self.start()
+
+    def start(self):
+        if self.thread is not None:
+            return
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.render_loop, name="progress-renderer", daemon=True)
+                self.thread.start()
+
+    def drain(self):
+        while True:
+            try:
+                kind, job, value, total, stamp = self.events.get_nowait()
+            except queue.Empty:
+                return
+            if kind == 'finish':
+                state = self.jobs.pop(job, None)
+                if state is not None:
+                    self.update_rate(state, stamp)
+                    print(self.describe(job, state, final=True))
+                continue
+            state = self.jobs.setdefault(job, {
+                'done': 0, 'total': None, 'path': None, 'started': stamp,
+                'last_done': 0, 'last_time': stamp, 'rate': 0.0
+            })
+            if kind == 'file':
+                state['path'] = value
+            else:
+                state['done'] = value
+            if total:
+                state['total'] = total
+
+    def update_rate(self, state, now):
+        if state['path']:
+            try:
+                state['done'] = os.path.getsize(state['path'])
+            except OSError:
+                pass
+        elapsed = now - state['last_time']
+        if elapsed > 0:
+            state['rate'] = (state['done'] - state['last_done']) / elapsed
+        state['last_done'] = state['done']
+        state['last_time'] = now
+
+    def describe(self, job, state, final=False):
+        done_mb = state['done'] / (1024 * 1024)
+        if final:
+            elapsed = max(state['last_time'] - state['started'], 1e-6)
+            return f"{job}: finished {done_mb:.1f} MB in {format_duration(elapsed)} ({done_mb / elapsed:.2f} MB/s)"
+
+        rate_mb = state['rate'] / (1024 * 1024)
+        line = f"{job}: {done_mb:.1f}"
+        if state['total']:
+            line += f"/{state['total'] / (1024 * 1024):.1f} MB ({state['done'] / state['total'] * 100:.0f}%)"
+        else:
+            line += " MB"
+        line += f" {rate_mb:.2f} MB/s"
+        if state['total'] and state['rate'] > 0:
+            eta = (state['total'] - state['done']) / state['rate']
+            line += f" ETA {format_duration(eta)}"
+        return line
+
+    def render(self):
+        self.drain()
+        if not self.jobs:
+            return
+        now = time.monotonic()
+        lines = []
+        for job, state in self.jobs.items():
+            self.update_rate(state, now)
+            lines.append(self.describe(job, state))
+        print("[progress] " + " | ".join(lines))
+
+    def render_loop(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.render()
+            except Exception as e:
+                print(f"Progress renderer error: {str(e)}")
+
+# Process-wide bus used by the transfers
+progress_bus = ProgressBus()
@@ -0,0 +1,159 @@
+import itertools
+import threading
+import time
+
+from .config import EGRESS_RATE_LIMIT, INGRESS_RATE_LIMIT, TRANSFER_WEIGHTS
+
+# Bytes an idle manager lets through at once
+BANDWIDTH_BURST = 1024 * 1024
+# Longest a waiting transfer sleeps before looking at the schedule again
+SCHEDULE_RECHECK = 1.0
+
+# Minutes after midnight of an "HH:MM" time
+def parse_clock(value):
+    hours, minutes = value.split(':')
+    return int(hours) * 60 + int(minutes)
+
+# Rate in effect now, for a fixed limit or a time-of-day schedule
+def scheduled_rate(limit, now=None):
+    """
+    Args:
+        limit: Bytes/s (0 or None for unlimited), or a schedule: a list of
+            ("HH:MM", bytes/s) entries, each in effect from its local time
+            until the next one (the last one wraps past midnight)
+        now: time.struct_time to evaluate (defaults to the local time)
+
+    Returns:
+        float: Bytes/s, 0 for unlimited
+    """
+    if not isinstance(limit, (list, tuple)):
+        return limit or 0
+    if not limit:
+        return 0
+    now = now or time.localtime()
+    minute = now.tm_hour * 60 + now.tm_min
+    entries = sorted((parse_clock(start), rate) for start, rate in limit)
+    current = entries[-1][1]
+    for start, rate in entries:
+        if start <= minute:
+            current = rate
+    return current or 0
+
+# One transfer's share of a BandwidthManager
+class Lane:
+    def __init__(self, manager, job, weight):
+        self.manager = manager
+        self.job = job
+        self.weight = max(weight, 0.01)
+        self.finish = 0.0  # Virtual time at which the lane's granted bytes end
+
+    def acquire(self, amount, watchdog=None):
+        """
+        Wait until amount bytes may be transferred
+
+        Args:
+            amount: Bytes about to be sent (or just received)
+            watchdog: ThroughputWatchdog of the transfer, paused while waiting
+                so shaping is not mistaken for a slow connection
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        if watchdog is not None and self.manager.rate():
+            with watchdog.pause():
+                return self.manager.acquire(self, amount)
+        return self.manager.acquire(self, amount)
+
+# Token bucket with weighted fair sharing between concurrent transfers
+class BandwidthManager:
+    """
+    Shapes all transfers in one direction (ingress or egress) of this process
+
+    Tokens refill at the scheduled rate; whenever several transfers wait,
+    the bucket serves them in start-time fair queueing order, so each gets
+    bandwidth in proportion to its weight and a transfer that starts late
+    is not starved by one that has been running for hours. Bytes nobody is
+    waiting for are not reserved, so a lone transfer gets the whole rate.
+    """
+
+    def __init__(self, name, limit, burst=BANDWIDTH_BURST):
+        self.name = name
+        self.limit = limit
+        self.burst = burst
+        self.condition = threading.Condition()
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.virtual_time = 0.0
+        self.waiting = {}  # Ticket -> (lane, bytes requested); fetch threads may share a lane
+        self.tickets = itertools.count()
+
+    def rate(self):
+        return scheduled_rate(self.limit)
+
+    def lane(self, job, kind=None, weight=1):
+        """
+        Start shaping a transfer
+
+        Args:
+            job: Name of the transfer, e.g. the progress bus job
+            kind: Kind of transfer ('download', 'segments', 'upload'); its
+                weight comes from TRANSFER_WEIGHTS
+            weight: Weight of the job the transfer belongs to (the source's
+                bandwidth_weight), multiplied by the kind's
+
+        Returns:
+            Lane: Call acquire() with the bytes of each read or write
+        """
+        return Lane(self, job, TRANSFER_WEIGHTS.get(kind, 1) * weight)
+
+    def refill(self, rate):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+
+    def acquire(self, lane, amount):
+        """
+        Take amount bytes from the bucket for a lane, in fair order
+
+        A request larger than the burst is allowed once the bucket is full;
+        the bucket then goes negative, so the long-run rate still holds.
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        if not self.rate():
+            return 0.0
+        started = time.monotonic()
+        with self.condition:
+            # A lane that was idle joins at the current virtual time
+            lane.finish = max(lane.finish, self.virtual_time)
+            ticket = next(self.tickets)
+            self.waiting[ticket] = (lane, amount)
+
+            def finish_tag(item):
+                waiting_lane, waiting_amount = self.waiting[item]
+                return (waiting_lane.finish + waiting_amount / waiting_lane.weight, item)
+
+            try:
+                while True:
+                    rate = self.rate()
+                    if not rate:
+                        break
+                    self.refill(rate)
+                    turn = min(self.waiting, key=finish_tag)
+                    needed = min(amount, self.burst)
+                    if turn == ticket and self.tokens >= needed:
+                        self.tokens -= amount
+                        break
+                    delay = (needed - self.tokens) / rate if turn == ticket else SCHEDULE_RECHECK
+                    self.condition.wait(min(delay, SCHEDULE_RECHECK))
+                self.virtual_time = lane.finish
+                lane.finish += amount / lane.weight
+            finally:
+                del self.waiting[ticket]
+                self.condition.notify_all()
+        return time.monotonic() - started
+
+# Shared managers for everything this process downloads and uploads
+ingress = BandwidthManager("ingress", INGRESS_RATE_LIMIT)
+egress = BandwidthManager("egress", EGRESS_RATE_LIMIT)
@@ -0,0 +1,266 @@
+import errno
+import random
+import threading
+import time
+
+from .config import MAX_RETRIES
+
+# HTTP status codes that are worth retrying
+RETRIABLE_STATUS_CODES = (500, 502, 503, 504)
+# HTTP status codes that mean "slow down" rather than "broken"
+THROTTLED_STATUS_CODES = (429,)
+# YouTube reports rate limiting as 403 with one of these reasons
+THROTTLED_REASONS = ('rateLimitExceeded', 'userRateLimitExceeded')
+
+# Local OS errors (full or read-only disk, no permission) that a retry cannot fix
+LOCAL_ERRNOS = tuple(code for code in (errno.ENOSPC, getattr(errno, 'EDQUOT', None), errno.EROFS, errno.EACCES) if code is not None)
+
+# Error classes returned by classify_error
+RETRIABLE = "retriable"
+THROTTLED = "throttled"
+FATAL = "fatal"
+
+# Exception for a non-2xx HTTP response that should go through classify_error
+class HttpStatusError(Exception):
+    def __init__(self, status, message):
+        super().__init__(f"{status} - {message}")
+        self.status = status
+        self.message = message
+
+# Raised instead of retrying when a host's retry budget is used up
+class RetryBudgetExhausted(Exception):
+    pass
+
+# Find the HTTP status of an error from requests, googleapiclient or HttpStatusError
+def error_status(error):
+    status = getattr(error, 'status', None)
+    if status is None and getattr(error, 'resp', None) is not None:
+        status = getattr(error.resp, 'status', None)
+    if status is None and getattr(error, 'response', None) is not None:
+        status = getattr(error.response, 'status_code', None)
+    try:
+        return int(status) if status is not None else None
+    except (TypeError, ValueError):
+        return None
+
+# Decide whether an error is worth retrying
+def classify_error(error):
+    """
+    Classify an exception for the retry engine
+
+    Args:
+        error: The exception raised by the attempt
+
+    Returns:
+        str: RETRIABLE, THROTTLED or FATAL
+    """
+    if isinstance(error, RetryBudgetExhausted):
+        return FATAL
+
+    status = error_status(error)
+    if status is not None:
+        if status in RETRIABLE_STATUS_CODES:
+            return RETRIABLE
+        if status in THROTTLED_STATUS_CODES:
+            return THROTTLED
+        content = getattr(error, 'content', b'') or b''
+        if isinstance(content, bytes):
+            content = content.decode('utf-8', 'replace')
+        if status == 403 and any(reason in content for reason in THROTTLED_REASONS):
+            return THROTTLED
+        return FATAL
+
+    # Local file problems will not go away by retrying
+    if isinstance(error, (FileNotFoundError, PermissionError, IsADirectoryError, NotADirectoryError)):
+        return FATAL
+    if isinstance(error, OSError) and error.errno in LOCAL_ERRNOS:
+        return FATAL
+
+    # Network level problems: connection resets, timeouts, truncated bodies
+    if isinstance(error, (IOError, TimeoutError, ConnectionError)):
+        return RETRIABLE
+    if type(error).__module__.startswith(('requests', 'urllib3', 'http.client', 'ssl', 'socket')):
+        return RETRIABLE
+    return FATAL
+
+# Exponential backoff with full jitter, shared by every retry loop
+def backoff_delay(retry, base=1.0, cap=None):
+    """
+    Compute how long to sleep before the given retry
+
+    Args:
+        retry: Retry number (1-based)
+        base: Base delay in seconds
+        cap: Optional upper bound for the delay in seconds
+
+    Returns:
+        float: Seconds to sleep
+    """
+    max_sleep = base * (2 ** retry)
+    if cap is not None:
+        max_sleep = min(max_sleep, cap)
+    return random.random() * max_sleep
+
+# Token bucket limiting how many retries one host may cause
+class RetryBudget:
+    """
+    Allows bursts of up to capacity retries, refilled at refill_rate per second
+
+    Shared by every transfer talking to the same host, so a flaky host
+    cannot turn into an unbounded retry storm from many parts at once.
+    """
+
+    def __init__(self, capacity=30, refill_rate=0.1):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def consume(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_rate)
+            self.updated = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+# Stops every caller from hammering a host that is hard down
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures to a host
+
+    While open, every caller waits in before_call() until reset_timeout has
+    passed, so the whole batch pauses instead of burning retries. Then a
+    single call is let through as a probe while the others keep waiting:
+    success closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=120):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probe = None  # Thread making the half-open probe call
+        self.condition = threading.Condition()
+
+    def before_call(self):
+        with self.condition:
+            while self.opened_at is not None:
+                remaining = self.opened_at + self.reset_timeout - time.monotonic()
+                if remaining > 0:
+                    print(f"Circuit for {self.name} is open, pausing {remaining:.0f}s...")
+                    self.condition.wait(min(remaining, 30))
+                elif self.probe is None:
+                    # Half-open: this call alone probes the host
+                    self.probe = threading.get_ident()
+                    return
+                else:
+                    # The probe's outcome closes or reopens the circuit
+                    self.condition.wait(30)
+
+    def record_success(self):
+        with self.condition:
+            self.failures = 0
+            self.opened_at = None
+            self.probe = None
+            self.condition.notify_all()
+
+    def record_failure(self):
+        with self.condition:
+            self.failures += 1
+            if self.probe is not None:
+                self.probe = None
+                self.opened_at = time.monotonic()
+                print(f"Circuit for {self.name} opened again, the probe failed")
+            elif self.failures >= self.failure_threshold and self.opened_at is None:
+                self.opened_at = time.monotonic()
+                print(f"Circuit for {self.name} opened after {self.failures} consecutive failures")
+            self.condition.notify_all()
+
+    def release_probe(self):
+        """Let another call probe: this thread's call ended without telling whether the host is back"""
+        with self.condition:
+            if self.probe == threading.get_ident():
+                self.probe = None
+                self.condition.notify_all()
+
+# Shared per-host state
+_budgets = {}
+_breakers = {}
+_registry_lock = threading.Lock()
+
+def get_retry_budget(host):
+    with _registry_lock:
+        if host not in _budgets:
+            _budgets[host] = RetryBudget()
+        return _budgets[host]
+
+def get_circuit_breaker(host):
+    with _registry_lock:
+        if host not in _breakers:
+            _breakers[host] = CircuitBreaker(host)
+        return _breakers[host]
+
+# The one retry loop used for every network operation
+class RetryPolicy:
+    """
+    Retry a single small unit of work (API call, upload chunk, byte range)
+
+    Every attempt goes through the host's circuit breaker; every retry is
+    paid for from the host's retry budget and preceded by jittered
+    exponential backoff (longer when the host is throttling us).
+    """
+
+    def __init__(self, host, max_retries=MAX_RETRIES, base=1.0, cap=64, throttled_base=8.0):
+        self.host = host
+        self.max_retries = max_retries
+        self.base = base
+        self.cap = cap
+        self.throttled_base = throttled_base
+        self.budget = get_retry_budget(host)
+        self.breaker = get_circuit_breaker(host)
+
+    def call(self, func, *args, **kwargs):
+        """
+        Run func until it succeeds or the error is not worth retrying
+
+        Args:
+            func: Callable doing one unit of work
+            *args, **kwargs: Passed to func
+
+        Returns:
+            Whatever func returns
+        """
+        retry = 0
+        while True:
+            self.breaker.before_call()
+            try:
+                result = func(*args, **kwargs)
+            except BaseException as e:
+                kind = classify_error(e) if isinstance(e, Exception) else FATAL
+                if kind == FATAL:
+                    self.breaker.release_probe()
+                    raise
+                self.breaker.record_failure()
+                retry += 1
+                if retry > self.max_retries:
+                    raise Exception(f"No longer attempting to retry {self.host}: {e}")
+                if not self.budget.consume():
+                    raise RetryBudgetExhausted(f"Retry budget for {self.host} exhausted: {e}")
+
+                base = self.throttled_base if kind == THROTTLED else self.base
+                sleep_seconds = backoff_delay(retry, base=base, cap=self.cap)
+                print(f"{self.host}: {kind} error ({e}); retry {retry}/{self.max_retries} in {sleep_seconds:.1f}s")
+                time.sleep(sleep_seconds)
+                continue
+
+            self.breaker.record_success()
+            return result
+
+# Wait time between whole-part attempts
+def part_retry_wait(attempt):
+    return 5 * attempt  # Increase wait time with each attempt
@@ -0,0 +1,259 @@
+import collections
+import os
+import threading
+import time
+import zlib
+
+from .config import SEGMENT_CACHE_BYTES, SEGMENT_CACHE_DIR
+
+# Extension of committed cache entries; anything else in the directory is ignored
+ENTRY_SUFFIX = ".seg"
+# Temp files of other processes untouched for this long were left behind by a crash
+STALE_TEMP_SECONDS = 3600
+
+# Process that wrote a temp file, from its name
+def temp_owner(name):
+    try:
+        return int(name.split('.')[-4])
+    except (IndexError, ValueError):
+        return None
+
+# Segment data being written to the cache while it is downloaded
+class CacheWriter:
+    """
+    Best-effort copy of one segment into the cache
+
+    The cache only saves work, so a full or read-only disk never fails the
+    download: the first OSError drops the entry, is counted as a write
+    error, and every later write or commit is a no-op.
+    """
+
+    def __init__(self, cache, namespace):
+        self.cache = cache
+        self.namespace = namespace
+        # The process ID lets SegmentCache.load() tell its own leftovers from another process's live writes
+        self.temp_path = os.path.join(cache.directory, f"{namespace}.{os.getpid()}.{threading.get_ident()}.{id(self)}.tmp")
+        self.file = None
+        try:
+            self.file = open(self.temp_path, 'wb')
+        except OSError as e:
+            self.failed(e)
+
+    def failed(self, error):
+        print(f"Segment cache write failed, not caching this segment: {str(error)}")
+        self.cache.count('write_errors')
+        self.abort()
+
+    def write(self, data):
+        if self.file is None:
+            return
+        try:
+            self.file.write(data)
+        except OSError as e:
+            self.failed(e)
+
+    def commit(self, checksum, size):
+        """Store the written data under its content address"""
+        if self.file is None:
+            return
+        try:
+            self.file.close()
+            self.file = None
+            self.cache.add(self.temp_path, self.cache.key(self.namespace, checksum, size), size)
+        except OSError as e:
+            self.failed(e)
+
+    def abort(self):
+        if self.file is not None:
+            try:
+                self.file.close()
+            except OSError:
+                pass
+            self.file = None
+        try:
+            os.remove(self.temp_path)
+        except OSError:
+            pass
+
+# On-disk, content-addressed segment cache with a byte budget and LRU eviction
+class SegmentCache:
+    """
+    Keeps downloaded HLS segments on local disk for overlapping jobs
+
+    An entry is addressed by the segment's CRC32 and size as recorded in
+    the VOD's time index, within the index's namespace (VOD and quality),
+    so a clip, a full part, a retry or a later run that needs the same
+    segment reads it from disk instead of Twitch. Entries are verified
+    against their CRC32 when read. The least recently used entries are
+    evicted once the cache grows past max_bytes; file modification times
+    carry the recency across runs.
+    """
+
+    def __init__(self, directory=SEGMENT_CACHE_DIR, max_bytes=SEGMENT_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = collections.OrderedDict()  # Key -> size, least recently used first
+        self.total_bytes = 0
+        self.counters = {'hits': 0, 'misses': 0, 'hit_bytes': 0, 'stored': 0, 'stored_bytes': 0,
+                         'evictions': 0, 'evicted_bytes': 0, 'corrupt': 0, 'write_errors': 0}
+        os.makedirs(directory, exist_ok=True)
+        self.load()
+
+    def load(self):
+        # Rebuild the LRU order from the files left by earlier runs
+        found = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+                if name.endswith('.tmp'):
+                    # Another process sharing the cache may still be writing its temp files
+                    if temp_owner(name) == os.getpid() or time.time() - stat.st_mtime > STALE_TEMP_SECONDS:
+                        os.remove(path)
+                elif name.endswith(ENTRY_SUFFIX):
+                    found.append((stat.st_mtime, name[:-len(ENTRY_SUFFIX)], stat.st_size))
+            except OSError:
+                # Committed, evicted or cleaned up by another process meanwhile
+                continue
+        for mtime, key, size in sorted(found):
+            self.entries[key] = size
+            self.total_bytes += size
+        with self.lock:
+            self.evict()
+
+    def key(self, namespace, checksum, size):
+        return f"{namespace}_{checksum:08x}_{size}"
+
+    def path(self, key):
+        return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+    def count(self, counter, amount=1):
+        with self.lock:
+            self.counters[counter] += amount
+
+    def get(self, namespace, checksum, size):
+        """
+        Read a segment from the cache
+
+        Returns:
+            bytes: The segment data, or None on a miss
+        """
+        key = self.key(namespace, checksum, size)
+        with self.lock:
+            cached = key in self.entries
+            if cached:
+                self.entries.move_to_end(key)
+        if not cached:
+            self.count('misses')
+            return None
+
+        try:
+            with open(self.path(key), 'rb') as f:
+                data = f.read()
+            os.utime(self.path(key))
+        except OSError:
+            data = None
+        if data is None or len(data) != size or zlib.crc32(data) != checksum:
+            # Damaged or removed behind our back; fetch it again
+            self.discard(key)
+            self.count('corrupt')
+            self.count('misses')
+            return None
+
+        with self.lock:
+            self.counters['hits'] += 1
+            self.counters['hit_bytes'] += size
+        return data
+
+    def writer(self, namespace):
+        """Start writing a segment that is being downloaded"""
+        return CacheWriter(self, namespace)
+
+    def add(self, temp_path, key, size):
+        """
+        Commit a written temp file as an entry
+
+        Best-effort: if the file cannot be moved into place the entry is
+        dropped and counted as a write error instead of raising.
+        """
+        try:
+            if size > self.max_bytes:
+                os.remove(temp_path)
+                return
+            os.replace(temp_path, self.path(key))
+        except OSError as e:
+            print(f"Segment cache could not store {key}: {str(e)}")
+            self.count('write_errors')
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return
+        with self.lock:
+            if key in self.entries:
+                self.total_bytes -= self.entries[key]
+            self.entries[key] = size
+            self.entries.move_to_end(key)
+            self.total_bytes += size
+            self.counters['stored'] += 1
+            self.counters['stored_bytes'] += size
+            self.evict()
+
+    def discard(self, key):
+        with self.lock:
+            size = self.entries.pop(key, None)
+            if size is not None:
+                self.total_bytes -= size
+        try:
+            os.remove(self.path(key))
+        except OSError:
+            pass
+
+    def evict(self):
+        # Called with the lock held
+        while self.total_bytes > self.max_bytes and self.entries:
+            key, size = self.entries.popitem(last=False)
+            self.total_bytes -= size
+            self.counters['evictions'] += 1
+            self.counters['evicted_bytes'] += size
+            try:
+                os.remove(self.path(key))
+            except OSError:
+                pass
+
+    def stats(self):
+        """
+        Returns:
+            dict: Hit/miss/store/eviction counters, plus entries, bytes and budget
+        """
+        with self.lock:
+            return dict(self.counters, entries=len(self.entries), bytes=self.total_bytes, max_bytes=self.max_bytes)
+
+# Describe cache stats in one line
+def format_cache_stats(stats):
+    mb = 1024 * 1024
+    lookups = stats['hits'] + stats['misses']
+    hit_rate = 100 * stats['hits'] / lookups if lookups else 0
+    return (f"{stats['hits']} hit(s) ({stats['hit_bytes'] / mb:.1f} MB), {stats['misses']} miss(es), "
+            f"{hit_rate:.0f}% hit rate, {stats['evictions']} eviction(s) ({stats['evicted_bytes'] / mb:.1f} MB), "
+            f"{stats['bytes'] / mb:.1f}/{stats['max_bytes'] / mb:.0f} MB used"
+            + (f", {stats['write_errors']} write error(s)" if stats.get('write_errors') else ""))
+
+_segment_cache = None
+_segment_cache_lock = threading.Lock()
+
+# The process-wide segment cache, or None when SEGMENT_CACHE_BYTES is 0
+def get_segment_cache():
+    global _segment_cache
+    if not SEGMENT_CACHE_BYTES:
+        return None
+    with _segment_cache_lock:
+        if _segment_cache is None:
+            try:
+                _segment_cache = SegmentCache()
+            except OSError as e:
+                # Download without the cache rather than fail the part
+                print(f"Segment cache unavailable: {str(e)}")
+                return None
+        return _segment_cache
@@ -0,0 +1,283 @@
+import io
+import mmap
+import os
+import subprocess
+
+from .media import format_duration, is_mpegts, mp4_box_offsets
+from .process import check_output
+from .timeindex import file_index_key, load_time_index
+
+# MPEG-TS packet size
+TS_PACKET_SIZE = 188
+# Packets searched for the PAT/PMT at the start of a TS file
+TS_HEADER_SEARCH_PACKETS = 10000
+# Seconds read after a cut point when looking for the next keyframe
+KEYFRAME_SEARCH_WINDOW = 30
+
+# A part that is a byte range of a larger file plus a small header
+class FileSlice:
+    """
+    A part of a video that is uploaded straight out of the original file
+
+    The part is header + file[start:end]; nothing is written to disk. The
+    header repeats whatever the player needs from the start of the file (the
+    PAT/PMT of an MPEG-TS file, or ftyp+moov of a fragmented MP4).
+    """
+
+    def __init__(self, path, start, end, header=b'', time_offset=0, mimetype='video/mp4'):
+        self.path = path
+        self.start = start
+        self.end = end
+        self.header = header
+        self.time_offset = time_offset
+        self.mimetype = mimetype
+
+    @property
+    def size(self):
+        return len(self.header) + self.end - self.start
+
+    def open(self):
+        return SliceStream(self)
+
+    def __repr__(self):
+        return f"{os.path.basename(self.path)}[{self.start}:{self.end}]"
+
+# Read-only, seekable stream over a FileSlice, backed by mmap
+class SliceStream(io.RawIOBase):
+    def __init__(self, file_slice):
+        super().__init__()
+        self.slice = file_slice
+        self.file = open(file_slice.path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.slice.size
+        self.position = max(0, offset)
+        return self.position
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.slice.size - self.position
+        size = max(0, min(size, self.slice.size - self.position))
+        header = self.slice.header
+        chunks = []
+
+        if self.position < len(header):
+            part = header[self.position:self.position + size]
+            chunks.append(part)
+            self.position += len(part)
+            size -= len(part)
+
+        if size > 0:
+            begin = self.slice.start + self.position - len(header)
+            chunks.append(self.map[begin:begin + size])
+            self.position += size
+
+        return b''.join(chunks)
+
+    def close(self):
+        if not self.closed:
+            self.map.close()
+            self.file.close()
+        super().close()
+
+# Copy the PAT and PMT packets from the start of an MPEG-TS file
+def mpegts_header(video_path):
+    """
+    Find the first PAT and the PMT it points to
+
+    Returns:
+        bytes: The two packets, or None if they were not found
+    """
+    pat = pmt = None
+    pmt_pid = None
+    with open(video_path, 'rb') as f:
+        for _ in range(TS_HEADER_SEARCH_PACKETS):
+            packet = f.read(TS_PACKET_SIZE)
+            if len(packet) < TS_PACKET_SIZE or packet[0] != 0x47:
+                return None
+            payload_start = packet[1] & 0x40
+            pid = ((packet[1] & 0x1F) << 8) | packet[2]
+            if not payload_start:
+                continue
+
+            payload = 4
+            if packet[3] & 0x20:
+                # Skip the adaptation field
+                payload += 1 + packet[4]
+            payload += 1 + packet[payload]  # pointer_field
+
+            if pid == 0 and pat is None:
+                section_length = ((packet[payload + 1] & 0x0F) << 8) | packet[payload + 2]
+                entries_end = min(payload + 3 + section_length - 4, TS_PACKET_SIZE)
+                for entry in range(payload + 8, entries_end - 3, 4):
+                    program_number = (packet[entry] << 8) | packet[entry + 1]
+                    if program_number != 0:
+                        pmt_pid = ((packet[entry + 2] & 0x1F) << 8) | packet[entry + 3]
+                        pat = packet
+                        break
+            elif pat is not None and pid == pmt_pid:
+                pmt = packet
+                return pat + pmt
+    return None
+
+# Probe what a file needs for byte-range parts, once per source
+def probe_slice_layout(video_path):
+    """
+    Work out whether parts of a file can be uploaded as byte ranges
+
+    MPEG-TS can be cut at any packet, so a part is the PAT/PMT plus the
+    packets from one keyframe to the next cut. A fragmented MP4 can be cut at
+    fragment (moof) boundaries with ftyp+moov as the header. A regular MP4
+    keeps one moov for the whole file and cannot be sliced.
+
+    Args:
+        video_path: Path to the complete video
+
+    Returns:
+        dict: Layout used by slice_part(), or None if the file cannot be sliced
+    """
+    try:
+        if is_mpegts(video_path):
+            header = mpegts_header(video_path)
+            if header is None:
+                return None
+            return {
+                'kind': 'mpegts', 'header': header, 'data_start': 0,
+                'data_end': os.path.getsize(video_path), 'fragments': None,
+                'mimetype': 'video/mp2t', 'start_time': probe_start_time(video_path),
+                'index': load_time_index(file_index_key(video_path))
+            }
+
+        boxes = mp4_box_offsets(video_path, limit=None)
+        box_types = [box_type for box_type, offset, size in boxes]
+        fragments = [offset for box_type, offset, size in boxes if box_type == 'moof']
+        if not fragments or 'moov' not in box_types or box_types.index('moov') > box_types.index('moof'):
+            return None
+        with open(video_path, 'rb') as f:
+            header = f.read(fragments[0])
+        data_end = os.path.getsize(video_path)
+        for box_type, offset, size in boxes:
+            if box_type == 'mfra':
+                # The random access index describes the whole file; leave it out
+                data_end = offset
+        return {
+            'kind': 'fmp4', 'header': header, 'data_start': fragments[0],
+            'data_end': data_end, 'fragments': fragments,
+            'mimetype': 'video/mp4', 'start_time': probe_start_time(video_path),
+            'index': load_time_index(file_index_key(video_path))
+        }
+    except (OSError, ValueError, subprocess.CalledProcessError) as e:
+        print(f"Could not probe {video_path} for byte-range parts: {str(e)}")
+        return None
+
+# Container start timestamp; MPEG-TS files rarely start at 0
+def probe_start_time(video_path):
+    cmd = ['ffprobe', '-v', 'error', '-show_entries', 'format=start_time', '-of', 'default=noprint_wrappers=1:nokey=1', video_path]
+    output = check_output(cmd).strip()
+    return float(output) if output not in ('', 'N/A') else 0.0
+
+# Byte position of the first video keyframe at or after a time
+def keyframe_position(video_path, seconds, layout):
+    """
+    Look the keyframe up in the file's time index, probing only windows
+    that were never probed before; every keyframe of a probed window is
+    kept, so retries, reprocessed parts and later runs skip ffprobe.
+    """
+    start = layout['start_time'] + seconds
+    index = layout.get('index')
+    if index is not None:
+        position = index.keyframe_after(start)
+        if position is not None:
+            return position
+
+    cmd = [
+        'ffprobe', '-v', 'error', '-select_streams', 'v:0',
+        '-read_intervals', f"{start:.3f}%+{KEYFRAME_SEARCH_WINDOW}",
+        '-show_entries', 'packet=pts_time,pos,flags', '-of', 'csv=p=0', video_path
+    ]
+    output = check_output(cmd)
+    keyframes = []
+    for line in output.splitlines():
+        fields = line.strip().split(',')
+        if len(fields) < 3 or 'K' not in fields[2] or 'N/A' in fields[:2]:
+            continue
+        keyframes.append((float(fields[0]), int(fields[1])))
+
+    if index is not None and keyframes:
+        # ffprobe starts reading at the keyframe before start, so the window is covered from start on
+        index.add_keyframes(start, max(start, keyframes[-1][0]), keyframes)
+        index.save()
+    for keyframe_time, position in keyframes:
+        if keyframe_time >= start:
+            return position
+    return None
+
+# Turn a part's time window into a FileSlice
+def slice_part(video_path, layout, start_time, duration, total_duration):
+    """
+    Cut a part at container level, without writing anything
+
+    Args:
+        video_path: Path to the complete video
+        layout: probe_slice_layout() result
+        start_time: Part start in seconds
+        duration: Part duration in seconds
+        total_duration: Duration of the whole video in seconds
+
+    Returns:
+        FileSlice: The part, or None if no clean cut point was found
+    """
+    def cut_at(seconds):
+        if seconds <= 0:
+            return layout['data_start']
+        if seconds >= total_duration:
+            return layout['data_end']
+        position = keyframe_position(video_path, seconds, layout)
+        if position is None:
+            return None
+        if layout['kind'] == 'mpegts':
+            return position - position % TS_PACKET_SIZE
+        # Start of the fragment holding the keyframe
+        return max(offset for offset in layout['fragments'] if offset <= position)
+
+    try:
+        start = cut_at(start_time)
+        end = cut_at(start_time + duration)
+    except (OSError, ValueError, subprocess.CalledProcessError) as e:
+        print(f"Could not find cut points: {str(e)}")
+        return None
+    if start is None or end is None or end <= start:
+        return None
+
+    # A part starting at the beginning of the file already has its header
+    header = b'' if start == layout['data_start'] and layout['kind'] == 'mpegts' else layout['header']
+    return FileSlice(video_path, start, end, header, time_offset=start_time, mimetype=layout['mimetype'])
+
+# Size in bytes of a part that is either a path or a FileSlice
+def part_size(part):
+    if isinstance(part, FileSlice):
+        return part.size
+    return os.path.getsize(part)
+
+# Video info for a FileSlice, derived from the info of the whole file
+def slice_video_info(video_info, file_slice, duration):
+    return {
+        'resolution': video_info.get('resolution', 'Unknown'),
+        'file_size_mb': file_slice.size / (1024 * 1024),
+        'duration': duration,
+        'duration_formatted': format_duration(duration)
+    }
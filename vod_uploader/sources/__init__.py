@@ -0,0 +1,5 @@
+from .base import Source
+from .http import HttpSource
+from .live import LiveStreamSource
+from .local import LocalFileSource, watch_directory
+from .twitch import TwitchVodSource
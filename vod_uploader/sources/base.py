@@ -0,0 +1,160 @@
+from ..artifacts import job_artifacts
+from ..media import clean_title_for_file
+
+# Base class for pluggable sources feeding the shared split/upload engine
+class Source:
+    """
+    A source knows how to describe a video and produce one part of it on disk
+
+    The engine calls prepare() once, then fetch_part() for every part it
+    processes (possibly several times when a part is retried), and finally
+    close(). Everything after fetch_part() - metadata, upload, cleanup and
+    retries - is shared by all sources.
+    """
+
+    # Used in messages, e.g. "Error processing VOD 12345"
+    label = "video"
+    # YouTube category for uploads from this source
+    category_id = '22'
+    # Fallback file name when a title cleans down to nothing
+    default_file_name = "VideoDownload"
+    # Fail parts that are clearly shorter than the requested duration
+    verify_duration = True
+    # Remote workers can rebuild this source from spec()
+    distributable = False
+
+    def __init__(self, remux=False, transcode=None, thumbnail=None, bandwidth_weight=1):
+        # Remux parts to an MP4 with the moov atom first before uploading them
+        self.remux = remux
+        # TranscodeOptions for the opt-in re-encode stage, or None
+        self.transcode = transcode
+        # Thumbnail mode (THUMBNAIL_FRAME or THUMBNAIL_SOURCE), or None to let YouTube pick
+        self.thumbnail = thumbnail
+        # Share of the rate limits this job's transfers get next to other jobs' (2 = twice as much)
+        self.bandwidth_weight = bandwidth_weight
+        # ArtifactRegistry of this source's job, created by scratch()
+        self.artifacts = None
+
+    def scratch(self, name=None):
+        """
+        Scratch registry of this source's job
+
+        Job-level temp files (full downloads, shared clip windows) go in its
+        directory and the engine gives every part a scope of it, so one
+        cleanup() after close() removes everything the job wrote.
+
+        Args:
+            name: Readable name for the directory, used when it is created
+
+        Returns:
+            ArtifactRegistry: The same registry on every call
+        """
+        if self.artifacts is None:
+            self.artifacts = job_artifacts(name or self.label)
+        return self.artifacts
+
+    def prepare(self):
+        """
+        Fetch or compute everything needed before parts are processed
+
+        Returns:
+            dict: At least 'title' and 'duration' (seconds)
+        """
+        raise NotImplementedError
+
+    def print_info(self, info):
+        print(f"\nVideo Information:")
+        print(f"Title: {info['title']}")
+
+    def description_base(self, info):
+        raise NotImplementedError
+
+    def tags(self, info):
+        return ['Video', 'Upload']
+
+    def log_context(self, info):
+        """
+        Fields identifying this source in the job log
+
+        Returns:
+            dict: At least 'job', which also names the log file
+        """
+        return {'job': clean_title_for_file(info['title'], self.default_file_name), 'source': self.label}
+
+    def thumbnail_url(self):
+        """URL of a ready-made thumbnail image for this source, if it has one"""
+        return None
+
+    def part_metadata(self, part_num, start_time, duration):
+        """
+        Extra description text and tags for one part (e.g. chapter timestamps)
+
+        Called once per part, not per attempt, so it must not depend on the
+        fetched file.
+
+        Returns:
+            tuple: (description, tags); description may be empty
+        """
+        return "", []
+
+    def fetch_part(self, part_num, start_time, duration, base_file_name, attempt):
+        """
+        Produce the file for one part
+
+        Args:
+            part_num: Part number (1-based)
+            start_time: Start time in seconds
+            duration: Duration of this part in seconds
+            base_file_name: Base file name reserved for this part, inside
+                the part's scratch directory; files written next to it are
+                removed with the part even if they are not returned
+            attempt: Attempt number (1-based)
+
+        Returns:
+            tuple: (file_path, video_info, extra_files) where extra_files are
+            additional paths to clean up together with the part
+        """
+        raise NotImplementedError
+
+    def plan_windows(self, windows):
+        """
+        Announce the time windows the coming parts are cut from (clips)
+
+        Sources that download over the network fetch each window once and
+        cut its parts from the download; sources that already have the
+        whole file locally ignore this.
+
+        Args:
+            windows: {'start', 'end', 'parts'} dicts from merge_clip_windows()
+        """
+        pass
+
+    def spec(self):
+        """
+        JSON-serialisable description a worker on another machine rebuilds
+        this source from (see workqueue.source_from_spec)
+
+        Sources that only exist on one machine (live recordings, downloads)
+        cannot be distributed.
+
+        Returns:
+            dict: 'kind', the source's own arguments and stage_options()
+        """
+        raise ValueError(f"{type(self).__name__} has no spec, so remote workers cannot process it; run it without a work queue")
+
+    def stage_options(self):
+        # The optional local stages, for spec()
+        return {
+            'remux': self.remux,
+            'transcode': self.transcode.spec() if self.transcode else None,
+            'thumbnail': self.thumbnail,
+            'bandwidth_weight': self.bandwidth_weight
+        }
+
+    def part_finished(self, part_num, result):
+        """Called once the engine is done with a part (uploaded or given up)"""
+        pass
+
+    def close(self):
+        """Release anything created by prepare()"""
+        pass
@@ -0,0 +1,230 @@
+import os
+import requests
+from urllib.parse import urlparse
+
+from ..config import TRANSFER_RATE_WINDOW
+from ..integrity import IntegrityError, checksum_for_response, probe_container, verify_checksum
+from ..media import clean_title_for_file, get_video_info, split_video
+from ..progress import progress_bus
+from ..ratelimit import ingress
+from ..retry import RetryPolicy
+from ..slices import probe_slice_layout, slice_part, slice_video_info
+from ..watchdog import ThroughputWatchdog
+from .base import Source
+
+# Small reads so the throughput watchdog sees progress on slow connections
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Fetch whatever is still missing of a download, appending to the partial file
+def download_remaining(url, output_path, timeout, job, verification, watchdog, lane):
+    """
+    Download from the current size of output_path to the end of the file
+
+    Called once per retry by download_video, so a dropped connection only
+    costs the bytes that were in flight: the next call asks the server for
+    the remaining byte range instead of starting over. The same happens when
+    the watchdog finds the connection too slow, so a bad CDN node is left
+    after one window. The bytes are hashed as they are written;
+    verification carries the checksum between calls. Every chunk is
+    charged to the ingress lane, which holds the read back while the
+    download is over its share.
+
+    Returns:
+        int: Total file size if known, otherwise 0
+    """
+    offset = os.path.getsize(output_path) if os.path.exists(output_path) else 0
+    checksum = verification.get('checksum')
+    if checksum is None or checksum.size != offset:
+        # The hash state does not match the partial file; start clean
+        offset = 0
+        checksum = None
+    headers = {'Range': f'bytes={offset}-'} if offset else {}
+    # Ask S3 for the object's stored checksums as well
+    headers['x-amz-checksum-mode'] = 'ENABLED'
+
+    response = requests.get(url, stream=True, timeout=timeout, headers=headers)
+    if response.status_code == 416:
+        # Nothing left to fetch
+        verify_checksum(checksum, verification['expected'], os.path.basename(output_path))
+        return offset
+    response.raise_for_status()  # Check if download went OK
+
+    if offset and response.status_code != 206:
+        # Server ignored the range; start the file again
+        print("Server does not support ranged requests, restarting download")
+        offset = 0
+        checksum = None
+
+    total_size = int(response.headers.get('content-length', 0))
+    if total_size:
+        total_size += offset
+
+    if checksum is None:
+        checksum, expected = checksum_for_response(response.headers, total_size)
+        verification['checksum'] = checksum
+        verification['expected'] = expected
+
+    downloaded = offset
+    watchdog.restart(offset)
+    with open(output_path, 'ab' if offset else 'wb') as f:
+        try:
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                if chunk:
+                    f.write(chunk)
+                    checksum.update(chunk)
+                    downloaded += len(chunk)
+                    progress_bus.publish(job, downloaded, total_size)
+                    watchdog.update(downloaded)
+                    watchdog.check()
+                    lane.acquire(len(chunk), watchdog)
+        finally:
+            response.close()
+
+    if total_size and downloaded < total_size:
+        raise IOError(f"Connection closed after {downloaded} of {total_size} bytes")
+
+    try:
+        verify_checksum(checksum, verification['expected'], os.path.basename(output_path))
+    except IntegrityError:
+        # Corrupt data cannot be resumed; the retry downloads it again
+        os.remove(output_path)
+        verification.clear()
+        raise
+    return total_size
+
+# Function to download a video from a direct URL
+def download_video(url, output_path, timeout=TRANSFER_RATE_WINDOW, weight=1):
+    """
+    Download a video from a direct URL using requests with streaming
+
+    Failed and too-slow transfers are resumed from the current offset
+    through the shared retry engine rather than restarted.
+
+    Args:
+        url: Direct URL to the video
+        output_path: Where to save the video
+        timeout: Seconds a connect or a single read may block
+        weight: Bandwidth weight of the job (see BandwidthManager.lane)
+
+    Returns:
+        bool: True if download was successful
+    """
+    try:
+        print(f"Downloading video from: {url}")
+        print(f"Saving to: {output_path}")
+
+        if os.path.exists(output_path):
+            os.remove(output_path)
+
+        # Download the file in chunks; progress goes to the shared bus
+        job = f"download {os.path.basename(output_path)}"
+        policy = RetryPolicy(urlparse(url).netloc or "http")
+        try:
+            watchdog = ThroughputWatchdog(job, slack=DOWNLOAD_CHUNK_SIZE)
+            lane = ingress.lane(job, 'download', weight)
+            total_size = policy.call(download_remaining, url, output_path, timeout, job, {}, watchdog, lane)
+        finally:
+            progress_bus.finish(job)
+
+        if total_size:
+            print(f"File size: {total_size / (1024 * 1024):.2f} MB")
+
+        # Verify the file was downloaded successfully
+        if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
+            final_size = os.path.getsize(output_path) / (1024 * 1024)
+            print(f"Download complete. Final file size: {final_size:.2f} MB")
+            return True
+        else:
+            print("Download appears to have failed. The file is empty or missing.")
+            return False
+
+    except Exception as e:
+        print(f"Error downloading video: {str(e)}")
+        return False
+
+# Generate a readable title from the file name in a URL
+def title_from_url(url):
+    # Extract filename from URL
+    url_filename = url.split('/')[-1].split('?')[0]
+    # Remove extension
+    title = os.path.splitext(url_filename)[0]
+    # Clean it up
+    title = title.replace('-', ' ').replace('_', ' ')
+    # Capitalize words
+    return ' '.join(word.capitalize() for word in title.split())
+
+# Source adapter for an HTTP/S3 object: download once, split locally per part
+class HttpSource(Source):
+    def __init__(self, url, title=None, remux=False, transcode=None, thumbnail=None, bandwidth_weight=1):
+        super().__init__(remux=remux, transcode=transcode, thumbnail=thumbnail, bandwidth_weight=bandwidth_weight)
+        self.url = url
+        self.title = title or title_from_url(url)
+        self.temp_video_path = None
+        self.video_info = None
+        self.slice_layout = None
+
+    def prepare(self):
+        # Download the complete video into this job's scratch directory
+        self.temp_video_path = self.scratch(self.title).path(f"{clean_title_for_file(self.title)}_full.mp4")
+        self.scratch().register(self.temp_video_path)
+        print(f"Downloading video from AWS URL: {self.url}")
+        if not download_video(self.url, self.temp_video_path, weight=self.bandwidth_weight):
+            raise Exception("Failed to download video. Aborting.")
+
+        # Catch a truncated object before any part is cut or uploaded
+        probe_container(self.temp_video_path)
+
+        # Get video metadata
+        print("Getting video information...")
+        self.video_info = get_video_info(self.temp_video_path)
+        if not self.remux and not self.transcode:
+            # Upload parts as byte ranges of the download where the container allows it
+            self.slice_layout = probe_slice_layout(self.temp_video_path)
+        info = dict(self.video_info)
+        info['title'] = self.title
+        info['url'] = self.url
+        return info
+
+    def print_info(self, info):
+        print(f"\nVideo Information:")
+        print(f"Title: {info['title']}")
+        print(f"Duration: {info['duration_formatted']}")
+        print(f"Resolution: {info['resolution']}")
+        if info['bitrate_mbps']:
+            print(f"Bitrate: {info['bitrate_mbps']:.2f} Mbps")
+        print(f"File size: {info['file_size_mb']:.2f} MB")
+
+    def description_base(self, info):
+        return f"""
+Video Title: {info['title']}
+Original URL: {info['url']}
+Resolution: {info['resolution']}
+Duration: {info['duration_formatted']}
+
+This video was automatically uploaded using AWS Video Downloader.
+        """.strip()
+
+    def tags(self, info):
+        return ['Video', 'Upload', 'AWS']
+
+    def fetch_part(self, part_num, start_time, duration, base_file_name, attempt):
+        if self.slice_layout:
+            file_slice = slice_part(self.temp_video_path, self.slice_layout, start_time, duration, self.video_info['duration'])
+            if file_slice:
+                print(f"Uploading part {part_num} straight from {file_slice} ({file_slice.size / (1024*1024):.2f} MB, no split copy)")
+                return file_slice, slice_video_info(self.video_info, file_slice, duration), []
+
+        # Split the video using ffmpeg
+        split_file = split_video(self.temp_video_path, base_file_name, start_time, duration, attempt, faststart=self.remux)
+        if not split_file:
+            raise Exception("Failed to split video - output file missing or empty")
+        return split_file, get_video_info(split_file), []
+
+    def close(self):
+        # Clean up the original downloaded file
+        try:
+            if self.temp_video_path and os.path.exists(self.temp_video_path):
+                os.remove(self.temp_video_path)
+                print(f"Removed temporary file: {self.temp_video_path}")
+        except Exception as e:
+            print(f"Error removing temporary file: {str(e)}")
@@ -0,0 +1,177 @@
+import csv
+import os
+import shutil
+import subprocess
+import time
+
+from ..artifacts import job_artifacts
+from ..config import MAX_DURATION, PROCESS_STALL_TIMEOUT, TWITCH_CLIENT_ID, TWITCH_CLIENT_SECRET
+from ..media import clean_title_for_file, format_duration, get_video_info
+from ..process import FFMPEG_PROGRESS_ARGS, ManagedProcess, ffmpeg_progress_handler
+from ..twitch import get_live_stream
+from .local import link_or_reflink
+from .twitch import STREAMLINK_RETRY_ARGS, TwitchVodSource
+
+# Source adapter that records a live Twitch stream into parts as it runs
+class LiveStreamSource(TwitchVodSource):
+    """
+    Record a live channel and hand over each part as soon as it is finished
+
+    streamlink follows the live HLS playlist and pipes the stream into
+    ffmpeg's segment muxer, which closes a part every part_duration seconds
+    (on the next keyframe) and appends it to a segment list. The engine
+    uploads finished parts while the recorder keeps running.
+    """
+
+    label = "stream"
+    # The last part ends with the broadcast, whatever part_duration says
+    verify_duration = False
+    # The recording only exists on the machine running the recorder
+    distributable = False
+
+    def __init__(self, channel, client_id=TWITCH_CLIENT_ID, client_secret=TWITCH_CLIENT_SECRET, part_duration=MAX_DURATION, quality="best", poll_interval=5, remux=False, transcode=None, thumbnail=None, bandwidth_weight=1):
+        super().__init__(None, client_id, client_secret, remux=remux, transcode=transcode, thumbnail=thumbnail, bandwidth_weight=bandwidth_weight)
+        self.channel = channel
+        self.part_duration = part_duration
+        self.quality = quality
+        self.poll_interval = poll_interval
+        self.recording = None  # ArtifactRegistry of the recorded segments
+        self.segment_list_path = None
+        self.segment_pattern = None
+        self.streamlink_process = None
+        self.ffmpeg_process = None
+
+    def prepare(self):
+        print(f"Fetching live stream information for channel: {self.channel}")
+        self.metadata = get_live_stream(self.channel, self.client_id, self.client_secret)
+
+        # The recording gets a scratch directory of its own: segments of failed
+        # parts outlive the job's part directories and are kept for a retry
+        base_name = f"{clean_title_for_file(self.channel, self.default_file_name)}_live_{int(time.time())}"
+        self.recording = job_artifacts(f"{base_name}_recording")
+        self.segment_list_path = self.recording.path(f"{base_name}_segments.csv")
+        self.segment_pattern = self.recording.path(f"{base_name}_%03d.mp4")
+        self.start_recorder()
+        return self.metadata
+
+    def start_recorder(self):
+        streamlink_cmd = [
+            'streamlink', '--twitch-disable-ads', '--stdout',
+            self.metadata['url'], self.quality
+        ] + STREAMLINK_RETRY_ARGS
+        ffmpeg_cmd = [
+            'ffmpeg', '-hide_banner', '-loglevel', 'warning', '-i', 'pipe:0',
+            '-map', '0:v', '-map', '0:a?', '-c', 'copy',
+            '-f', 'segment', '-segment_time', str(self.part_duration),
+            '-segment_format', 'mp4', '-reset_timestamps', '1',
+            '-segment_list', self.segment_list_path, '-segment_list_type', 'csv',
+        ]
+        if self.remux:
+            # Each part is finalised with its moov atom at the front
+            ffmpeg_cmd += ['-segment_format_options', 'movflags=+faststart']
+        # Progress lines tell a live recording apart from a stalled one
+        ffmpeg_cmd += FFMPEG_PROGRESS_ARGS + [self.segment_pattern]
+        print(f"Recording {self.metadata['url']} in parts of {format_duration(self.part_duration)}")
+        self.streamlink_process = ManagedProcess(streamlink_cmd, stdout=subprocess.PIPE)
+        self.ffmpeg_process = ManagedProcess(ffmpeg_cmd, stdin=self.streamlink_process.process.stdout,
+                                             on_line=ffmpeg_progress_handler())
+        # Let streamlink see SIGPIPE if ffmpeg exits
+        self.streamlink_process.process.stdout.close()
+
+    def log_context(self, info):
+        return {'job': f"live_{self.channel}", 'source': self.label, 'channel': self.channel}
+
+    def spec(self):
+        raise ValueError(f"Live recording of {self.channel} cannot be processed by remote workers: "
+                         "its parts only exist on the machine running the recorder; run it without a work queue")
+
+    def print_info(self, info):
+        print(f"\nLive Stream Information:")
+        print(f"Title: {info['title']}")
+        print(f"Channel: {info['user_name']}")
+        print(f"Game: {info['game_name']}")
+        print(f"Started at: {info['created_at']}")
+
+    def description_base(self, info):
+        return f"""
+Twitch stream: {info['title']}
+Channel: {info['user_name']}
+Original broadcast date: {info['created_at']}
+Channel URL: {info['url']}
+
+This video was automatically recorded and uploaded from a live Twitch stream.
+        """.strip()
+
+    def completed_segments(self):
+        """
+        Read the files ffmpeg has finished writing
+
+        Returns:
+            list: Segment file paths in recording order
+        """
+        if not self.segment_list_path or not os.path.exists(self.segment_list_path):
+            return []
+        with open(self.segment_list_path, newline='') as f:
+            # ffmpeg lists segments by file name, relative to the list
+            directory = os.path.dirname(self.segment_list_path)
+            return [os.path.join(directory, row[0]) for row in csv.reader(f) if row]
+
+    def recorder_running(self):
+        return self.ffmpeg_process is not None and self.ffmpeg_process.poll() is None
+
+    def wait_for_part(self, part_num):
+        """
+        Block until the given part has been recorded
+
+        Args:
+            part_num: Part number (1-based)
+
+        Returns:
+            bool: True if the part is ready, False if the stream ended first
+        """
+        while True:
+            running = self.recorder_running()
+            if len(self.completed_segments()) >= part_num:
+                return True
+            if not running:
+                return False
+            if time.monotonic() - self.ffmpeg_process.last_activity > PROCESS_STALL_TIMEOUT:
+                # Treat a silent recorder as the end of the stream; stopping it finalises the open part
+                print(f"Recorder made no progress for {PROCESS_STALL_TIMEOUT}s, stopping it")
+                self.stop_recorder()
+                continue
+            time.sleep(self.poll_interval)
+
+    def fetch_part(self, part_num, start_time, duration, base_file_name, attempt):
+        segment_file = self.completed_segments()[part_num - 1]
+        if not os.path.exists(segment_file):
+            raise Exception(f"Recorded part is missing: {segment_file}")
+
+        # Keep the recording itself until the part has been uploaded
+        part_file = f"{base_file_name}_attempt_{attempt}.mp4"
+        if not link_or_reflink(segment_file, part_file):
+            shutil.copyfile(segment_file, part_file)
+        return part_file, get_video_info(part_file), []
+
+    def part_finished(self, part_num, result):
+        segment_file = self.completed_segments()[part_num - 1]
+        if result["status"] == "success":
+            if os.path.exists(segment_file):
+                os.remove(segment_file)
+        else:
+            print(f"Keeping recording of part {part_num} for a manual retry: {segment_file}")
+
+    def stop_recorder(self):
+        # Stop streamlink first so ffmpeg sees the end of its input and closes the open part
+        for process in (self.streamlink_process, self.ffmpeg_process):
+            if process is not None:
+                process.terminate()
+
+    def close(self):
+        # Stop recording if the engine gives up early
+        self.stop_recorder()
+        if self.recording is not None:
+            if any(os.path.exists(path) for path in self.completed_segments()):
+                print(f"Kept recordings of failed parts in: {self.recording.directory}")
+            else:
+                self.recording.cleanup()
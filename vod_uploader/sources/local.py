@@ -0,0 +1,215 @@
+import os
+import time
+
+from ..engine import process_source
+from ..config import PROBE_TIMEOUT
+from ..integrity import probe_container
+from ..media import get_video_info, split_video
+from ..process import ProcessError, run_command
+from ..slices import probe_slice_layout, slice_part, slice_video_info
+from .base import Source
+
+# File extensions picked up when watching a directory
+VIDEO_EXTENSIONS = ('.mp4', '.mkv', '.flv', '.mov', '.ts')
+
+# Give the engine its own name for a file without copying the data
+def link_or_reflink(input_file, output_file):
+    """
+    Create output_file as a hardlink or reflink of input_file
+
+    Args:
+        input_file: Existing file
+        output_file: Path to create
+
+    Returns:
+        bool: True if a zero-copy link was created
+    """
+    if os.path.exists(output_file):
+        os.remove(output_file)
+
+    try:
+        os.link(input_file, output_file)
+        print(f"Hardlinked {input_file} -> {output_file}")
+        return True
+    except OSError as e:
+        print(f"Hardlink not possible ({e}), trying reflink...")
+
+    # Copy-on-write clone (btrfs, xfs, ...); fails instead of copying otherwise
+    try:
+        run_command(['cp', '--reflink=always', input_file, output_file], timeout=PROBE_TIMEOUT, stall_timeout=None)
+        print(f"Reflinked {input_file} -> {output_file}")
+        return True
+    except (ProcessError, OSError):
+        pass
+
+    if os.path.exists(output_file):
+        os.remove(output_file)
+    return False
+
+# Source adapter for a recording that is already on this machine
+class LocalFileSource(Source):
+    """
+    Upload a local recording without routing it through download_video
+
+    A recording that fits in one part is handed to the uploader through a
+    hardlink or reflink. Longer MPEG-TS or fragmented MP4 recordings are
+    uploaded as byte ranges of the original (see slices.py); anything else
+    is cut with ffmpeg -c copy straight from the original file.
+    """
+
+    label = "recording"
+    distributable = True
+
+    def __init__(self, path, title=None, remux=False, transcode=None, thumbnail=None, bandwidth_weight=1):
+        super().__init__(remux=remux, transcode=transcode, thumbnail=thumbnail, bandwidth_weight=bandwidth_weight)
+        self.path = os.path.abspath(path)
+        if title is None:
+            title = os.path.splitext(os.path.basename(path))[0].replace('_', ' ')
+        self.title = title
+        self.video_info = None
+        self.slice_layout = None
+
+    def prepare(self):
+        if not os.path.isfile(self.path):
+            raise Exception(f"File not found: {self.path}")
+        # A recording cut short by a crash has no usable index
+        probe_container(self.path)
+
+        print(f"Reading video information from: {self.path}")
+        self.video_info = get_video_info(self.path)
+        if not self.remux and not self.transcode:
+            # Longer recordings are uploaded as byte ranges where the container allows it
+            self.slice_layout = probe_slice_layout(self.path)
+        info = dict(self.video_info)
+        info['title'] = self.title
+        info['url'] = self.path
+        return info
+
+    def print_info(self, info):
+        print(f"\nRecording Information:")
+        print(f"Title: {info['title']}")
+        print(f"Path: {info['url']}")
+        print(f"Duration: {info['duration_formatted']}")
+        print(f"Resolution: {info['resolution']}")
+        if info['bitrate_mbps']:
+            print(f"Bitrate: {info['bitrate_mbps']:.2f} Mbps")
+        print(f"File size: {info['file_size_mb']:.2f} MB")
+
+    def description_base(self, info):
+        return f"""
+Video Title: {info['title']}
+Resolution: {info['resolution']}
+Duration: {info['duration_formatted']}
+
+This video was automatically uploaded from a local recording.
+        """.strip()
+
+    def tags(self, info):
+        return ['Video', 'Upload', 'Recording']
+
+    def spec(self):
+        # Workers must see the recording at the same path (shared disk)
+        return dict(self.stage_options(), kind='local', path=self.path, title=self.title)
+
+    def fetch_part(self, part_num, start_time, duration, base_file_name, attempt):
+        # The whole recording is one part: no need to touch the data at all
+        if start_time == 0 and duration >= self.video_info['duration']:
+            ext = os.path.splitext(self.path)[1] or '.mp4'
+            linked_file = f"{base_file_name}_attempt_{attempt}{ext}"
+            if link_or_reflink(self.path, linked_file):
+                return linked_file, dict(self.video_info), []
+
+        if self.slice_layout:
+            file_slice = slice_part(self.path, self.slice_layout, start_time, duration, self.video_info['duration'])
+            if file_slice:
+                print(f"Uploading part {part_num} straight from {file_slice} ({file_slice.size / (1024*1024):.2f} MB, no split copy)")
+                return file_slice, slice_video_info(self.video_info, file_slice, duration), []
+
+        # Otherwise cut the part in place with stream copy
+        split_file = split_video(self.path, base_file_name, start_time, duration, attempt, faststart=self.remux)
+        if not split_file:
+            raise Exception("Failed to split video - output file missing or empty")
+        return split_file, get_video_info(split_file), []
+
+# Check whether a file has stopped growing
+def is_file_stable(path, stable_seconds, seen):
+    """
+    Track size and mtime of a file between polls
+
+    Args:
+        path: File to check
+        stable_seconds: How long size and mtime must stay unchanged
+        seen: Dict path -> (size, mtime, first_seen_unchanged) kept between calls
+
+    Returns:
+        bool: True once the file has not changed for stable_seconds
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        seen.pop(path, None)
+        return False
+
+    signature = (stat.st_size, stat.st_mtime)
+    now = time.monotonic()
+    previous = seen.get(path)
+    if previous is None or previous[:2] != signature:
+        seen[path] = signature + (now,)
+        return False
+    return stat.st_size > 0 and now - previous[2] >= stable_seconds
+
+# Upload every recording that lands in a directory
+def watch_directory(directory, youtube_service=None, stable_seconds=30, poll_interval=10, once=False, extensions=VIDEO_EXTENSIONS, remux=False, transcode=None, thumbnail=None, playlist=False, bandwidth_weight=1):
+    """
+    Poll a directory (e.g. an OBS output folder) and upload finished files
+
+    A file is handed to the engine as soon as its size and modification time
+    have been unchanged for stable_seconds. Files are processed unattended,
+    each through its own LocalFileSource. Part files are written to a
+    per-job scratch directory under SCRATCH_DIR and removed when the file
+    is done, so nothing new appears in the watched directory.
+
+    Args:
+        directory: Directory to watch
+        youtube_service: YouTube API service object (created if None)
+        stable_seconds: Quiet period before a file counts as finished
+        poll_interval: Seconds between directory scans
+        once: Return after every file present at start has been handled
+        extensions: File extensions to pick up
+        remux: Passed on to every LocalFileSource
+        transcode: TranscodeOptions passed on to every LocalFileSource
+        thumbnail: Thumbnail mode passed on to every LocalFileSource
+        playlist: Collect the parts of each multi-part recording into a playlist
+
+    Returns:
+        dict: path -> True/False upload result for every processed file
+    """
+    print(f"Watching {directory} for new recordings (Ctrl+C to stop)...")
+    seen = {}
+    results = {}
+
+    try:
+        while True:
+            pending = []
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if not entry.is_file() or entry.path in results:
+                        continue
+                    if not entry.name.lower().endswith(extensions):
+                        continue
+                    pending.append(entry.path)
+
+            for path in sorted(pending):
+                if is_file_stable(path, stable_seconds, seen):
+                    print(f"\nNew recording ready: {path}")
+                    results[path] = process_source(
+                        LocalFileSource(path, remux=remux, transcode=transcode, thumbnail=thumbnail, bandwidth_weight=bandwidth_weight), youtube_service=youtube_service, interactive=False, playlist=playlist)
+                    seen.pop(path, None)
+
+            if once and not pending:
+                return results
+
+            time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        print("Stopped watching.")
+    return results
@@ -0,0 +1,428 @@
+import os
+import re
+import threading
+import time
+
+from ..config import TWITCH_CLIENT_ID, TWITCH_CLIENT_SECRET
+from ..hls import HlsError, download_hls
+from ..integrity import probe_duration
+from ..joblog import job_log
+from ..media import clean_title_for_file, format_duration, get_video_info, mp4_output_args, split_video
+from ..process import FFMPEG_PROGRESS_ARGS, ProcessError, check_output, ffmpeg_progress_handler, run_command, run_pipeline
+from ..progress import progress_bus
+from ..retry import HttpStatusError
+from ..timeindex import load_time_index, vod_index_key
+from ..timeline import describe_part_window, get_vod_timeline, part_window
+from ..twitch import get_vod_metadata
+from ..watchdog import SlowTransferError, ThroughputWatchdog
+from .base import Source
+
+# Try different quality options if one fails
+QUALITIES = ["best", "1080p60", "1080p", "720p60", "720p", "480p", "360p", "worst"]
+
+# Retry individual HLS segments inside streamlink instead of failing the whole chunk
+STREAMLINK_SEGMENT_ATTEMPTS = 5
+STREAMLINK_SEGMENT_TIMEOUT = 20
+STREAMLINK_RETRY_ARGS = [
+    '--stream-segment-attempts', str(STREAMLINK_SEGMENT_ATTEMPTS),
+    '--stream-segment-timeout', str(STREAMLINK_SEGMENT_TIMEOUT)
+]
+# Times a chunk download may reconnect after the watchdog found it too slow
+MAX_RECONNECTS = 5
+
+# Format seconds as the HH:MM:SS offset streamlink expects
+def format_offset(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{(seconds % 3600) // 60:02d}:{seconds % 60:02d}"
+
+# Download a chunk through ffmpeg so it lands as a clean MP4 while it is written
+def stream_remux_download(vod_url, quality, start_offset, duration, output_path, watchdog=None, progress=None):
+    """
+    Pipe streamlink's MPEG-TS output straight into an ffmpeg remux
+
+    The output is a fragmented MP4 with the moov atom at the front, so no
+    second pass over the file is needed once the download finishes.
+
+    Args:
+        progress: Optional dict; 'seconds' is set to the media time written
+
+    Raises:
+        ProcessError: If either process fails or the download stalls
+    """
+    streamlink_cmd = [
+        'streamlink', '--loglevel', 'warning', vod_url, quality,
+        '--hls-start-offset', start_offset, '--hls-duration', f"{duration}s", '--stdout'
+    ] + STREAMLINK_RETRY_ARGS
+    ffmpeg_cmd = ['ffmpeg', '-y', '-loglevel', 'warning', '-i', 'pipe:0'] + mp4_output_args(fragmented=True) + FFMPEG_PROGRESS_ARGS + [output_path]
+
+    def record_progress(seconds, size):
+        if progress is not None:
+            progress['seconds'] = seconds
+
+    run_pipeline([streamlink_cmd, ffmpeg_cmd], watch_path=output_path, watchdog=watchdog,
+                 on_line=ffmpeg_progress_handler(record_progress))
+
+# Download a chunk with streamlink writing the MPEG-TS stream straight to a file
+def streamlink_download(vod_url, quality, start_offset, duration, output_path, watchdog=None):
+    # -f overwrites what a stalled earlier attempt left behind
+    command = [
+        'streamlink', '--progress', 'no', '--loglevel', 'warning', '-f'
+    ] + STREAMLINK_RETRY_ARGS + [
+        vod_url, quality, '--hls-start-offset', start_offset,
+        '--hls-duration', f"{duration}s", '-o', output_path
+    ]
+    print(f"Executing: {' '.join(command)}")
+    run_command(command, watch_path=output_path, watchdog=watchdog)
+
+# Join the pieces of a reconnected download into one file
+def join_pieces(pieces, output_path, remux):
+    if remux:
+        concat_list = f"{output_path}.pieces.txt"
+        joined_path = f"{output_path}.joined.mp4"
+        with open(concat_list, 'w') as f:
+            for piece in pieces:
+                f.write(f"file '{os.path.abspath(piece)}'\n")
+        try:
+            run_command(['ffmpeg', '-y', '-loglevel', 'warning', '-f', 'concat', '-safe', '0', '-i', concat_list]
+                        + mp4_output_args(fragmented=True) + FFMPEG_PROGRESS_ARGS + [joined_path],
+                        watch_path=joined_path, on_line=ffmpeg_progress_handler())
+        finally:
+            os.remove(concat_list)
+        os.replace(joined_path, output_path)
+        return
+
+    # MPEG-TS can be appended byte for byte once every piece ends on a whole packet
+    with open(output_path, 'r+b') as output:
+        output.truncate(os.path.getsize(output_path) // 188 * 188)
+        output.seek(0, os.SEEK_END)
+        for piece in pieces[1:]:
+            with open(piece, 'rb') as f:
+                remaining = os.path.getsize(piece) // 188 * 188
+                while remaining:
+                    data = f.read(min(remaining, 8 * 1024 * 1024))
+                    output.write(data)
+                    remaining -= len(data)
+
+# Download a chunk, reconnecting at the covered time if the transfer gets too slow
+def download_with_reconnects(vod_url, quality, start_time, duration, output_path, remux=False):
+    """
+    Run the chunk download under a throughput watchdog
+
+    streamlink cannot continue a byte stream, so a reconnect starts a new
+    download at the media time already covered and the pieces are joined
+    afterwards. HLS segments are fetched whole, so pieces may overlap by
+    up to one segment but never leave a gap.
+
+    Raises:
+        ProcessError: If streamlink or ffmpeg fails
+        SlowTransferError: If the download stays too slow after MAX_RECONNECTS
+    """
+    watchdog = ThroughputWatchdog(f"download {os.path.basename(output_path)}")
+    base, extension = os.path.splitext(output_path)
+    pieces = []
+    covered = 0
+    try:
+        while True:
+            piece = output_path if not pieces else f"{base}_resume_{len(pieces)}{extension}"
+            start_offset = format_offset(start_time + covered)
+            progress = {}
+            try:
+                if remux:
+                    stream_remux_download(vod_url, quality, start_offset, duration - covered, piece, watchdog, progress)
+                else:
+                    streamlink_download(vod_url, quality, start_offset, duration - covered, piece, watchdog)
+                pieces.append(piece)
+                break
+            except SlowTransferError as e:
+                print(str(e))
+                if len(pieces) >= MAX_RECONNECTS:
+                    raise
+                if remux:
+                    piece_duration = progress.get('seconds', 0)
+                else:
+                    try:
+                        piece_duration = probe_duration(piece) if os.path.exists(piece) else 0
+                    except (ProcessError, ValueError):
+                        piece_duration = 0
+                # Whole seconds only, rounded down: overlap rather than a gap
+                if int(piece_duration or 0) > 0:
+                    pieces.append(piece)
+                    covered += int(piece_duration)
+                    print(f"Reconnecting at {format_offset(start_time + covered)}")
+
+        if len(pieces) > 1:
+            print(f"Joining {len(pieces)} pieces of {output_path}")
+            join_pieces(pieces, output_path, remux)
+    finally:
+        for piece in pieces[1:]:
+            if os.path.exists(piece):
+                os.remove(piece)
+
+# Resolve the HLS playlist streamlink would download for a quality
+def resolve_stream_url(vod_url, quality):
+    return check_output(['streamlink', '--stream-url', vod_url, quality]).strip()
+
+# Download a chunk with the prefetching HLS engine, falling back to streamlink
+def download_chunk(vod_url, quality, start_time, duration, output_path, remux=False, weight=1):
+    """
+    Fetch a chunk's segments in parallel through a bounded in-memory buffer
+
+    streamlink only resolves the playlist (Twitch access token and quality
+    selection). Playlists the engine cannot handle are downloaded by
+    streamlink itself.
+
+    The VOD's time index keeps the resolved media playlist and its segment
+    timeline, so later parts, retries and reruns fetch the segments of
+    their window straight away. If the CDN no longer accepts the indexed
+    playlist, it is resolved and indexed again.
+    """
+    index = load_time_index(vod_index_key(vod_url, quality))
+    if index.has_segments:
+        try:
+            download_hls(index.playlist_url, start_time, duration, output_path, remux=remux, index=index, weight=weight)
+            return
+        except (HlsError, HttpStatusError) as e:
+            print(f"Indexed playlist no longer usable ({str(e)}), resolving it again")
+
+    playlist_url = resolve_stream_url(vod_url, quality)
+    try:
+        download_hls(playlist_url, start_time, duration, output_path, remux=remux, index=index, weight=weight)
+        return
+    except HlsError as e:
+        print(f"Prefetch download not possible ({str(e)}), using streamlink")
+    download_with_reconnects(vod_url, quality, start_time, duration, output_path, remux=remux)
+
+# Function to download a specific chunk of a VOD
+def download_vod_chunk(vod_url, title, start_time, duration, remux=False, quality=None, output_dir="", weight=1):
+    """
+    Download a specific time chunk of a Twitch VOD
+
+    Args:
+        vod_url: URL of the Twitch VOD
+        title: Title to use for the file
+        start_time: Start time in seconds
+        duration: Duration to download in seconds
+        remux: Remux to a moov-first MP4 while downloading
+        quality: Quality to try first (e.g. so all parts of a VOD match), or None
+        output_dir: Directory for the download (e.g. the part's scratch
+            directory); the working directory by default
+        weight: Bandwidth weight of the job (see BandwidthManager.lane)
+
+    Returns:
+        tuple: (filename, quality, resolution)
+    """
+    clean_title = clean_title_for_file(title, default="TwitchVOD")
+
+    # Format start time for streamlink
+    start_offset = format_offset(start_time)
+
+    # Create a consistent file name
+    file_name = os.path.join(output_dir, f"{clean_title}_chunk_{start_time}")
+
+    print(f"Original title: {title}")
+    print(f"Cleaned title for file: {file_name}")
+    print(f"Downloading chunk starting at {start_offset} for {duration} seconds")
+    job_log.event("download_started", vod_url=vod_url, title=title, start_time=start_time, duration=duration)
+
+    qualities = QUALITIES
+    if quality:
+        qualities = [quality] + [option for option in QUALITIES if option != quality]
+
+    for quality in qualities:
+        started = time.monotonic()
+        try:
+            print(f"Attempting to download with quality '{quality}'...")
+            # Neither downloader reports progress; the bus samples the file size instead
+            job = f"download {file_name}.mp4"
+            progress_bus.watch_file(job, f"{file_name}.mp4")
+            result = 0
+            error = None
+            try:
+                download_chunk(vod_url, quality, start_time, duration, f"{file_name}.mp4", remux=remux, weight=weight)
+            except (ProcessError, SlowTransferError) as e:
+                print(str(e))
+                error = str(e)
+                result = getattr(e, 'returncode', 1)
+            finally:
+                progress_bus.finish(job)
+
+            if result == 0 and os.path.exists(f"{file_name}.mp4") and os.path.getsize(f"{file_name}.mp4") > 0:
+                file_size = os.path.getsize(f"{file_name}.mp4")
+                print(f"Successfully downloaded VOD chunk with quality '{quality}'")
+
+                # Get video resolution using ffprobe if available
+                bitrate = None
+                try:
+                    resolution_cmd = ['ffprobe', '-v', 'error', '-select_streams', 'v:0', '-show_entries', 'stream=width,height', '-of', 'csv=s=x:p=0', f"{file_name}.mp4"]
+                    resolution = check_output(resolution_cmd).strip()
+                    print(f"Video resolution: {resolution}")
+
+                    bitrate_cmd = ['ffprobe', '-v', 'error', '-select_streams', 'v:0', '-show_entries', 'stream=bit_rate', '-of', 'default=noprint_wrappers=1:nokey=1', f"{file_name}.mp4"]
+                    bitrate = check_output(bitrate_cmd).strip()
+                    if bitrate and bitrate != 'N/A':
+                        bitrate = int(bitrate)
+                        print(f"Video bitrate: {bitrate / 1000000:.2f} Mbps")
+                    else:
+                        bitrate = None
+                except:
+                    resolution = "unknown"
+
+                job_log.event("download_succeeded", quality=quality, bytes=file_size, seconds=time.monotonic() - started,
+                              resolution=resolution, bitrate=bitrate)
+                return file_name, quality, resolution
+            else:
+                job_log.event("download_failed", quality=quality, seconds=time.monotonic() - started, error=error)
+                print(f"Failed to download with quality '{quality}', trying next option...")
+        except Exception as e:
+            error_msg = f"Error downloading with quality '{quality}': {str(e)}"
+            job_log.event("download_failed", quality=quality, seconds=time.monotonic() - started, error=str(e))
+            print(error_msg)
+
+    job_log.event("download_exhausted", qualities=qualities)
+    raise Exception("Failed to download VOD chunk with any quality setting")
+
+# Source adapter for a finished Twitch VOD, downloaded part by part over HLS
+class TwitchVodSource(Source):
+    label = "VOD"
+    category_id = '20'  # Gaming category
+    default_file_name = "TwitchVOD"
+    distributable = True
+
+    def __init__(self, vod_id, client_id=TWITCH_CLIENT_ID, client_secret=TWITCH_CLIENT_SECRET, remux=False, transcode=None, thumbnail=None, quality=None, bandwidth_weight=1):
+        super().__init__(remux=remux, transcode=transcode, thumbnail=thumbnail, bandwidth_weight=bandwidth_weight)
+        self.vod_id = vod_id
+        # Quality tried first for every part; None starts at the best one
+        self.quality = quality
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.metadata = None
+        self.timeline = None
+        # Shared download windows for clips, see plan_windows()
+        self.windows = []
+        self.window_lock = threading.Lock()
+
+    def prepare(self):
+        print(f"Fetching metadata for VOD ID: {self.vod_id}")
+        self.metadata = get_vod_metadata(self.vod_id, self.client_id, self.client_secret)
+        self.timeline = get_vod_timeline(self.vod_id, self.metadata, self.client_id, self.client_secret)
+        return self.metadata
+
+    def print_info(self, info):
+        print(f"\nVOD Information:")
+        print(f"Title: {info['title']}")
+        print(f"Channel: {info['user_name']}")
+        print(f"Duration: {format_duration(info['duration'])}")
+        print(f"Views: {info['view_count']}")
+        print(f"Created at: {info['created_at']}")
+
+    def description_base(self, info):
+        return f"""
+Twitch VOD: {info['title']}
+Channel: {info['user_name']}
+Original broadcast date: {info['created_at']}
+Original URL: {info['url']}
+
+This video was automatically uploaded from Twitch.
+        """.strip()
+
+    def tags(self, info):
+        # Generate meaningful tags
+        tags = ['Twitch', 'VOD', info['user_name']]
+
+        # Add any hashtags from title as tags
+        hashtags = re.findall(r'#\w+', info['title'])
+        if hashtags:
+            tags.extend([tag.strip('#') for tag in hashtags])
+        return tags
+
+    def log_context(self, info):
+        return {'job': f"vod_{self.vod_id}", 'source': self.label, 'vod_id': self.vod_id}
+
+    def thumbnail_url(self):
+        return (self.metadata or {}).get('thumbnail_url')
+
+    def spec(self):
+        # Credentials stay on each worker
+        return dict(self.stage_options(), kind='twitch', vod_id=self.vod_id, quality=self.quality)
+
+    def part_metadata(self, part_num, start_time, duration):
+        if not self.timeline:
+            return "", []
+        return describe_part_window(part_window(self.timeline, start_time, duration))
+
+    def plan_windows(self, windows):
+        self.windows = [dict(window, parts=list(window['parts']), files=None) for window in windows]
+
+    def window_for(self, part_num):
+        for window in self.windows:
+            if part_num in window['parts']:
+                return window
+        return None
+
+    def fetch_window(self, window):
+        """
+        Download a clip window once; the clips in it share the download
+
+        Returns:
+            tuple: (window file, quality)
+        """
+        with self.window_lock:
+            if window['files'] is None or not os.path.exists(window['files'][0]):
+                index = self.windows.index(window) + 1
+                downloaded_file, quality, resolution = download_vod_chunk(
+                    self.metadata['url'], f"{self.metadata['title']}_window_{index}",
+                    window['start'], window['end'] - window['start'], quality=self.quality,
+                    output_dir=self.scratch().mkdir(), weight=self.bandwidth_weight)
+                window['files'] = [f"{downloaded_file}.mp4"]
+                self.scratch().register(*window['files'])
+                window['quality'] = quality
+            return window['files'][0], window['quality']
+
+    def fetch_clip(self, window, start_time, duration, base_file_name, attempt):
+        window_file, quality = self.fetch_window(window)
+        # Stream copy from the keyframe at or before the clip start
+        clip_file = split_video(window_file, base_file_name, start_time - window['start'], duration, attempt, faststart=self.remux)
+        if not clip_file:
+            raise Exception("Failed to cut clip from the downloaded window")
+        video_info = get_video_info(clip_file)
+        video_info["quality"] = quality
+        return clip_file, video_info, []
+
+    def release_window(self, window):
+        with self.window_lock:
+            if window['files']:
+                self.scratch().release(*window['files'])
+            window['files'] = None
+
+    def part_finished(self, part_num, result):
+        window = self.window_for(part_num)
+        if window is not None:
+            window['parts'].remove(part_num)
+            if not window['parts']:
+                # Last clip of the window is done
+                self.release_window(window)
+
+    def close(self):
+        for window in self.windows:
+            self.release_window(window)
+
+    def fetch_part(self, part_num, start_time, duration, base_file_name, attempt):
+        window = self.window_for(part_num)
+        if window is not None:
+            return self.fetch_clip(window, start_time, duration, base_file_name, attempt)
+
+        title = self.metadata['title']
+        downloaded_file, quality, resolution = download_vod_chunk(
+            self.metadata['url'], f"{title}_part_{part_num}", start_time, duration, remux=self.remux, quality=self.quality,
+            output_dir=os.path.dirname(base_file_name), weight=self.bandwidth_weight)
+        file_path = f"{downloaded_file}.mp4"
+
+        # Add video info for this chunk
+        video_info = {
+            "quality": quality,
+            "resolution": resolution,
+            "file_size_mb": os.path.getsize(file_path) / (1024*1024),
+            "start_time": format_duration(start_time),
+            "duration": format_duration(duration)
+        }
+        return file_path, video_info, []
@@ -0,0 +1,108 @@
+import os
+import subprocess
+from urllib.parse import urlparse
+
+import requests
+
+from .config import PROBE_TIMEOUT
+from .process import run_command
+from .retry import HttpStatusError, RetryPolicy
+from .slices import FileSlice
+
+# Thumbnail modes for the optional thumbnail stage
+THUMBNAIL_FRAME = "frame"    # Grab a frame from the part on disk
+THUMBNAIL_SOURCE = "source"  # Use the source's own thumbnail (e.g. Twitch), falling back to a frame
+
+# Where in the part the representative frame is taken (fraction of its duration)
+FRAME_POSITION = 0.25
+THUMBNAIL_WIDTH = 1280
+THUMBNAIL_HEIGHT = 720
+# YouTube rejects custom thumbnails above 2 MB
+MAX_THUMBNAIL_SIZE = 2 * 1024 * 1024
+
+# Grab one frame from a video with a single fast seek
+def extract_frame(video_path, output_path, position):
+    """
+    Save the frame at position as a JPEG thumbnail
+
+    -ss before -i seeks on the container index to the nearest keyframe, so
+    only one GOP is decoded no matter how long the part is.
+
+    Args:
+        video_path: Video file on disk
+        output_path: JPEG file to write
+        position: Seconds into the video
+
+    Returns:
+        str: output_path, or None if no frame could be extracted
+    """
+    cmd = [
+        'ffmpeg', '-y', '-loglevel', 'error', '-ss', f"{position:.3f}", '-i', video_path,
+        '-frames:v', '1', '-vf', f"scale={THUMBNAIL_WIDTH}:-2", '-q:v', '3', output_path
+    ]
+    try:
+        run_command(cmd, timeout=PROBE_TIMEOUT)
+    except (subprocess.CalledProcessError, OSError) as e:
+        print(f"Frame extraction failed: {str(e)}")
+        return None
+    if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
+        return None
+    return output_path
+
+# Download a thumbnail image such as Twitch's thumbnail_url
+def download_thumbnail(url, output_path):
+    # Twitch URLs carry size placeholders: %{width}x%{height} (VODs) or {width}x{height} (streams)
+    url = url.replace('%{width}', str(THUMBNAIL_WIDTH)).replace('%{height}', str(THUMBNAIL_HEIGHT))
+    url = url.replace('{width}', str(THUMBNAIL_WIDTH)).replace('{height}', str(THUMBNAIL_HEIGHT))
+    if '404_processing' in url:
+        # Twitch has not generated a thumbnail for this VOD yet
+        return None
+
+    def request_thumbnail():
+        response = requests.get(url, timeout=30)
+        if response.status_code != 200:
+            raise HttpStatusError(response.status_code, f"Thumbnail download failed: {url}")
+        return response.content
+
+    try:
+        content = RetryPolicy(urlparse(url).netloc or "http").call(request_thumbnail)
+    except Exception as e:
+        print(f"Could not download thumbnail: {str(e)}")
+        return None
+
+    with open(output_path, 'wb') as f:
+        f.write(content)
+    return output_path
+
+# Produce the thumbnail for one part according to the source's thumbnail mode
+def make_part_thumbnail(source, part_file, base_file_name, duration):
+    """
+    Create a JPEG thumbnail for a part while its file is still local
+
+    Args:
+        source: Source adapter (its thumbnail mode and thumbnail_url() are used)
+        part_file: Path to the part on disk, or a FileSlice of a larger file
+        base_file_name: Base file name reserved for this part
+        duration: Duration of the part in seconds
+
+    Returns:
+        str: Path of the thumbnail, or None if there is none
+    """
+    output_path = f"{base_file_name}_thumbnail.jpg"
+    thumbnail_path = None
+
+    if source.thumbnail == THUMBNAIL_SOURCE and source.thumbnail_url():
+        thumbnail_path = download_thumbnail(source.thumbnail_url(), output_path)
+
+    if thumbnail_path is None:
+        position = max(duration, 0) * FRAME_POSITION
+        if isinstance(part_file, FileSlice):
+            # Seek in the original file instead
+            part_file, position = part_file.path, part_file.time_offset + position
+        thumbnail_path = extract_frame(part_file, output_path, position)
+
+    if thumbnail_path and os.path.getsize(thumbnail_path) > MAX_THUMBNAIL_SIZE:
+        print(f"Thumbnail {thumbnail_path} is larger than 2 MB, skipping it")
+        os.remove(thumbnail_path)
+        return None
+    return thumbnail_path
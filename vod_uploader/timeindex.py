@@ -0,0 +1,346 @@
+import base64
+import bisect
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+from array import array
+
+from .config import TIMELINE_CACHE_DIR
+
+# Indexes loaded in this process, by key
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+# Array typecodes: start times need double precision, the rest fits in 4 bytes
+START_TYPE = 'd'
+DURATION_TYPE = 'f'
+SIZE_TYPE = 'I'
+CHECKSUM_TYPE = 'I'
+POSITION_TYPE = 'q'
+# Digits at the end of a common URL prefix belong to the segment number
+SEGMENT_NUMBER_PATTERN = re.compile(r'(\d+)(.*)$', re.DOTALL)
+
+# Describe segment URLs as prefix + number + suffix, keeping only the exceptions
+def url_template(urls):
+    """
+    HLS segment URLs are nearly always numbered files in one directory
+    (Twitch: 0.ts, 1.ts, ..., with the odd 17-muted.ts), so storing one
+    template and the few URLs that do not follow it replaces tens of
+    thousands of strings.
+
+    Returns:
+        dict: 'prefix', 'first', 'suffix' and 'exceptions' (index -> URL
+        without the prefix)
+    """
+    prefix = os.path.commonprefix(urls).rstrip('0123456789') if urls else ''
+    suffixes = {}
+    first = 0
+    for i, url in enumerate(urls):
+        match = SEGMENT_NUMBER_PATTERN.match(url[len(prefix):])
+        if match:
+            if i == 0:
+                first = int(match.group(1))
+            suffixes[match.group(2)] = suffixes.get(match.group(2), 0) + 1
+    suffix = max(suffixes, key=suffixes.get) if suffixes else ''
+    exceptions = {
+        i: url[len(prefix):] for i, url in enumerate(urls)
+        if url != f"{prefix}{first + i}{suffix}"
+    }
+    return {'prefix': prefix, 'first': first, 'suffix': suffix, 'exceptions': exceptions}
+
+# Array as text for the JSON file
+def encode_array(values):
+    return base64.b64encode(values.tobytes()).decode('ascii')
+
+# Array from encode_array() output (or a plain list)
+def decode_array(typecode, value, byteorder=sys.byteorder):
+    values = array(typecode)
+    if isinstance(value, list):
+        values.extend(value)
+        return values
+    values.frombytes(base64.b64decode(value))
+    if byteorder != sys.byteorder:
+        values.byteswap()
+    return values
+
+# Persisted map from media time to HLS segments and keyframe byte offsets
+class TimeIndex:
+    """
+    Per-VOD (or per-file) time index, built once and reused
+
+    The segment manifest is kept in compact parallel arrays sorted by start
+    time: start (float64), duration (float32), downloaded byte size and
+    CRC32 (uint32 each) plus one status bit per segment, with URLs
+    generated from a template. A 48-hour VOD of 2-second segments (about
+    86,000 segments) takes under 2 MB, status updates are O(1) and the
+    segments of any time window are found with two binary searches.
+
+    Keyframes (presentation time and byte position) are added as cut
+    points are probed, together with the time windows that were probed, so
+    a keyframe lookup inside a probed window is answered without running
+    ffprobe again.
+    """
+
+    def __init__(self, key, path=None):
+        self.key = key
+        self.path = path
+        self.lock = threading.RLock()
+        self.playlist_url = None
+        self.init_url = None
+        self.template = url_template([])
+        self.starts = array(START_TYPE)
+        self.durations = array(DURATION_TYPE)
+        self.sizes = array(SIZE_TYPE)  # 0 until the segment has been downloaded once
+        self.checksums = array(CHECKSUM_TYPE)
+        self.fetched = bytearray()  # One bit per segment: downloaded completely at least once
+        self.keyframe_times = array(START_TYPE)
+        self.keyframe_positions = array(POSITION_TYPE)
+        self.probed = []  # Sorted, non-overlapping (start, end) windows
+
+    @property
+    def has_segments(self):
+        return len(self.starts) > 0
+
+    @property
+    def segment_count(self):
+        return len(self.starts)
+
+    def memory_bytes(self):
+        """Approximate size of the segment manifest in memory"""
+        arrays = (self.starts, self.durations, self.sizes, self.checksums)
+        return sum(values.itemsize * len(values) for values in arrays) + len(self.fetched)
+
+    def covers(self, end_time):
+        """Whether the indexed segments reach end_time (a VOD still being recorded grows)"""
+        if not self.has_segments:
+            return False
+        return end_time <= self.starts[-1] + 2 * self.durations[-1]
+
+    def set_segments(self, playlist_url, segments, init_url=None):
+        """
+        Replace the segment list with a freshly loaded playlist
+
+        Args:
+            playlist_url: Media playlist the segments came from
+            segments: parse_media_playlist() segments, in playlist order
+            init_url: EXT-X-MAP init segment, if any
+        """
+        with self.lock:
+            self.playlist_url = playlist_url
+            self.init_url = init_url
+            self.template = url_template([segment['url'] for segment in segments])
+            self.starts = array(START_TYPE, (segment['start'] for segment in segments))
+            self.durations = array(DURATION_TYPE, (segment['duration'] for segment in segments))
+            self.sizes = array(SIZE_TYPE, bytes(4 * len(segments)))
+            self.checksums = array(CHECKSUM_TYPE, bytes(4 * len(segments)))
+            self.fetched = bytearray((len(segments) + 7) // 8)
+
+    def url(self, i):
+        template = self.template
+        rest = template['exceptions'].get(i)
+        if rest is None:
+            return f"{template['prefix']}{template['first'] + i}{template['suffix']}"
+        return template['prefix'] + rest
+
+    def segment_range(self, start_time, duration):
+        """
+        Segments overlapping a time window, like select_segments()
+
+        Returns:
+            range: Indexes of the segments, possibly empty
+        """
+        end_time = start_time + duration
+        # The last segment starting at or before start_time may still cover it
+        first = max(bisect.bisect_right(self.starts, start_time) - 1, 0)
+        if first < len(self.starts) and self.starts[first] + self.durations[first] <= start_time:
+            first += 1
+        last = bisect.bisect_left(self.starts, end_time)
+        return range(first, max(first, last))
+
+    def segments(self, indexes):
+        return [
+            {'url': self.url(i), 'start': self.starts[i], 'duration': self.durations[i],
+             'size': self.sizes[i], 'checksum': self.checksums[i]}
+            for i in indexes
+        ]
+
+    def is_fetched(self, i):
+        return bool(self.fetched[i >> 3] & (1 << (i & 7)))
+
+    def fetched_count(self, indexes):
+        """
+        Segments of a contiguous range that were downloaded before
+
+        Counts whole bytes of the bitset at a time, so a scan of the full
+        manifest is a handful of integer operations.
+        """
+        if not indexes:
+            return 0
+        first, last = indexes[0], indexes[-1] + 1
+        with self.lock:
+            chunk = int.from_bytes(self.fetched[first >> 3:(last + 7) >> 3], 'little')
+        chunk >>= first & 7
+        chunk &= (1 << (last - first)) - 1
+        return chunk.bit_count()
+
+    def record_segments(self, indexes, sizes, checksums):
+        """
+        Mark segments as downloaded, with their byte size and CRC32
+
+        Args:
+            indexes: Segment indexes
+            sizes: Byte size of each segment
+            checksums: CRC32 of each segment's data
+        """
+        with self.lock:
+            for i, size, checksum in zip(indexes, sizes, checksums):
+                self.sizes[i] = size
+                self.checksums[i] = checksum
+                self.fetched[i >> 3] |= 1 << (i & 7)
+
+    def keyframe_after(self, seconds):
+        """
+        Byte position of the first keyframe at or after a presentation time
+
+        Returns:
+            int: Position, or None if that part of the file was never probed
+        """
+        with self.lock:
+            window = bisect.bisect_right(self.probed, (seconds, float('inf'))) - 1
+            if window < 0 or self.probed[window][1] < seconds:
+                return None
+            i = bisect.bisect_left(self.keyframe_times, seconds)
+            if i == len(self.keyframe_times) or self.keyframe_times[i] > self.probed[window][1]:
+                return None
+            return self.keyframe_positions[i]
+
+    def add_keyframes(self, window_start, window_end, keyframes):
+        """
+        Record the keyframes found by probing a time window
+
+        Args:
+            window_start, window_end: Presentation times that were probed
+            keyframes: (time, byte position) pairs found in the window
+        """
+        with self.lock:
+            for keyframe_time, position in keyframes:
+                i = bisect.bisect_left(self.keyframe_times, keyframe_time)
+                if i < len(self.keyframe_times) and self.keyframe_times[i] == keyframe_time:
+                    continue
+                self.keyframe_times.insert(i, keyframe_time)
+                self.keyframe_positions.insert(i, position)
+
+            # Merge the window into the probed ranges
+            merged = []
+            for start, end in sorted(self.probed + [(window_start, window_end)]):
+                if merged and start <= merged[-1][1]:
+                    merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+                else:
+                    merged.append((start, end))
+            self.probed = merged
+
+    def to_dict(self):
+        with self.lock:
+            template = dict(self.template, exceptions={str(i): rest for i, rest in self.template['exceptions'].items()})
+            return {
+                'key': self.key,
+                'byteorder': sys.byteorder,
+                'playlist_url': self.playlist_url,
+                'init_url': self.init_url,
+                'segments': {
+                    'template': template,
+                    'starts': encode_array(self.starts),
+                    'durations': encode_array(self.durations),
+                    'sizes': encode_array(self.sizes),
+                    'checksums': encode_array(self.checksums),
+                    'fetched': base64.b64encode(bytes(self.fetched)).decode('ascii')
+                },
+                'keyframes': {'times': encode_array(self.keyframe_times), 'positions': encode_array(self.keyframe_positions)},
+                'probed': self.probed
+            }
+
+    @classmethod
+    def from_dict(cls, data, path=None):
+        index = cls(data['key'], path)
+        byteorder = data.get('byteorder', sys.byteorder)
+        index.playlist_url = data.get('playlist_url')
+        index.init_url = data.get('init_url')
+        segments = data.get('segments') or {}
+        if 'urls' in segments:
+            # Written before URL templates
+            index.template = url_template(segments['urls'])
+        elif 'template' in segments:
+            template = segments['template']
+            index.template = dict(template, exceptions={int(i): rest for i, rest in template['exceptions'].items()})
+        index.starts = decode_array(START_TYPE, segments.get('starts', []), byteorder)
+        index.durations = decode_array(DURATION_TYPE, segments.get('durations', []), byteorder)
+        count = len(index.starts)
+        index.sizes = decode_array(SIZE_TYPE, segments.get('sizes', [0] * count), byteorder)
+        index.checksums = decode_array(CHECKSUM_TYPE, segments.get('checksums', [0] * count), byteorder)
+        if 'fetched' in segments:
+            index.fetched = bytearray(base64.b64decode(segments['fetched']))
+        else:
+            index.fetched = bytearray((count + 7) // 8)
+            for i, size in enumerate(index.sizes):
+                if size:
+                    index.fetched[i >> 3] |= 1 << (i & 7)
+        keyframes = data.get('keyframes') or {}
+        index.keyframe_times = decode_array(START_TYPE, keyframes.get('times', []), byteorder)
+        index.keyframe_positions = decode_array(POSITION_TYPE, keyframes.get('positions', []), byteorder)
+        index.probed = [tuple(window) for window in data.get('probed', [])]
+        return index
+
+    def save(self):
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            temp_path = f"{self.path}.tmp"
+            # One writer at a time; the rename keeps the file whole for other runs
+            with self.lock, open(temp_path, 'w') as f:
+                json.dump(self.to_dict(), f)
+                f.close()
+                os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"Could not save time index {self.path}: {str(e)}")
+
+# Load the time index for a key, creating an empty one on first use
+def load_time_index(key, cache_dir=TIMELINE_CACHE_DIR):
+    """
+    Args:
+        key: Index key, e.g. from vod_index_key() or file_index_key()
+        cache_dir: Directory holding the persisted indexes
+
+    Returns:
+        TimeIndex: Shared by every caller in this process
+    """
+    with _indexes_lock:
+        if key in _indexes:
+            return _indexes[key]
+
+        path = os.path.join(cache_dir, f"{key}_index.json")
+        index = None
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    index = TimeIndex.from_dict(json.load(f), path)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Ignoring unreadable time index {path}: {str(e)}")
+        if index is None:
+            index = TimeIndex(key, path)
+        _indexes[key] = index
+        return index
+
+# Index key of one quality of a Twitch VOD
+def vod_index_key(vod_url, quality):
+    vod_id = vod_url.rstrip('/').split('/')[-1]
+    return f"{vod_id}_{quality}"
+
+# Index key of a local file; a rewritten file gets a fresh index
+def file_index_key(video_path):
+    stat = os.stat(video_path)
+    identity = f"{os.path.abspath(video_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    return f"file_{hashlib.sha1(identity.encode('utf-8')).hexdigest()[:16]}"
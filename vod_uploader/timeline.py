@@ -0,0 +1,234 @@
+import json
+import os
+
+import requests
+
+from .config import TIMELINE_CACHE_DIR, TWITCH_CLIENT_ID, TWITCH_CLIENT_SECRET
+from .retry import HttpStatusError, RetryPolicy
+from .twitch import helix_get
+
+# Chapters (game changes) are only exposed through Twitch's web GraphQL API
+GQL_URL = 'https://gql.twitch.tv/gql'
+GQL_HOST = "gql.twitch.tv"
+GQL_CLIENT_ID = 'kimne78kx3ncx6brgo4mv6wki5h1ko'  # Public client ID of the Twitch web player
+CHAPTERS_QUERY = """
+query VodChapters($id: ID!) {
+  video(id: $id) {
+    moments(momentRequestType: VIDEO_CHAPTER_MARKERS) {
+      edges {
+        node {
+          description
+          positionMilliseconds
+          durationMilliseconds
+          details { ... on GameChangeMomentDetails { game { displayName } } }
+        }
+      }
+    }
+  }
+}
+"""
+
+# YouTube ignores chapters shorter than this
+MIN_CHAPTER_SECONDS = 10
+
+# Timelines already loaded in this process, keyed by VOD ID
+_timelines = {}
+
+# Fetch the chapter list of a VOD
+def fetch_chapters(vod_id):
+    def request_chapters():
+        response = requests.post(
+            GQL_URL,
+            json={'query': CHAPTERS_QUERY, 'variables': {'id': str(vod_id)}},
+            headers={'Client-ID': GQL_CLIENT_ID},
+            timeout=30
+        )
+        if response.status_code != 200:
+            raise HttpStatusError(response.status_code, f"Twitch GQL error: {response.text}")
+        return response.json()
+
+    data = RetryPolicy(GQL_HOST).call(request_chapters)
+    video = (data.get('data') or {}).get('video') or {}
+    edges = (video.get('moments') or {}).get('edges') or []
+
+    chapters = []
+    for edge in edges:
+        node = edge.get('node') or {}
+        game = ((node.get('details') or {}).get('game') or {}).get('displayName', '')
+        chapters.append({
+            'start': (node.get('positionMilliseconds') or 0) / 1000,
+            'duration': (node.get('durationMilliseconds') or 0) / 1000,
+            'title': node.get('description') or game,
+            'game': game
+        })
+    chapters.sort(key=lambda chapter: chapter['start'])
+    return chapters
+
+# Fetch the stream markers of a VOD
+def fetch_markers(vod_id, client_id=TWITCH_CLIENT_ID, client_secret=TWITCH_CLIENT_SECRET):
+    data = helix_get('streams/markers', {'video_id': vod_id, 'first': 100}, client_id, client_secret).get('data', [])
+    markers = []
+    for user in data:
+        for video in user.get('videos', []):
+            for marker in video.get('markers', []):
+                markers.append({
+                    'start': marker.get('position_seconds', 0),
+                    'description': marker.get('description') or 'Marker'
+                })
+    markers.sort(key=lambda marker: marker['start'])
+    return markers
+
+# Load a VOD's chapters, markers and muted segments, fetching them at most once
+def get_vod_timeline(vod_id, metadata, client_id=TWITCH_CLIENT_ID, client_secret=TWITCH_CLIENT_SECRET, cache_dir=TIMELINE_CACHE_DIR):
+    """
+    Get everything needed to build per-part descriptions for a VOD
+
+    All Twitch data is fetched in one pass and cached in memory and on disk,
+    so parts, retries and later runs for the same VOD make no extra calls.
+    Chapters and markers are optional: markers need a broadcaster token and
+    are skipped when the app token is refused.
+
+    Args:
+        vod_id: Twitch VOD ID
+        metadata: get_vod_metadata() result (supplies the muted segments)
+        client_id: Twitch client ID
+        client_secret: Twitch client secret
+        cache_dir: Directory holding cached timelines
+
+    Returns:
+        dict: 'chapters', 'markers' and 'muted' lists (times in seconds)
+    """
+    if vod_id in _timelines:
+        return _timelines[vod_id]
+
+    cache_path = os.path.join(cache_dir, f"{vod_id}_timeline.json")
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path) as f:
+                _timelines[vod_id] = json.load(f)
+            print(f"Loaded cached chapters and markers from {cache_path}")
+            return _timelines[vod_id]
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable timeline cache {cache_path}: {str(e)}")
+
+    print(f"Fetching chapters and markers for VOD {vod_id}")
+    try:
+        chapters = fetch_chapters(vod_id)
+    except Exception as e:
+        print(f"Could not fetch chapters: {str(e)}")
+        chapters = []
+
+    try:
+        markers = fetch_markers(vod_id, client_id, client_secret)
+    except Exception as e:
+        print(f"Could not fetch stream markers: {str(e)}")
+        markers = []
+
+    muted = [
+        {'start': segment.get('offset', 0), 'duration': segment.get('duration', 0)}
+        for segment in metadata.get('muted_segments', [])
+    ]
+
+    timeline = {'chapters': chapters, 'markers': markers, 'muted': muted}
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(cache_path, 'w') as f:
+            json.dump(timeline, f)
+    except OSError as e:
+        print(f"Could not cache timeline: {str(e)}")
+
+    _timelines[vod_id] = timeline
+    return timeline
+
+# Format seconds the way YouTube recognises timestamps in descriptions
+def format_timestamp(seconds):
+    seconds = int(seconds)
+    hours = seconds // 3600
+    minutes = (seconds % 3600) // 60
+    secs = seconds % 60
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes}:{secs:02d}"
+
+# Map a VOD timeline onto one part
+def part_window(timeline, start_time, duration):
+    """
+    Select and shift the timeline entries that fall inside a part
+
+    Args:
+        timeline: get_vod_timeline() result
+        start_time: Part start in VOD seconds
+        duration: Part duration in seconds
+
+    Returns:
+        dict: 'chapters', 'markers' and 'muted' lists in part-relative seconds
+    """
+    end_time = start_time + duration
+
+    chapters = []
+    for chapter in timeline.get('chapters', []):
+        chapter_end = chapter['start'] + chapter['duration'] if chapter['duration'] else end_time
+        if chapter_end <= start_time or chapter['start'] >= end_time:
+            continue
+        start = max(chapter['start'], start_time) - start_time
+        # Too short to become a YouTube chapter; fold it into the previous one
+        if chapters and min(chapter_end, end_time) - start_time - start < MIN_CHAPTER_SECONDS:
+            continue
+        chapters.append({'start': start, 'title': chapter['title'], 'game': chapter['game']})
+    if chapters:
+        # YouTube only builds chapters when the first timestamp is 0:00
+        chapters[0]['start'] = 0
+
+    markers = [
+        {'start': marker['start'] - start_time, 'description': marker['description']}
+        for marker in timeline.get('markers', [])
+        if start_time <= marker['start'] < end_time
+    ]
+
+    muted = []
+    for segment in timeline.get('muted', []):
+        segment_end = segment['start'] + segment['duration']
+        if segment_end <= start_time or segment['start'] >= end_time:
+            continue
+        muted.append({
+            'start': max(segment['start'], start_time) - start_time,
+            'end': min(segment_end, end_time) - start_time
+        })
+
+    return {'chapters': chapters, 'markers': markers, 'muted': muted}
+
+# Turn a part window into description text and tags
+def describe_part_window(window):
+    """
+    Build the timestamped description block and extra tags for a part
+
+    Args:
+        window: part_window() result
+
+    Returns:
+        tuple: (description, tags)
+    """
+    sections = []
+    tags = []
+
+    if window['chapters']:
+        lines = ["Chapters:"]
+        for chapter in window['chapters']:
+            lines.append(f"{format_timestamp(chapter['start'])} {chapter['title']}")
+            if chapter['game'] and chapter['game'] not in tags:
+                tags.append(chapter['game'])
+        sections.append("\n".join(lines))
+
+    if window['markers']:
+        lines = ["Stream markers:"]
+        for marker in window['markers']:
+            lines.append(f"{format_timestamp(marker['start'])} {marker['description']}")
+        sections.append("\n".join(lines))
+
+    if window['muted']:
+        lines = ["Muted audio (Twitch copyright detection):"]
+        for segment in window['muted']:
+            lines.append(f"{format_timestamp(segment['start'])} - {format_timestamp(segment['end'])}")
+        sections.append("\n".join(lines))
+
+    return "\n\n".join(sections), tags
@@ -0,0 +1,213 @@
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+from .media import get_video_info
+from .process import FFMPEG_PROGRESS_ARGS, ffmpeg_progress_handler, run_command, run_pipeline
+from .slices import probe_start_time
+
+# Audio is copied as-is; reserve this much of a size target for it
+AUDIO_BITRATE_ALLOWANCE = 160000
+
+# Settings for the opt-in re-encode stage
+class TranscodeOptions:
+    """
+    How to shrink high-bitrate parts before upload
+
+    Exactly one of target_bitrate (bits per second) or target_size (bytes)
+    should be given. Parts whose bitrate is already within min_ratio of the
+    target are uploaded untouched.
+    """
+
+    def __init__(self, target_bitrate=None, target_size=None, codec='libx264', preset='veryfast', workers=None, segments_per_worker=2, min_ratio=1.25):
+        if not target_bitrate and not target_size:
+            raise ValueError("TranscodeOptions needs target_bitrate or target_size")
+        self.target_bitrate = target_bitrate
+        self.target_size = target_size
+        self.codec = codec
+        self.preset = preset
+        self.workers = workers or os.cpu_count() or 1
+        self.segments_per_worker = segments_per_worker
+        self.min_ratio = min_ratio
+
+    def spec(self):
+        # Everything but workers, which each machine derives from its own CPU count
+        return {
+            'target_bitrate': self.target_bitrate, 'target_size': self.target_size,
+            'codec': self.codec, 'preset': self.preset,
+            'segments_per_worker': self.segments_per_worker, 'min_ratio': self.min_ratio
+        }
+
+    def video_bitrate_for(self, duration):
+        """
+        Video bitrate that meets the target for a part of the given length
+
+        Args:
+            duration: Part duration in seconds
+
+        Returns:
+            int: Video bitrate in bits per second
+        """
+        if self.target_bitrate:
+            return int(self.target_bitrate)
+        total = self.target_size * 8 / max(duration, 1)
+        return int(max(total - AUDIO_BITRATE_ALLOWANCE, 100000))
+
+# Find keyframe timestamps so sub-segments can be cut without re-encoding
+def probe_keyframes(video_path):
+    # Packet flags are read from the container; nothing is decoded
+    cmd = [
+        'ffprobe', '-v', 'error', '-select_streams', 'v:0',
+        '-show_entries', 'packet=pts_time,flags', '-of', 'csv=p=0', video_path
+    ]
+    # Reads the whole part; output arriving on stdout counts as progress
+    output = run_pipeline([cmd], capture=True)
+    keyframes = []
+    for line in output.splitlines():
+        fields = line.strip().split(',')
+        if len(fields) >= 2 and 'K' in fields[1] and fields[0] not in ('', 'N/A'):
+            keyframes.append(float(fields[0]))
+    keyframes.sort()
+    return keyframes
+
+# Pick GOP-aligned cut points that split a part into roughly equal pieces
+def plan_cut_points(keyframes, duration, segment_count, start_time=0.0):
+    """
+    Choose segment boundaries on keyframes
+
+    Args:
+        keyframes: Sorted keyframe timestamps in seconds, as probed
+            (container time, which starts at start_time)
+        duration: Part duration in seconds
+        segment_count: Desired number of sub-segments
+        start_time: Container start time (format=start_time); Twitch TS
+            parts after the first keep the VOD's absolute timestamps
+
+    Returns:
+        list: Cut timestamps from the start of the part (excluding 0 and
+        the end), the timeline the segment muxer cuts on without -copyts
+    """
+    cut_points = []
+    if segment_count < 2 or not keyframes:
+        return cut_points
+
+    # Targets count from 0, so put the keyframes on the same time base
+    keyframes = [keyframe - start_time for keyframe in keyframes]
+
+    index = 0
+    for n in range(1, segment_count):
+        target = duration * n / segment_count
+        # Advance to the first keyframe at or after the target
+        while index < len(keyframes) and keyframes[index] < target:
+            index += 1
+        if index >= len(keyframes):
+            break
+        cut = keyframes[index]
+        if cut > 0 and (not cut_points or cut > cut_points[-1]):
+            cut_points.append(cut)
+    return cut_points
+
+# Encode one sub-segment in its own ffmpeg process; runs on a pool thread
+def encode_segment(input_file, output_file, codec, preset, video_bitrate, threads):
+    cmd = [
+        'ffmpeg', '-y', '-loglevel', 'error', '-i', input_file,
+        '-map', '0:v', '-map', '0:a?',
+        '-c:v', codec, '-preset', preset,
+        '-b:v', str(video_bitrate), '-maxrate', str(int(video_bitrate * 1.5)), '-bufsize', str(video_bitrate * 2),
+        '-threads', str(threads),
+        '-c:a', 'copy', '-f', 'mpegts'
+    ] + FFMPEG_PROGRESS_ARGS + [output_file]
+    run_command(cmd, on_line=ffmpeg_progress_handler())
+    return output_file
+
+# Decide whether re-encoding a part is worth it
+def should_transcode(video_info, options):
+    duration = video_info.get('duration') or 0
+    bitrate = video_info.get('bitrate')
+    if not bitrate and duration:
+        # Stream bitrate is often missing for MPEG-TS; fall back to the average
+        bitrate = video_info.get('file_size', 0) * 8 / duration
+    if not bitrate or not duration:
+        return False
+    return bitrate > options.video_bitrate_for(duration) * options.min_ratio
+
+# Re-encode a part in parallel GOP-aligned pieces and join them without re-encoding
+def transcode_part(part_file, output_file, options, video_info=None):
+    """
+    Shrink a part to the configured bitrate or size using every CPU core
+
+    The part is cut on keyframes with -c copy, the pieces are encoded by a
+    pool of ffmpeg processes, and the results are concatenated with
+    the concat demuxer (no second encode).
+
+    Args:
+        part_file: Path to the part
+        output_file: Path of the MP4 to write
+        options: TranscodeOptions
+        video_info: get_video_info() result for part_file, if already known
+
+    Returns:
+        str: output_file, or None if the part was left as it is
+    """
+    if video_info is None or not video_info.get('duration'):
+        video_info = get_video_info(part_file)
+    if not should_transcode(video_info, options):
+        print("Bitrate already at or below target, skipping transcode")
+        return None
+
+    duration = video_info['duration']
+    video_bitrate = options.video_bitrate_for(duration)
+    work_dir = f"{os.path.splitext(output_file)[0]}_transcode"
+    os.makedirs(work_dir, exist_ok=True)
+
+    try:
+        # Cut GOP-aligned sub-segments without re-encoding
+        segment_count = options.workers * options.segments_per_worker
+        cut_points = plan_cut_points(probe_keyframes(part_file), duration, segment_count, probe_start_time(part_file))
+        segment_pattern = os.path.join(work_dir, 'source_%04d.ts')
+        split_cmd = [
+            'ffmpeg', '-y', '-loglevel', 'error', '-i', part_file,
+            '-map', '0:v', '-map', '0:a?', '-c', 'copy', '-f', 'segment', '-reset_timestamps', '1'
+        ]
+        if cut_points:
+            split_cmd += ['-segment_times', ','.join(f"{cut:.6f}" for cut in cut_points)]
+        else:
+            split_cmd += ['-segment_time', str(duration + 1)]
+        run_command(split_cmd + FFMPEG_PROGRESS_ARGS + [segment_pattern], on_line=ffmpeg_progress_handler())
+        sources = sorted(os.path.join(work_dir, name) for name in os.listdir(work_dir) if name.startswith('source_'))
+
+        print(f"Transcoding {len(sources)} segment(s) to {video_bitrate / 1000000:.2f} Mbps "
+              f"with {options.codec} on {options.workers} worker(s)")
+
+        # Encode all pieces in parallel. Each piece is its own ffmpeg process, so
+        # threads are enough to drive them; forking this multi-threaded process
+        # (transfer, log and progress threads) for a process pool could deadlock
+        threads = max(1, (os.cpu_count() or 1) // options.workers)
+        with ThreadPoolExecutor(max_workers=options.workers, thread_name_prefix="transcode") as pool:
+            futures = [
+                pool.submit(encode_segment, source, os.path.join(work_dir, os.path.basename(source).replace('source_', 'encoded_')),
+                            options.codec, options.preset, video_bitrate, threads)
+                for source in sources
+            ]
+            encoded = [future.result() for future in futures]
+
+        # Join the encoded pieces without re-encoding
+        concat_list = os.path.join(work_dir, 'concat.txt')
+        with open(concat_list, 'w') as f:
+            for path in encoded:
+                f.write(f"file '{os.path.abspath(path)}'\n")
+        concat_cmd = [
+            'ffmpeg', '-y', '-loglevel', 'error', '-f', 'concat', '-safe', '0', '-i', concat_list,
+            '-c', 'copy', '-movflags', '+faststart'
+        ] + FFMPEG_PROGRESS_ARGS + [output_file]
+        run_command(concat_cmd, watch_path=output_file, on_line=ffmpeg_progress_handler())
+
+        if not os.path.exists(output_file) or os.path.getsize(output_file) == 0:
+            raise Exception("Transcode output file is empty or missing")
+
+        before = os.path.getsize(part_file) / (1024 * 1024)
+        after = os.path.getsize(output_file) / (1024 * 1024)
+        print(f"Transcode complete: {before:.2f} MB -> {after:.2f} MB")
+        return output_file
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
@@ -0,0 +1,117 @@
+import requests
+
+from .config import TWITCH_CLIENT_ID, TWITCH_CLIENT_SECRET
+from .retry import HttpStatusError, RetryPolicy
+
+# Retry engine host names for the Twitch API
+TWITCH_AUTH_HOST = "id.twitch.tv"
+TWITCH_API_HOST = "api.twitch.tv"
+
+# Get Twitch API access token
+def get_twitch_access_token(client_id=TWITCH_CLIENT_ID, client_secret=TWITCH_CLIENT_SECRET):
+    url = 'https://id.twitch.tv/oauth2/token'
+    payload = {
+        'client_id': client_id,
+        'client_secret': client_secret,
+        'grant_type': 'client_credentials'
+    }
+
+    def request_token():
+        response = requests.post(url, data=payload, timeout=30)
+        if response.status_code != 200:
+            raise HttpStatusError(response.status_code, f"Failed to get Twitch access token: {response.text}")
+        return response.json()['access_token']
+
+    return RetryPolicy(TWITCH_AUTH_HOST).call(request_token)
+
+# Call a Helix endpoint through the retry engine
+def helix_get(path, params, client_id=TWITCH_CLIENT_ID, client_secret=TWITCH_CLIENT_SECRET):
+    """
+    GET a Twitch Helix endpoint, retrying 5xx, 429 and network errors
+
+    Args:
+        path: Endpoint path below /helix/, e.g. "videos"
+        params: Query parameters
+        client_id: Twitch client ID
+        client_secret: Twitch client secret
+
+    Returns:
+        dict: Decoded JSON response
+    """
+    access_token = get_twitch_access_token(client_id, client_secret)
+    url = f'https://api.twitch.tv/helix/{path}'
+    headers = {
+        'Client-ID': client_id,
+        'Authorization': f'Bearer {access_token}'
+    }
+
+    def request_helix():
+        response = requests.get(url, headers=headers, params=params, timeout=30)
+        if response.status_code != 200:
+            raise HttpStatusError(response.status_code, f"Twitch API error: {response.text}")
+        return response.json()
+
+    return RetryPolicy(TWITCH_API_HOST).call(request_helix)
+
+# Function to get VOD metadata from Twitch API
+def get_vod_metadata(vod_id, client_id=TWITCH_CLIENT_ID, client_secret=TWITCH_CLIENT_SECRET):
+    data = helix_get('videos', {'id': vod_id}, client_id, client_secret).get('data', [])
+    if not data:
+        raise Exception(f"No VOD found with ID: {vod_id}")
+
+    vod_data = data[0]
+    title = vod_data['title']
+    duration = parse_twitch_duration(vod_data['duration'])
+    return {
+        'title': title,
+        'duration': duration,
+        'url': f'https://www.twitch.tv/videos/{vod_id}',
+        'thumbnail_url': vod_data.get('thumbnail_url', ''),
+        'created_at': vod_data.get('created_at', ''),
+        'view_count': vod_data.get('view_count', 0),
+        'user_name': vod_data.get('user_name', ''),
+        'muted_segments': vod_data.get('muted_segments') or []
+    }
+
+# Convert Twitch duration format to seconds
+def parse_twitch_duration(duration_str):
+    hours = minutes = seconds = 0
+    if 'h' in duration_str:
+        hours = int(duration_str.split('h')[0])
+        duration_str = duration_str.split('h')[1]
+    if 'm' in duration_str:
+        minutes = int(duration_str.split('m')[0])
+        duration_str = duration_str.split('m')[1]
+    if 's' in duration_str:
+        seconds = int(duration_str.split('s')[0])
+    return hours * 3600 + minutes * 60 + seconds
+
+# Extract VOD ID if full URL was provided
+def extract_vod_id(vod_input):
+    vod_id = vod_input.strip()
+    if 'twitch.tv/videos/' in vod_id:
+        vod_id = vod_id.split('twitch.tv/videos/')[1].split('?')[0]
+    return vod_id
+
+# Function to get the current live stream of a channel from Twitch API
+def get_live_stream(channel, client_id=TWITCH_CLIENT_ID, client_secret=TWITCH_CLIENT_SECRET):
+    data = helix_get('streams', {'user_login': channel}, client_id, client_secret).get('data', [])
+    if not data:
+        raise Exception(f"Channel {channel} is not live")
+
+    stream_data = data[0]
+    return {
+        'title': stream_data['title'],
+        'url': f'https://www.twitch.tv/{channel}',
+        'thumbnail_url': stream_data.get('thumbnail_url', ''),
+        'created_at': stream_data.get('started_at', ''),
+        'game_name': stream_data.get('game_name', ''),
+        'user_name': stream_data.get('user_name', channel)
+    }
+
+# Extract a channel name from a channel URL, or None for VOD input
+def extract_channel(channel_input):
+    channel_input = channel_input.strip()
+    if 'twitch.tv/' not in channel_input or 'twitch.tv/videos/' in channel_input:
+        return None
+    return channel_input.split('twitch.tv/')[1].split('/')[0].split('?')[0] or None
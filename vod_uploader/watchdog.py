@@ -0,0 +1,131 @@
+import collections
+import threading
+import time
+from contextlib import contextmanager
+
+from .config import MIN_TRANSFER_RATE, TRANSFER_RATE_WINDOW
+
+# Seconds between checks of the background monitor
+MONITOR_INTERVAL = 1
+
+# A transfer that fell below the minimum rate; retriable, the retry reconnects
+class SlowTransferError(IOError):
+    pass
+
+# Minimum throughput over a sliding window for one transfer
+class ThroughputWatchdog:
+    """
+    Tracks the position of a transfer and judges its rate over the last window seconds
+
+    The rate is only judged once a full window has passed since the
+    transfer (or the last reconnect) started, so connection setup and slow
+    starts are not penalised. Time without any progress counts against the
+    rate, so a transfer that stops completely trips the watchdog as well.
+
+    Transfers that report progress in steps (one upload chunk, one read)
+    pass the step size as slack: that many bytes may be in flight without
+    being reported yet and are counted in the transfer's favour.
+    """
+
+    def __init__(self, label, min_rate=MIN_TRANSFER_RATE, window=TRANSFER_RATE_WINDOW, slack=0):
+        self.label = label
+        self.min_rate = min_rate
+        self.window = window
+        self.slack = slack
+        self.lock = threading.Lock()
+        self.stop_event = None
+        self.paused = False
+        self.restart()
+
+    def restart(self, position=0):
+        """Start a new window, e.g. after reconnecting at position"""
+        with self.lock:
+            self.started = time.monotonic()
+            self.samples = collections.deque([(self.started, position)])
+
+    @property
+    def position(self):
+        with self.lock:
+            return self.samples[-1][1]
+
+    def update(self, position):
+        """Record the current position (bytes transferred so far)"""
+        now = time.monotonic()
+        with self.lock:
+            self.samples.append((now, position))
+            # Keep one sample at or before the start of the window
+            while len(self.samples) > 2 and self.samples[1][0] <= now - self.window:
+                self.samples.popleft()
+
+    def rate(self):
+        """Bytes per second over the current window"""
+        now = time.monotonic()
+        with self.lock:
+            first_time, first_position = self.samples[0]
+            last_position = self.samples[-1][1]
+        return (last_position - first_position) / max(now - first_time, 1e-6)
+
+    def too_slow(self):
+        now = time.monotonic()
+        if not self.min_rate or self.paused or now - self.started < self.window:
+            return False
+        with self.lock:
+            first_time = self.samples[0][0]
+        return self.rate() + self.slack / max(now - first_time, 1e-6) < self.min_rate
+
+    @contextmanager
+    def pause(self):
+        """
+        Stop judging the rate while the transfer waits on purpose (e.g. for
+        the bandwidth manager); the time spent in the block is left out of
+        the window afterwards
+        """
+        self.paused = True
+        paused_at = time.monotonic()
+        try:
+            yield
+        finally:
+            self.shift(time.monotonic() - paused_at)
+            self.paused = False
+
+    def shift(self, seconds):
+        """Move every sample forward, as if the last seconds never happened"""
+        with self.lock:
+            self.started += seconds
+            self.samples = collections.deque((sample_time + seconds, position) for sample_time, position in self.samples)
+
+    def error(self):
+        return SlowTransferError(
+            f"{self.label}: {self.rate() / 1024:.0f} KB/s over the last {self.window:.0f}s, "
+            f"below the {self.min_rate / 1024:.0f} KB/s minimum; reconnecting")
+
+    def check(self):
+        """Raise SlowTransferError if the transfer is too slow"""
+        if self.too_slow():
+            raise self.error()
+
+    def start_monitor(self, on_slow):
+        """
+        Watch the rate from a background thread
+
+        For transfers that block inside a library call (e.g. one upload chunk),
+        where check() cannot run between reads.
+
+        Args:
+            on_slow: Called with the SlowTransferError when the rate drops
+                below the minimum; should break the current connection
+        """
+        self.stop_event = threading.Event()
+
+        def monitor(stop_event):
+            while not stop_event.wait(MONITOR_INTERVAL):
+                if self.too_slow():
+                    on_slow(self.error())
+                    # Give the reconnect a full window of its own
+                    self.restart(self.position)
+
+        threading.Thread(target=monitor, args=(self.stop_event,), name=f"watchdog-{self.label}", daemon=True).start()
+
+    def stop_monitor(self):
+        if self.stop_event is not None:
+            self.stop_event.set()
@@ -0,0 +1,376 @@
+import contextlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+from .config import WORK_LEASE_SECONDS, WORK_MAX_ATTEMPTS
+
+# Part states
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+# Shared queue of parts in a SQLite file
+class SqliteWorkQueue:
+    """
+    Work queue in one SQLite file: local, or on a disk every worker mounts
+
+    Every operation is one short IMMEDIATE transaction, so concurrent
+    workers never lease the same part. The file needs working POSIX locks
+    (local disks, NFS with locking); the default rollback journal is used
+    because WAL does not work over network file systems. Lease expiry uses
+    each worker's clock, so machines should be roughly in sync.
+    """
+
+    def __init__(self, path, max_attempts=WORK_MAX_ATTEMPTS):
+        self.path = path
+        self.max_attempts = max_attempts
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self.transaction() as db:
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS parts (
+                    job TEXT NOT NULL,
+                    part_num INTEGER NOT NULL,
+                    payload TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    worker TEXT,
+                    lease_expires REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    video_id TEXT,
+                    error TEXT,
+                    enqueued REAL NOT NULL,
+                    PRIMARY KEY (job, part_num)
+                )""")
+
+    def __repr__(self):
+        return f"sqlite:///{self.path}"
+
+    @contextlib.contextmanager
+    def transaction(self):
+        db = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+        finally:
+            db.close()
+
+    def enqueue(self, job, parts):
+        """
+        Publish parts of a job; parts that are already queued or done are kept
+
+        Failed parts are reset, so publishing a job again retries them.
+
+        Args:
+            job: Job key, e.g. "twitch:123456789"
+            parts: Payload dicts, each with at least 'part_num'
+        """
+        now = time.time()
+        with self.transaction() as db:
+            for part in parts:
+                db.execute("""
+                    INSERT INTO parts (job, part_num, payload, state, enqueued) VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (job, part_num) DO UPDATE SET
+                        payload = excluded.payload, state = excluded.state, attempts = 0,
+                        error = NULL, worker = NULL, enqueued = excluded.enqueued
+                    WHERE parts.state = ?""",
+                    (job, part['part_num'], json.dumps(part), PENDING, now, FAILED))
+
+    def lease(self, worker_id, lease_seconds=WORK_LEASE_SECONDS):
+        """
+        Take the oldest pending part, or one whose lease ran out
+
+        Returns:
+            dict: {'job', 'part_num', 'payload', 'attempt'}, or None if
+            there is nothing to do
+        """
+        now = time.time()
+        with self.transaction() as db:
+            # Parts whose workers kept dying are given up instead of leased again
+            db.execute(
+                "UPDATE parts SET state = ?, error = ? WHERE state = ? AND lease_expires < ? AND attempts >= ?",
+                (FAILED, "lease expired on every attempt", LEASED, now, self.max_attempts))
+            row = db.execute(
+                "SELECT job, part_num, payload, attempts FROM parts WHERE state = ? OR (state = ? AND lease_expires < ?) "
+                "ORDER BY enqueued, part_num LIMIT 1",
+                (PENDING, LEASED, now)).fetchone()
+            if row is None:
+                return None
+            job, part_num, payload, attempts = row
+            db.execute(
+                "UPDATE parts SET state = ?, worker = ?, lease_expires = ?, attempts = attempts + 1 WHERE job = ? AND part_num = ?",
+                (LEASED, worker_id, now + lease_seconds, job, part_num))
+        return {'job': job, 'part_num': part_num, 'payload': json.loads(payload), 'attempt': attempts + 1}
+
+    def renew(self, item, worker_id, lease_seconds=WORK_LEASE_SECONDS):
+        """Extend a lease; False if it was lost (expired, or taken by another worker)"""
+        now = time.time()
+        with self.transaction() as db:
+            cursor = db.execute(
+                "UPDATE parts SET lease_expires = ? WHERE job = ? AND part_num = ? AND state = ? AND worker = ? AND lease_expires >= ?",
+                (now + lease_seconds, item['job'], item['part_num'], LEASED, worker_id, now))
+            return cursor.rowcount == 1
+
+    def complete(self, item, worker_id, video_id):
+        """Record an uploaded part; False if another worker already did"""
+        with self.transaction() as db:
+            cursor = db.execute(
+                "UPDATE parts SET state = ?, worker = ?, video_id = ?, error = NULL, lease_expires = NULL "
+                "WHERE job = ? AND part_num = ? AND state != ?",
+                (DONE, worker_id, video_id, item['job'], item['part_num'], DONE))
+            return cursor.rowcount == 1
+
+    def fail(self, item, worker_id, error):
+        """Hand a part back for another worker, or give it up after max_attempts"""
+        with self.transaction() as db:
+            db.execute(
+                "UPDATE parts SET state = CASE WHEN attempts >= ? THEN ? ELSE ? END, error = ?, lease_expires = NULL "
+                "WHERE job = ? AND part_num = ? AND state = ? AND worker = ?",
+                (self.max_attempts, FAILED, PENDING, error, item['job'], item['part_num'], LEASED, worker_id))
+
+    def status(self, job):
+        """
+        Every part of a job
+
+        Returns:
+            list: Dicts with part_num, state, worker, attempts, video_id and error
+        """
+        db = sqlite3.connect(self.path, timeout=60)
+        try:
+            rows = db.execute(
+                "SELECT part_num, state, worker, attempts, video_id, error FROM parts WHERE job = ? ORDER BY part_num",
+                (job,)).fetchall()
+        finally:
+            db.close()
+        keys = ('part_num', 'state', 'worker', 'attempts', 'video_id', 'error')
+        return [dict(zip(keys, row)) for row in rows]
+
+# Lua scripts keep every Redis operation atomic without client-side locking
+REDIS_ENQUEUE = """
+local state = redis.call('HGET', KEYS[2], 'state')
+if state == false or state == 'failed' then
+    redis.call('HSET', KEYS[2], 'payload', ARGV[2], 'state', 'pending', 'attempts', 0, 'error', '', 'worker', '')
+    redis.call('RPUSH', KEYS[1], ARGV[1])
+end
+redis.call('SADD', KEYS[3], ARGV[1])
+return 1
+"""
+
+REDIS_NEXT = """
+local now = tonumber(redis.call('TIME')[1])
+for _, id in ipairs(redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', now)) do
+    redis.call('ZREM', KEYS[2], id)
+    redis.call('LPUSH', KEYS[1], id)
+end
+return redis.call('LINDEX', KEYS[1], 0)
+"""
+
+REDIS_LEASE = """
+if redis.call('LREM', KEYS[1], 1, ARGV[1]) == 0 then
+    -- Another worker took it first
+    return false
+end
+local attempts = tonumber(redis.call('HGET', KEYS[3], 'attempts') or '0')
+if redis.call('HGET', KEYS[3], 'state') == 'done' then
+    -- Completed by a worker whose lease had run out
+    return false
+elseif attempts >= tonumber(ARGV[4]) then
+    redis.call('HSET', KEYS[3], 'state', 'failed', 'error', 'lease expired on every attempt')
+    return false
+end
+redis.call('HSET', KEYS[3], 'state', 'leased', 'worker', ARGV[2], 'attempts', attempts + 1)
+redis.call('ZADD', KEYS[2], tonumber(redis.call('TIME')[1]) + tonumber(ARGV[3]), ARGV[1])
+return {redis.call('HGET', KEYS[3], 'payload'), attempts + 1}
+"""
+
+REDIS_RENEW = """
+local now = tonumber(redis.call('TIME')[1])
+local expires = redis.call('ZSCORE', KEYS[1], ARGV[1])
+if redis.call('HGET', KEYS[2], 'state') ~= 'leased' or redis.call('HGET', KEYS[2], 'worker') ~= ARGV[2]
+        or not expires or tonumber(expires) < now then
+    return 0
+end
+redis.call('ZADD', KEYS[1], now + tonumber(ARGV[3]), ARGV[1])
+return 1
+"""
+
+REDIS_COMPLETE = """
+if redis.call('HGET', KEYS[3], 'state') == 'done' then
+    return 0
+end
+redis.call('HSET', KEYS[3], 'state', 'done', 'worker', ARGV[2], 'video_id', ARGV[3], 'error', '')
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('LREM', KEYS[2], 0, ARGV[1])
+return 1
+"""
+
+REDIS_FAIL = """
+if redis.call('HGET', KEYS[3], 'state') ~= 'leased' or redis.call('HGET', KEYS[3], 'worker') ~= ARGV[2] then
+    return 0
+end
+redis.call('ZREM', KEYS[1], ARGV[1])
+if tonumber(redis.call('HGET', KEYS[3], 'attempts')) >= tonumber(ARGV[4]) then
+    redis.call('HSET', KEYS[3], 'state', 'failed', 'error', ARGV[3])
+else
+    redis.call('HSET', KEYS[3], 'state', 'pending', 'error', ARGV[3])
+    redis.call('RPUSH', KEYS[2], ARGV[1])
+end
+return 1
+"""
+
+# Shared queue of parts on a Redis-compatible server
+class RedisWorkQueue:
+    """
+    Work queue on Redis (or Valkey, KeyDB, ...), for workers without a shared disk
+
+    Pending part IDs are a list, leases a sorted set scored by expiry time
+    (the server's clock, so worker clocks do not matter) and every part a
+    hash. Each operation is one Lua script that declares every key it
+    touches, and all keys share the {namespace} hash tag, so the queue also
+    works on Redis Cluster. Leasing is two scripts: one picks the next part
+    ID, the other takes it only if no other worker did in between.
+    """
+
+    def __init__(self, url, namespace="vod_uploader", max_attempts=WORK_MAX_ATTEMPTS):
+        if redis is None:
+            raise Exception("The redis package is required for a redis:// work queue (pip install redis)")
+        self.url = url
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.namespace = namespace
+        self.max_attempts = max_attempts
+        # The hash tag keeps every key of the queue in one cluster slot
+        self.prefix = f"{{{namespace}}}"
+        self.pending_key = f"{self.prefix}:pending"
+        self.leases_key = f"{self.prefix}:leases"
+        self.enqueue_script = self.client.register_script(REDIS_ENQUEUE)
+        self.next_script = self.client.register_script(REDIS_NEXT)
+        self.lease_script = self.client.register_script(REDIS_LEASE)
+        self.renew_script = self.client.register_script(REDIS_RENEW)
+        self.complete_script = self.client.register_script(REDIS_COMPLETE)
+        self.fail_script = self.client.register_script(REDIS_FAIL)
+
+    def __repr__(self):
+        return self.url
+
+    def part_id(self, job, part_num):
+        return f"{job}#{part_num}"
+
+    def part_key(self, part_id):
+        return f"{self.prefix}:part:{part_id}"
+
+    def job_key(self, job):
+        return f"{self.prefix}:job:{job}"
+
+    def enqueue(self, job, parts):
+        for part in parts:
+            part_id = self.part_id(job, part['part_num'])
+            self.enqueue_script(keys=[self.pending_key, self.part_key(part_id), self.job_key(job)],
+                                args=[part_id, json.dumps(part)])
+
+    def lease(self, worker_id, lease_seconds=WORK_LEASE_SECONDS):
+        while True:
+            part_id = self.next_script(keys=[self.pending_key, self.leases_key])
+            if not part_id:
+                return None
+            leased = self.lease_script(keys=[self.pending_key, self.leases_key, self.part_key(part_id)],
+                                       args=[part_id, worker_id, lease_seconds, self.max_attempts])
+            if leased:
+                payload, attempt = leased
+                job, part_num = part_id.rsplit('#', 1)
+                return {'job': job, 'part_num': int(part_num), 'payload': json.loads(payload), 'attempt': int(attempt)}
+
+    def renew(self, item, worker_id, lease_seconds=WORK_LEASE_SECONDS):
+        part_id = self.part_id(item['job'], item['part_num'])
+        return self.renew_script(keys=[self.leases_key, self.part_key(part_id)], args=[part_id, worker_id, lease_seconds]) == 1
+
+    def complete(self, item, worker_id, video_id):
+        part_id = self.part_id(item['job'], item['part_num'])
+        return self.complete_script(keys=[self.leases_key, self.pending_key, self.part_key(part_id)],
+                                    args=[part_id, worker_id, video_id]) == 1
+
+    def fail(self, item, worker_id, error):
+        part_id = self.part_id(item['job'], item['part_num'])
+        self.fail_script(keys=[self.leases_key, self.pending_key, self.part_key(part_id)],
+                         args=[part_id, worker_id, error, self.max_attempts])
+
+    def status(self, job):
+        parts = []
+        for part_id in self.client.smembers(self.job_key(job)):
+            fields = self.client.hgetall(self.part_key(part_id))
+            parts.append({
+                'part_num': int(part_id.rsplit('#', 1)[1]),
+                'state': fields.get('state'),
+                'worker': fields.get('worker') or None,
+                'attempts': int(fields.get('attempts', 0)),
+                'video_id': fields.get('video_id') or None,
+                'error': fields.get('error') or None
+            })
+        return sorted(parts, key=lambda part: part['part_num'])
+
+# Open a work queue from a location string
+def open_work_queue(location):
+    """
+    Args:
+        location: "redis://host:6379/0" for a Redis-compatible server,
+            "sqlite:///path/queue.db" or a plain path for a SQLite file
+
+    Returns:
+        SqliteWorkQueue or RedisWorkQueue
+    """
+    if location.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisWorkQueue(location)
+    if location.startswith('sqlite:///'):
+        # sqlite:////abs/path.db is absolute, sqlite:///path.db relative
+        location = location[len('sqlite:///'):]
+    return SqliteWorkQueue(location)
+
+# Keeps a lease alive while its part is processed
+class LeaseKeeper:
+    """
+    Renews a lease every third of its length from a background thread
+
+    If the worker dies, renewals stop and the lease expires, so the part is
+    leased again elsewhere. lost is set when a renewal finds the lease
+    taken by another worker.
+    """
+
+    def __init__(self, queue, item, worker_id, lease_seconds=WORK_LEASE_SECONDS):
+        self.queue = queue
+        self.item = item
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.lost = False
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, name=f"lease-{item['part_num']}", daemon=True)
+
+    def run(self):
+        while not self.stop_event.wait(self.lease_seconds / 3):
+            try:
+                if not self.queue.renew(self.item, self.worker_id, self.lease_seconds):
+                    self.lost = True
+                    print(f"Lost the lease on part {self.item['part_num']} of {self.item['job']}")
+                    return
+            except Exception as e:
+                # Try again on the next tick; the lease has two more thirds to go
+                print(f"Could not renew lease on part {self.item['part_num']}: {str(e)}")
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop_event.set()
+        self.thread.join()
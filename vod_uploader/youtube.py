@@ -0,0 +1,402 @@
+import os
+import json
+import pickle
+import socket
+import httplib2
+from googleapiclient.discovery import build
+from googleapiclient.http import HttpRequest, MediaFileUpload, MediaIoBaseUpload
+from google_auth_httplib2 import AuthorizedHttp
+from google_auth_oauthlib.flow import InstalledAppFlow
+from google.auth.transport.requests import Request
+
+from .config import (
+    CLIENT_SECRETS_FILE,
+    REDIRECT_URI,
+    TOKEN_FILE,
+    UPLOAD_CHUNK_SIZE,
+    YOUTUBE_API_SERVICE_NAME,
+    YOUTUBE_API_VERSION,
+    YOUTUBE_SCOPES,
+)
+from .joblog import job_log
+from .progress import progress_bus
+from .ratelimit import egress
+from .retry import RetryPolicy
+from .slices import FileSlice
+from .watchdog import ThroughputWatchdog
+
+# Retry engine host name for every YouTube API call
+YOUTUBE_HOST = "youtube"
+
+# Function to authenticate with YouTube in Colab using manual token approach
+def get_youtube_service():
+    print("Authenticating with YouTube...")
+
+    # First, check if we have a client secrets file
+    if not os.path.exists(CLIENT_SECRETS_FILE):
+        print(f"WARNING: {CLIENT_SECRETS_FILE} not found.")
+        print("You need to create a project in Google Cloud Console, enable YouTube API,")
+        print("and download the OAuth credentials as client_secrets.json.")
+        print("Visit: https://console.cloud.google.com/apis/credentials")
+
+        # Create instructions for user to follow
+        create_client_secrets_instructions()
+
+        # Check again after instructions
+        if not os.path.exists(CLIENT_SECRETS_FILE):
+            raise Exception(f"YouTube API credentials file {CLIENT_SECRETS_FILE} not found.")
+
+    # Check for saved credentials
+    creds = None
+    token_file = TOKEN_FILE
+
+    # Try to load existing credentials
+    if os.path.exists(token_file):
+        print("Loading saved credentials...")
+        with open(token_file, 'rb') as token:
+            try:
+                creds = pickle.load(token)
+            except Exception as e:
+                print(f"Error loading credentials: {e}")
+                creds = None
+
+    # If there are no valid credentials, let the user log in
+    if not creds or not creds.valid:
+        if creds and creds.expired and creds.refresh_token:
+            print("Refreshing expired credentials...")
+            try:
+                creds.refresh(Request())
+            except Exception as e:
+                print(f"Failed to refresh credentials: {e}")
+                creds = None
+
+        if not creds:
+            print("Getting new credentials using manual flow...")
+            flow = InstalledAppFlow.from_client_secrets_file(
+                CLIENT_SECRETS_FILE, YOUTUBE_SCOPES,
+                redirect_uri=REDIRECT_URI)
+
+            # UPDATED: Explicitly set the redirect URI to match what was configured
+            auth_url, _ = flow.authorization_url(
+                prompt='consent',
+                access_type='offline'
+            )
+
+            print("\n" + "=" * 70)
+            print("MANUAL AUTHENTICATION REQUIRED")
+            print("=" * 70)
+            print("\n1. Copy the following URL and open it in your browser:")
+            print("\n" + auth_url + "\n")
+            print("2. Sign in with your Google account that has YouTube access")
+            print("3. Allow the permissions requested")
+            print("4. After authorizing, you'll be redirected to a page that might show an error")
+            print("5. Copy the FULL URL from the address bar (including the 'code=' parameter)")
+            print("6. Paste the FULL URL below\n")
+
+            # Get the authorization URL from the user
+            auth_response = input("Enter the full redirect URL: ")
+
+            try:
+                # Extract the code parameter from the URL
+                if "code=" in auth_response:
+                    code = auth_response.split("code=")[1].split("&")[0]
+                else:
+                    code = auth_response
+            except:
+                print("Could not extract authorization code from input. Using it as-is.")
+                code = auth_response
+
+            # Exchange the authorization code for credentials
+            try:
+                flow.fetch_token(
+                    code=code,
+                )
+                creds = flow.credentials
+
+                # Save the credentials for the next run
+                print("Saving credentials for future use...")
+                with open(token_file, 'wb') as token:
+                    pickle.dump(creds, token)
+                    print("Credentials saved to", token_file)
+            except Exception as e:
+                print(f"Error fetching token: {e}")
+                print("Detailed error information:", str(e))
+                raise
+
+    print("Authentication successful!")
+    return build_youtube_service(creds)
+
+# Build a service object that can be shared by concurrent uploads
+def build_youtube_service(creds):
+    """
+    httplib2.Http is not thread-safe, so every request (and with it every
+    resumable upload) gets its own authorized Http and connection; the
+    credentials, and their refreshes, are shared.
+
+    Args:
+        creds: OAuth credentials
+
+    Returns:
+        Resource: YouTube API service object
+    """
+    def build_request(http, *args, **kwargs):
+        return HttpRequest(AuthorizedHttp(creds, http=httplib2.Http()), *args, **kwargs)
+
+    return build(YOUTUBE_API_SERVICE_NAME, YOUTUBE_API_VERSION,
+                 http=AuthorizedHttp(creds, http=httplib2.Http()), requestBuilder=build_request)
+
+def create_client_secrets_instructions():
+    """Provides instructions for creating client_secrets.json file"""
+    print("\n======= HOW TO CREATE CLIENT_SECRETS.JSON ========")
+    print("1. Go to https://console.cloud.google.com/")
+    print("2. Create a new project or select an existing one")
+    print("3. Enable the YouTube Data API v3")
+    print("4. Go to 'Credentials' and create an OAuth client ID")
+    print("5. Select 'Desktop app' as the application type")
+    print("6. Add 'http://localhost/' as an authorized redirect URI")
+    print("7. Download the JSON file and rename it to 'client_secrets.json'")
+    print("8. Upload it to this Colab notebook's working directory")
+    print("====================================================\n")
+
+    # Template file for fallback
+    sample_content = {
+        "installed": {
+            "client_id": "YOUR_CLIENT_ID.apps.googleusercontent.com",
+            "project_id": "YOUR_PROJECT_ID",
+            "auth_uri": "https://accounts.google.com/o/oauth2/auth",
+            "token_uri": "https://oauth2.googleapis.com/token",
+            "auth_provider_x509_cert_url": "https://www.googleapis.com/oauth2/v1/certs",
+            "client_secret": "YOUR_CLIENT_SECRET",
+            "redirect_uris": ["http://localhost/"]
+        }
+    }
+
+    with open("client_secrets_template.json", "w") as f:
+        json.dump(sample_content, f, indent=4)
+
+    print("I've created a template file 'client_secrets_template.json'")
+    print("Replace the placeholders with your actual credentials and rename to 'client_secrets.json'")
+
+# Function to upload to YouTube with quality info
+def upload_to_youtube(file_path, title, description=None, tags=None, privacy="private", youtube_service=None, video_info=None, category_id='22', bandwidth_weight=1):
+    """
+    Upload a video file to YouTube with resumable, retried chunk uploads
+
+    Args:
+        file_path: Path to the video file (including extension), or a
+            FileSlice streamed straight out of a larger file
+        title: Video title (trimmed to YouTube's 100 character limit)
+        description: Video description
+        tags: List of tags
+        privacy: One of VALID_PRIVACY_STATUSES
+        youtube_service: YouTube API service object (created if None)
+        video_info: Optional technical info appended to the description
+        category_id: YouTube category ('20' Gaming, '22' People & Blogs)
+        bandwidth_weight: Share of EGRESS_RATE_LIMIT next to other jobs' uploads
+
+    Returns:
+        str: ID of the uploaded video
+    """
+    if description is None:
+        description = 'Uploaded video'
+    if tags is None:
+        tags = ['Video', 'Upload']
+    if video_info is None:
+        video_info = {}
+
+    clean_title = title[:100]  # YouTube title limit is 100 characters
+
+    youtube = youtube_service
+    if youtube is None:
+        youtube = get_youtube_service()
+
+    print(f"Preparing to upload: {file_path}")
+    print(f"Title: {clean_title}")
+
+    # Check if the file exists
+    source_path = file_path.path if isinstance(file_path, FileSlice) else file_path
+    if not os.path.exists(source_path):
+        raise Exception(f"File not found: {source_path}")
+
+    # Get file size for progress reporting
+    file_size = file_path.size if isinstance(file_path, FileSlice) else os.path.getsize(file_path)
+    print(f"File size: {file_size / (1024*1024):.2f} MB")
+
+    # Update description with video info if available
+    if video_info:
+        tech_info = "\n\nVideo Technical Information:\n"
+        if "resolution" in video_info:
+            tech_info += f"Resolution: {video_info['resolution']}\n"
+        if "file_size_mb" in video_info:
+            tech_info += f"File size: {video_info['file_size_mb']:.2f} MB\n"
+        if "quality" in video_info:
+            tech_info += f"Twitch quality: {video_info['quality']}\n"
+        if "duration_formatted" in video_info:
+            tech_info += f"Duration: {video_info['duration_formatted']}\n"
+        description += tech_info
+
+    # Define the body of the request
+    body = {
+        'snippet': {
+            'title': clean_title,
+            'description': description,
+            'tags': tags,
+            'categoryId': category_id
+        },
+        'status': {
+            'privacyStatus': privacy,
+            'status.madeForKids': False
+        }
+    }
+
+    # Create the media upload object
+    stream = None
+    if isinstance(file_path, FileSlice):
+        # Byte-range view of the original file: no split copy on disk
+        stream = file_path.open()
+        media = MediaIoBaseUpload(
+            stream,
+            mimetype=file_path.mimetype,
+            chunksize=UPLOAD_CHUNK_SIZE,
+            resumable=True
+        )
+    else:
+        media = MediaFileUpload(
+            file_path,
+            chunksize=UPLOAD_CHUNK_SIZE,
+            resumable=True,
+            mimetype='video/mp4'
+        )
+
+    # Create the insert request
+    insert_request = youtube.videos().insert(
+        part=','.join(body.keys()),
+        body=body,
+        media_body=media
+    )
+
+    # Progress is keyed per part: parts of one video share a title prefix and
+    # may upload at the same time (slices of one file differ by their offset)
+    if isinstance(file_path, FileSlice):
+        progress_job = f"upload {os.path.basename(file_path.path)}@{file_path.start}"
+    else:
+        progress_job = f"upload {os.path.basename(file_path)}"
+
+    # Send the file chunk by chunk
+    print("Starting upload...")
+    try:
+        response = run_resumable_upload(insert_request, progress_job, file_size, bandwidth_weight)
+    finally:
+        if stream is not None:
+            stream.close()
+
+    if 'id' not in response:
+        raise Exception(f"The upload failed with an unexpected response: {response}")
+
+    video_id = response['id']
+    print(f"Upload complete! Video ID: {video_id}")
+    print(f"Video URL: https://youtu.be/{video_id}")
+
+    job_log.event("upload_complete", video_id=video_id, title=clean_title, bytes=file_size, video_info=video_info)
+    return video_id
+
+# Set a custom thumbnail on an uploaded video
+def set_thumbnail(video_id, thumbnail_path, youtube_service=None):
+    """
+    Upload a thumbnail with thumbnails.set, through the same retry path as uploads
+
+    A failure is reported but not raised: the video itself is already on
+    YouTube, and retrying the part would upload it twice.
+
+    Args:
+        video_id: ID returned by upload_to_youtube()
+        thumbnail_path: JPEG or PNG file (at most 2 MB)
+        youtube_service: YouTube API service object (created if None)
+
+    Returns:
+        bool: True if the thumbnail was set
+    """
+    youtube = youtube_service
+    if youtube is None:
+        youtube = get_youtube_service()
+
+    mimetype = 'image/png' if thumbnail_path.lower().endswith('.png') else 'image/jpeg'
+    request = youtube.thumbnails().set(
+        videoId=video_id,
+        media_body=MediaFileUpload(thumbnail_path, mimetype=mimetype)
+    )
+    try:
+        RetryPolicy(YOUTUBE_HOST).call(request.execute)
+    except Exception as e:
+        # e.g. 403 when the channel is not verified for custom thumbnails
+        print(f"Could not set thumbnail for {video_id}: {str(e)}")
+        return False
+
+    print(f"Thumbnail set for video {video_id}")
+    return True
+
+# Break the open connections of an (authorized) httplib2 client
+def break_connections(http):
+    """
+    Shut down the sockets of every pooled connection
+
+    A request blocked on one of them fails at once with a socket error; the
+    next request opens a fresh connection, possibly to a different edge.
+    """
+    # google-auth wraps the httplib2.Http that owns the connection pool
+    while not hasattr(http, 'connections') and hasattr(http, 'http'):
+        http = http.http
+    for connection in list(getattr(http, 'connections', {}).values()):
+        sock = getattr(connection, 'sock', None)
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+# Drive a resumable upload to completion, reporting progress to the shared bus
+def run_resumable_upload(insert_request, job, file_size, weight=1):
+    """
+    Call next_chunk() until the upload finishes
+
+    Each chunk is retried on its own through the shared retry engine, so a
+    failure only resends the current chunk rather than restarting the file.
+    A throughput watchdog breaks the connection when the upload falls below
+    the minimum rate; the retry asks YouTube for the stored offset and
+    continues from there on a new connection. Every chunk is first taken
+    from the shared egress manager, so concurrent uploads get fair shares
+    of EGRESS_RATE_LIMIT; time spent waiting there does not count against
+    the watchdog.
+
+    Args:
+        insert_request: Resumable request from videos().insert()
+        job: Progress bus job name
+        file_size: Size of the file being uploaded in bytes
+        weight: Bandwidth weight of the job (see BandwidthManager.lane)
+
+    Returns:
+        dict: The API response of the finished upload
+    """
+    policy = RetryPolicy(YOUTUBE_HOST)
+    response = None
+
+    def on_slow(error):
+        print(str(error))
+        break_connections(insert_request.http)
+
+    watchdog = ThroughputWatchdog(job, slack=UPLOAD_CHUNK_SIZE)
+    watchdog.start_monitor(on_slow)
+    try:
+        lane = egress.lane(job, 'upload', weight)
+        while response is None:
+            lane.acquire(min(UPLOAD_CHUNK_SIZE, max(file_size - watchdog.position, 0)), watchdog)
+            status, response = policy.call(insert_request.next_chunk)
+            if status:
+                progress_bus.publish(job, status.resumable_progress, status.total_size)
+                watchdog.update(status.resumable_progress)
+
+        progress_bus.publish(job, file_size, file_size)
+        return response
+    finally:
+        watchdog.stop_monitor()
+        progress_bus.finish(job)